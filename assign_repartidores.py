@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Asignación masiva de repartidores a órdenes por provincia.
+
+Hoy la asignación es orden por orden: en Postgres, asignar_repartidor_automatico
+llama a buscar_repartidores_por_provincia para cada orden
+(update_ordenes_with_numbering.sql), y en Firestore repartidorAsignado se
+escribe a mano. Este script lo hace para todas las órdenes pendientes de una
+vez:
+
+1. Carga los repartidores activos (rol REPARTIDOR) con sus
+   provincias_asignadas (texto separado por comas, como en Postgres, o
+   lista) y arma un índice provincia → repartidores. Sin provincias
+   asignadas, el repartidor cubre todas (igual que la función SQL).
+2. Recorre por páginas las órdenes CREADA, ENVIADA y REPARTIENDO: las que ya
+   tienen repartidor suman a su carga actual y las CREADA/ENVIADA sin
+   repartidor se agrupan por (provincia, municipio).
+3. Reparte cada grupo en rutas de hasta BULTOS_POR_RUTA bultos; cada ruta va
+   al repartidor de la provincia con menos carga (en bultos). Las urgentes
+   se reparten primero y los grupos grandes antes que los chicos, para que
+   el balance final sea parejo. Un municipio queda con un solo repartidor
+   siempre que quepa en una ruta.
+4. Si ningún repartidor cubre la provincia, como en la función SQL se usa
+   cualquier repartidor (salvo con --solo-provincia, que la deja sin asignar).
+5. Escribe repartidorAsignado, repartidorId y updatedAt en lotes de hasta
+   500 operaciones (--en-vuelo en paralelo), cada lote con un solo ajuste
+   por contador de repartidor (order_counters.py) para todas sus órdenes.
+   Cada update lleva como precondición el update_time leído en el paso 2:
+   si una orden cambió mientras tanto (otro proceso o la app la asignó o
+   cambió de estado) el lote se parte hasta aislarla; esa orden no se pisa,
+   no toca los contadores y se informa como omitida.
+
+Uso:
+    python3 assign_repartidores.py --simular
+    python3 assign_repartidores.py [--en-vuelo 8] [--bultos-por-ruta 30] [--solo-provincia]
+"""
+
+import argparse
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_client import get_db
+from firestore_batch import MAX_OPERACIONES_LOTE
+from firestore_pages import DOCUMENT_ID
+from firestore_ratelimit import AdaptiveRateLimiter, call_with_retry
+from order_counters import SIN_ASIGNAR, counter_op
+
+ESTADOS_SIN_ASIGNAR = ('CREADA', 'ENVIADA')
+ESTADOS_CON_CARGA = ('CREADA', 'ENVIADA', 'REPARTIENDO')
+BULTOS_POR_RUTA = 30
+CAMPOS_ORDEN = ['estado', 'repartidorAsignado', 'provinciaDestino', 'municipioDestino',
+                'cantidadBultos', 'esUrgente', 'tenant_id']
+
+
+class Courier:
+    __slots__ = ('uid', 'nombre', 'provincias', 'carga', 'asignadas')
+
+    def __init__(self, uid, nombre, provincias):
+        self.uid = uid
+        self.nombre = nombre
+        self.provincias = provincias
+        self.carga = 0
+        self.asignadas = 0
+
+
+def parse_provincias(value):
+    """provincias_asignadas como en Postgres ('La Habana,Matanzas') o como lista; None = todas."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    return frozenset(p.strip() for p in value if p and p.strip()) or None
+
+
+def load_couriers(db):
+    couriers = []
+    for snapshot in db.collection('usuarios').where('rol', '==', 'REPARTIDOR').stream():
+        data = snapshot.to_dict() or {}
+        if data.get('activo') is False:
+            continue
+        provincias = data.get('provincias_asignadas', data.get('provinciasAsignadas'))
+        couriers.append(Courier(snapshot.id, data.get('nombre') or snapshot.id,
+                                parse_provincias(provincias)))
+    return couriers
+
+
+def iter_open_orders(db, page_size=1000):
+    """Páginas de órdenes en ESTADOS_CON_CARGA, solo con los campos que se usan."""
+    query = (db.collection('ordenes').where('estado', 'in', list(ESTADOS_CON_CARGA))
+             .order_by(DOCUMENT_ID).select(CAMPOS_ORDEN).limit(page_size))
+    cursor = query
+    while True:
+        page = list(cursor.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        cursor = query.start_after({DOCUMENT_ID: page[-1].reference})
+
+
+def _bultos(orden):
+    try:
+        return max(1, int(orden.get('cantidadBultos') or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def plan_assignments(couriers, orders, route_bultos=BULTOS_POR_RUTA, same_province_only=False):
+    """
+    `orders` son tuplas (clave, datos), donde la clave es cualquier valor
+    hashable que identifique la orden (ref o snapshot). Devuelve
+    ({clave: Courier}, claves sin repartidor posible). Actualiza carga y
+    asignadas de cada Courier.
+    """
+    by_name = {c.nombre: c for c in couriers}
+    by_province = defaultdict(list)
+    everywhere = []
+    for courier in couriers:
+        if courier.provincias is None:
+            everywhere.append(courier)
+        else:
+            for provincia in courier.provincias:
+                by_province[provincia].append(courier)
+
+    # (urgente, provincia, municipio) → [(ref, bultos)]
+    groups = defaultdict(list)
+    for ref, orden in orders:
+        asignado = orden.get('repartidorAsignado')
+        if asignado:
+            if asignado in by_name:
+                by_name[asignado].carga += _bultos(orden)
+            continue
+        if orden.get('estado') not in ESTADOS_SIN_ASIGNAR:
+            continue
+        key = (bool(orden.get('esUrgente')), orden.get('provinciaDestino') or '',
+               orden.get('municipioDestino') or '')
+        groups[key].append((ref, _bultos(orden)))
+
+    # Urgentes primero y, dentro de cada clase, los grupos con más bultos primero
+    ordered = sorted(groups.items(),
+                     key=lambda item: (not item[0][0], -sum(b for _, b in item[1])))
+    assignments = {}
+    unassigned = []
+    for (_, provincia, _), items in ordered:
+        eligible = by_province.get(provincia, []) + everywhere
+        if not eligible and not same_province_only:
+            eligible = couriers
+        if not eligible:
+            unassigned.extend(ref for ref, _ in items)
+            continue
+        route = []
+        route_load = 0
+        for ref, bultos in items + [(None, 0)]:
+            if ref is not None and (not route or route_load + bultos <= route_bultos):
+                route.append(ref)
+                route_load += bultos
+                continue
+            courier = min(eligible, key=lambda c: c.carga)
+            for routed in route:
+                assignments[routed] = courier
+            courier.carga += route_load
+            courier.asignadas += len(route)
+            route, route_load = ([ref], bultos) if ref is not None else ([], 0)
+    return assignments, unassigned
+
+
+def _tenant(snapshot):
+    return (snapshot.to_dict() or {}).get('tenant_id')
+
+
+def pack_assignments(assignments, max_ops=MAX_OPERACIONES_LOTE):
+    """
+    Reparte las asignaciones ({snapshot: Courier}) en lotes de hasta
+    `max_ops` operaciones: un update por orden más un incremento por cada
+    contador (tenant, repartidor) que toca el lote.
+    """
+    items = sorted(assignments.items(), key=lambda item: (_tenant(item[0]) or '', item[1].nombre))
+    batch, keys = [], set()
+    for snapshot, courier in items:
+        tenant_id = _tenant(snapshot)
+        item_keys = {(tenant_id, SIN_ASIGNAR), (tenant_id, courier.nombre)}
+        if batch and len(batch) + 1 + len(keys | item_keys) > max_ops:
+            yield batch
+            batch, keys = [], set()
+        batch.append((snapshot, courier))
+        keys |= item_keys
+    if batch:
+        yield batch
+
+
+def assignment_batch(db, items):
+    """
+    Lote con las órdenes de `items` [(snapshot, Courier)]: cada update
+    condicionado a su update_time y un solo ajuste por contador, con la suma
+    de las órdenes del lote.
+    """
+    from firebase_admin import firestore
+
+    batch = db.batch()
+    deltas = Counter()
+    for snapshot, courier in items:
+        batch.update(snapshot.reference,
+                     {'repartidorAsignado': courier.nombre, 'repartidorId': courier.uid,
+                      'updatedAt': firestore.SERVER_TIMESTAMP},
+                     option=db.write_option(last_update_time=snapshot.update_time))
+        tenant_id = _tenant(snapshot)
+        deltas[tenant_id, SIN_ASIGNAR] -= 1
+        deltas[tenant_id, courier.nombre] += 1
+    operations = len(items)
+    for (tenant_id, nombre), delta in deltas.items():
+        if delta:
+            ref, data, merge = counter_op(db, 'repartidor', nombre, delta, tenant_id)
+            batch.set(ref, data, merge=merge)
+            operations += 1
+    return batch, operations
+
+
+def write_assignments(db, assignments, max_in_flight=4, limiter=None):
+    """
+    Confirma las asignaciones ({snapshot: Courier}) en lotes de hasta 500
+    operaciones. Devuelve los snapshots omitidos porque la orden cambió o se
+    borró después de leerla; de esos no se aplicó nada.
+
+    Una precondición que falla rechaza el lote entero: entonces se parte en
+    dos mitades y se reintenta cada una, hasta aislar las órdenes que
+    cambiaron. Con pocas órdenes desactualizadas son unos pocos commits más.
+    """
+    from google.api_core.exceptions import FailedPrecondition, NotFound
+
+    def commit(items):
+        batch, operations = assignment_batch(db, items)
+        try:
+            if limiter is None:
+                batch.commit()
+            else:
+                # Reenviar tras un error ambiguo no suma dos veces: si el primer
+                # intento se aplicó, los update_time ya no coinciden y el lote
+                # falla (sus órdenes quedan asignadas, pero se informan como omitidas)
+                call_with_retry(lambda: batch.commit(retry=None), limiter, operations)
+        except (FailedPrecondition, NotFound):
+            if len(items) == 1:
+                return [items[0][0]]
+            middle = len(items) // 2
+            return commit(items[:middle]) + commit(items[middle:])
+        return []
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        return [snapshot for skipped in pool.map(commit, pack_assignments(assignments))
+                for snapshot in skipped]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Asigna repartidores a las órdenes pendientes')
+    parser.add_argument('--en-vuelo', type=int, default=8,
+                        help='Lotes en paralelo (por defecto: 8)')
+    parser.add_argument('--sin-limite', action='store_true',
+                        help='Escribir sin la rampa 500/50/5 ni reintentos (solo emulador)')
+    parser.add_argument('--bultos-por-ruta', type=int, default=BULTOS_POR_RUTA,
+                        help=f'Bultos máximos por ruta (por defecto: {BULTOS_POR_RUTA})')
+    parser.add_argument('--solo-provincia', action='store_true',
+                        help='No usar repartidores de otras provincias como respaldo')
+    parser.add_argument('--pagina', type=int, default=1000)
+    parser.add_argument('--simular', action='store_true',
+                        help='Calcular y mostrar la asignación sin escribir')
+    args = parser.parse_args()
+
+    db = get_db()
+    print("=" * 70)
+    print(f"🚚 ASIGNACIÓN DE REPARTIDORES{' (simulación)' if args.simular else ''}")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    couriers = load_couriers(db)
+    if not couriers:
+        print("❌ No hay repartidores activos")
+        return
+    # El snapshot identifica la orden y guarda el update_time para la precondición
+    orders = [(s, s.to_dict() or {})
+              for page in iter_open_orders(db, args.pagina) for s in page]
+    loaded = time.perf_counter()
+    assignments, unassigned = plan_assignments(couriers, orders, args.bultos_por_ruta,
+                                               args.solo_provincia)
+    planned = time.perf_counter()
+    print(f"   {len(couriers)} repartidores, {len(orders)} órdenes abiertas leídas "
+          f"en {loaded - start:.2f} s; plan en {(planned - loaded) * 1000:.0f} ms")
+
+    skipped = []
+    if not args.simular and assignments:
+        limiter = None if args.sin_limite else AdaptiveRateLimiter()
+        skipped = write_assignments(db, assignments, args.en_vuelo, limiter)
+        for snapshot in skipped:
+            courier = assignments.pop(snapshot)
+            courier.asignadas -= 1
+            courier.carga -= _bultos(snapshot.to_dict() or {})
+        print(f"   Escritura en {time.perf_counter() - planned:.2f} s")
+
+    print()
+    print(f"   {'repartidor':<28} {'nuevas':>7} {'carga (bultos)':>15}")
+    for courier in sorted(couriers, key=lambda c: -c.carga):
+        print(f"   {courier.nombre[:28]:<28} {courier.asignadas:>7} {courier.carga:>15}")
+    print()
+    print(f"✅ {len(assignments)} órdenes asignadas"
+          f"{f', {len(unassigned)} sin repartidor para su provincia' if unassigned else ''}")
+    if skipped:
+        print(f"⚠️  {len(skipped)} órdenes omitidas: cambiaron después de leerlas "
+              f"(volver a correr para asignarlas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de los scripts de administración contra los emuladores de
+Firestore y Auth.
+
+Ejecuta las operaciones de setup_firestore.py, setup_firestore_complete.py,
+create_auth_users.py y create_user_profile.py con varios tamaños de datos y
+registra, por caso: throughput, latencia p50/p99 por RPC y memoria máxima
+(RSS). En delete_bulk y auth_import_users cada RPC es un commit de 500
+borrados o un bloque de 1000 usuarios. Cada caso corre en un proceso aparte
+para que el RSS no se mezcle (con un límite de tiempo, --limite-caso), y los
+emuladores se vacían entre casos.
+
+Requiere los emuladores en marcha:
+    firebase emulators:start --only firestore,auth --project demo-paqueteria
+
+Uso:
+    python3 benchmark_admin.py --tamanos 100,1000,10000 --salida bench.json
+    python3 benchmark_admin.py --casos seed_lote,delete_bulk --tamanos 5000
+    python3 benchmark_admin.py comparar antes.json despues.json
+
+El subcomando memoria no usa los emuladores: compara con tracemalloc la
+memoria de N órdenes, contactos y usuarios como dicts y como registros de
+order_records.py:
+    python3 benchmark_admin.py memoria --tamanos 10000,100000
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime
+from queue import Empty
+
+from firebase_client import PROYECTO_EMULADOR
+from latency_stats import percentile
+
+FIRESTORE_EMULATOR = 'localhost:8080'
+AUTH_EMULATOR = 'localhost:9099'
+# Tiempo máximo de un caso antes de darlo por colgado
+LIMITE_CASO_SEGUNDOS = 1800
+
+
+# ==============================================================================
+# EMULADORES
+# ==============================================================================
+
+def use_emulators():
+    """Apunta el SDK a los emuladores (nunca a producción)."""
+    os.environ.setdefault('FIRESTORE_EMULATOR_HOST', FIRESTORE_EMULATOR)
+    os.environ.setdefault('FIREBASE_AUTH_EMULATOR_HOST', AUTH_EMULATOR)
+    os.environ.setdefault('GCLOUD_PROJECT', PROYECTO_EMULADOR)
+
+
+def reset_emulators():
+    """Borra todos los documentos y cuentas de los emuladores."""
+    project = os.environ['GCLOUD_PROJECT']
+    urls = (
+        f"http://{os.environ['FIRESTORE_EMULATOR_HOST']}/emulator/v1/projects/{project}"
+        f"/databases/(default)/documents",
+        f"http://{os.environ['FIREBASE_AUTH_EMULATOR_HOST']}/emulator/v1/projects/{project}/accounts",
+    )
+    for url in urls:
+        urllib.request.urlopen(urllib.request.Request(url, method='DELETE'), timeout=30).close()
+
+
+# ==============================================================================
+# CASOS
+# ==============================================================================
+# Cada caso recibe (db, tamaño) y devuelve (operaciones, latencias_en_segundos).
+
+def _seed(db, size, modo):
+    from firestore_batch import make_writer
+    from generate_ordenes import generate_orders
+
+    with make_writer(db, modo, rate_limit=False) as writer:
+        for orden in generate_orders(size):
+            writer.add('ordenes', orden)
+    return writer.stats.documentos, writer.stats.latencias
+
+
+def case_setup_firestore(db, size):
+    """Semilla de setup_firestore.py repetida hasta `size` documentos, una RPC por documento."""
+    import setup_firestore
+    from firestore_batch import make_writer
+
+    data = ([('emisores', d) for d in setup_firestore.emisores_data()]
+            + [('receptores', d) for d in setup_firestore.receptores_data()]
+            + [('ordenes', d) for d in setup_firestore.ordenes_data()])
+    with make_writer(db, 'individual', rate_limit=False) as writer:
+        for i in range(size):
+            collection, doc = data[i % len(data)]
+            writer.add(collection, doc)
+    return writer.stats.documentos, writer.stats.latencias
+
+
+def case_seed_individual(db, size):
+    return _seed(db, size, 'individual')
+
+
+def case_seed_lote(db, size):
+    return _seed(db, size, 'lote')
+
+
+def case_seed_bulk(db, size):
+    return _seed(db, size, 'bulk')
+
+
+def _prepare_orders(db, size):
+    from firestore_batch import make_writer
+    from generate_ordenes import generate_orders
+
+    with make_writer(db, 'lote', rate_limit=False) as writer:
+        for orden in generate_orders(size):
+            writer.add('ordenes', orden)
+
+
+def case_delete_stream(db, size):
+    """El delete_collection original: stream completo y un delete por documento."""
+    _prepare_orders(db, size)
+    latencies = []
+    deleted = 0
+    for doc in db.collection('ordenes').stream():
+        start = time.perf_counter()
+        doc.reference.delete()
+        latencies.append(time.perf_counter() - start)
+        deleted += 1
+    return deleted, latencies
+
+
+def case_delete_bulk(db, size):
+    """firestore_delete.py: páginas de 500 borradas en commits paralelos (latencia por commit)."""
+    from firestore_delete import bulk_delete_collection
+
+    _prepare_orders(db, size)
+    latencies = []
+    deleted = bulk_delete_collection(db, 'ordenes', progress_every=sys.maxsize,
+                                     latencies=latencies)
+    return deleted, latencies
+
+
+def _fake_users(size):
+    for i in range(size):
+        yield {
+            'uid': f'bench{i:07d}',
+            'email': f'repartidor{i}@bench.paqueteria.com',
+            'password': 'Rep123!',
+            'display_name': f'Repartidor {i}',
+            'rol': 'REPARTIDOR',
+        }
+
+
+def case_auth_create_user(db, size):
+    """create_auth_users.py: una llamada auth.create_user por usuario."""
+    from firebase_client import get_auth
+
+    auth = get_auth()
+    latencies = []
+    for usuario in _fake_users(size):
+        start = time.perf_counter()
+        auth.create_user(uid=usuario['uid'], email=usuario['email'],
+                         password=usuario['password'], display_name=usuario['display_name'])
+        latencies.append(time.perf_counter() - start)
+    return size, latencies
+
+
+def case_auth_import_users(db, size):
+    """create_auth_users.py --archivo: auth.import_users en bloques de 1000 (latencia por bloque)."""
+    from create_auth_users import import_users_bulk
+
+    latencies = []
+    imported, errors = import_users_bulk(_fake_users(size), imports_per_second=0,
+                                         latencies=latencies)
+    if errors:
+        raise RuntimeError(f'{len(errors)} usuarios fallaron en la importación')
+    return imported, latencies
+
+
+def case_user_profile(db, size):
+    """create_user_profile.py: get_user_by_email + set del perfil, por usuario."""
+    from create_auth_users import import_users_bulk
+    from create_user_profile import build_user_profile
+    from firebase_client import get_auth
+
+    auth = get_auth()
+    import_users_bulk(_fake_users(size), imports_per_second=0)
+    latencies = []
+    for usuario in _fake_users(size):
+        start = time.perf_counter()
+        user = auth.get_user_by_email(usuario['email'])
+        profile = build_user_profile(usuario['email'], usuario['display_name'], usuario['rol'])
+        db.collection('usuarios').document(user.uid).set(profile)
+        latencies.append(time.perf_counter() - start)
+    return size, latencies
+
+
+CASOS = {
+    'setup_firestore': case_setup_firestore,
+    'seed_individual': case_seed_individual,
+    'seed_lote': case_seed_lote,
+    'seed_bulk': case_seed_bulk,
+    'delete_stream': case_delete_stream,
+    'delete_bulk': case_delete_bulk,
+    'auth_create_user': case_auth_create_user,
+    'auth_import_users': case_auth_import_users,
+    'user_profile': case_user_profile,
+}
+
+
+# ==============================================================================
+# EJECUCIÓN Y MÉTRICAS
+# ==============================================================================
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB y macOS bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _run_case(name, size, queue):
+    try:
+        use_emulators()
+        reset_emulators()
+        from firebase_client import get_db
+
+        db = get_db()
+        start = time.perf_counter()
+        operations, latencies = CASOS[name](db, size)
+        elapsed = time.perf_counter() - start
+        latencies = sorted(latencies)
+        p50 = percentile(latencies, 50)
+        p99 = percentile(latencies, 99)
+        queue.put({
+            'caso': name,
+            'tamano': size,
+            'operaciones': operations,
+            'segundos': round(elapsed, 4),
+            'ops_por_segundo': round(operations / elapsed, 2) if elapsed > 0 else None,
+            'latencia_p50_ms': round(p50 * 1000, 3) if p50 is not None else None,
+            'latencia_p99_ms': round(p99 * 1000, 3) if p99 is not None else None,
+            'rpcs_medidas': len(latencies),
+            'rss_max_mb': round(peak_rss_mb(), 1),
+        })
+    except Exception as e:
+        queue.put({'caso': name, 'tamano': size, 'error': f'{type(e).__name__}: {e}'})
+
+
+def _wait_result(process, queue, timeout):
+    """Resultado del caso, o un error si el proceso murió sin enviarlo o se colgó."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            pass
+        if not process.is_alive():
+            try:
+                return queue.get(timeout=1)
+            except Empty:
+                return {'error': f'el proceso terminó sin resultado (código {process.exitcode})'}
+        if time.monotonic() > deadline:
+            process.terminate()
+            return {'error': f'sin resultado tras {timeout:.0f} s'}
+
+
+def run_benchmarks(cases, sizes, timeout=LIMITE_CASO_SEGUNDOS):
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for size in sizes:
+        for name in cases:
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run_case, args=(name, size, queue))
+            process.start()
+            result = _wait_result(process, queue, timeout)
+            result.setdefault('caso', name)
+            result.setdefault('tamano', size)
+            process.join()
+            results.append(result)
+            if 'error' in result:
+                print(f"   ❌ {name:<18} n={size:<7} {result['error']}")
+            else:
+                print(f"   ✓ {name:<18} n={size:<7} {result['ops_por_segundo']:>10} ops/s  "
+                      f"p50={result['latencia_p50_ms']} ms  p99={result['latencia_p99_ms']} ms  "
+                      f"rss={result['rss_max_mb']} MB")
+    return results
+
+
+def compare(path_a, path_b):
+    """Muestra la variación de throughput, p99 y RSS entre dos corridas."""
+    with open(path_a, encoding='utf-8') as f:
+        a = {(r['caso'], r['tamano']): r for r in json.load(f)['resultados']}
+    with open(path_b, encoding='utf-8') as f:
+        b = {(r['caso'], r['tamano']): r for r in json.load(f)['resultados']}
+
+    def delta(old, new):
+        if not old or new is None:
+            return '   n/a'
+        return f'{(new - old) / old * 100:+6.1f}%'
+
+    print(f"{'caso':<18} {'n':>7} {'ops/s':>8} {'p99':>8} {'rss':>8}")
+    for key in sorted(a.keys() & b.keys()):
+        old, new = a[key], b[key]
+        if 'error' in old or 'error' in new:
+            continue
+        print(f"{key[0]:<18} {key[1]:>7} "
+              f"{delta(old['ops_por_segundo'], new['ops_por_segundo']):>8} "
+              f"{delta(old['latencia_p99_ms'], new['latencia_p99_ms']):>8} "
+              f"{delta(old['rss_max_mb'], new['rss_max_mb']):>8}")
+
+
+# ==============================================================================
+# MEMORIA: DICTS VS REGISTROS
+# ==============================================================================
+
+def _traced_bytes(build):
+    """Bytes que siguen ocupados tras construir `build()` (tracemalloc)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        value = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del value
+    return size
+
+
+def memory_comparison(size):
+    """
+    {tipo: (bytes por dict, bytes por registro)} para `size` registros de cada
+    tipo. Se mide solo la conversión desde datos ya cargados, así los textos
+    compartidos (nombres, direcciones) no cuentan en ninguno de los dos lados.
+    """
+    from generate_ordenes import generate_order_records
+    from order_records import Contacto, Orden, Usuario
+
+    ordenes = list(generate_order_records(size))
+    fuentes = {
+        'ordenes': (Orden, ordenes),
+        'contactos': (Contacto, [Contacto(o.emisorNombre, o.emisorTelefono, o.emisorDireccion)
+                                 for o in ordenes]),
+        'usuarios': (Usuario, [Usuario(u['email'], u['display_name'], u['rol'])
+                               for u in _fake_users(size)]),
+    }
+    result = {}
+    for tipo, (cls, records) in fuentes.items():
+        dicts = [record.to_firestore() for record in records]
+        as_dicts = _traced_bytes(lambda: [record.to_firestore() for record in records])
+        as_records = _traced_bytes(lambda: [cls.from_firestore(data) for data in dicts])
+        result[tipo] = (as_dicts / size, as_records / size)
+    return result
+
+
+def run_memory(sizes):
+    print(f"{'tipo':<10} {'n':>8} {'dict B/reg':>11} {'registro B/reg':>15} {'ahorro':>8}")
+    for size in sizes:
+        for tipo, (as_dict, as_record) in memory_comparison(size).items():
+            print(f"{tipo:<10} {size:>8} {as_dict:>11.0f} {as_record:>15.0f} "
+                  f"{(1 - as_record / as_dict) * 100:>7.1f}%")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'memoria':
+        parser = argparse.ArgumentParser(description='Memoria de dicts frente a registros compactos')
+        parser.add_argument('--tamanos', default='10000,100000',
+                            help='Registros por tipo, separados por coma (por defecto: 10000,100000)')
+        args = parser.parse_args(sys.argv[2:])
+        run_memory([int(s) for s in args.tamanos.split(',')])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'comparar':
+        parser = argparse.ArgumentParser(description='Compara dos resultados de benchmark')
+        parser.add_argument('antes')
+        parser.add_argument('despues')
+        args = parser.parse_args(sys.argv[2:])
+        compare(args.antes, args.despues)
+        return
+
+    parser = argparse.ArgumentParser(description='Benchmarks contra los emuladores de Firebase')
+    parser.add_argument('--casos', default=','.join(CASOS),
+                        help=f"Casos separados por coma ({', '.join(CASOS)})")
+    parser.add_argument('--tamanos', default='100,1000',
+                        help='Tamaños de datos separados por coma (por defecto: 100,1000)')
+    parser.add_argument('--salida', default=None,
+                        help='Archivo JSON de resultados (por defecto: bench_<fecha>.json)')
+    parser.add_argument('--limite-caso', type=float, default=LIMITE_CASO_SEGUNDOS,
+                        help=f'Segundos máximos por caso (por defecto: {LIMITE_CASO_SEGUNDOS})')
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.casos.split(',') if c.strip()]
+    unknown = [c for c in cases if c not in CASOS]
+    if unknown:
+        parser.error(f"Casos desconocidos: {', '.join(unknown)}")
+    sizes = [int(s) for s in args.tamanos.split(',')]
+
+    use_emulators()
+    print("=" * 70)
+    print("⏱️  BENCHMARK DE SCRIPTS DE ADMINISTRACIÓN (emuladores)")
+    print(f"   Firestore: {os.environ['FIRESTORE_EMULATOR_HOST']} | "
+          f"Auth: {os.environ['FIREBASE_AUTH_EMULATOR_HOST']}")
+    print("=" * 70)
+
+    results = run_benchmarks(cases, sizes, args.limite_caso)
+    output = args.salida or f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'fecha': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'resultados': results,
+        }, f, indent=2, ensure_ascii=False)
+    print()
+    print(f"✅ Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,38 @@
 #!/usr/bin/env python3
 """
 Script para crear usuarios en Firebase Authentication
+
+Uso:
+    python3 create_auth_users.py
+        Crea los usuarios de ejemplo (admin y repartidor) uno a uno.
+
+    python3 create_auth_users.py --archivo repartidores.csv [--concurrencia 4]
+        Alta masiva: lee los usuarios de un CSV (email,password,display_name,rol
+        y opcionalmente uid) y los importa con auth.import_users en bloques de
+        1000, con las contraseñas ya hasheadas (PBKDF2-SHA256). Los errores se
+        recogen por usuario a partir del resultado de cada importación. Sin
+        uid en el CSV se deriva del email, así que reimportar no duplica cuentas.
 """
 
-import firebase_admin
-from firebase_admin import credentials, auth
+import argparse
+import csv
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_client import get_auth
 
-# Inicializar Firebase Admin SDK
-cred = credentials.Certificate('paqueteria-web-app-firebase-adminsdk-fbsvc-5846fb7c81.json')
-firebase_admin.initialize_app(cred)
+# Máximo de usuarios por llamada a auth.import_users
+MAX_USUARIOS_IMPORTACION = 1000
 
-print("=" * 70)
-print("🔐 CREANDO USUARIOS EN FIREBASE AUTHENTICATION")
-print("=" * 70)
-print()
+# Rondas de PBKDF2 (Firebase acepta de 0 a 120000)
+RONDAS_PBKDF2 = 10000
+
+# Espacio de nombres para derivar el uid del email cuando el CSV no trae uid
+NAMESPACE_USUARIOS = uuid.uuid5(uuid.NAMESPACE_DNS, 'usuarios.paqueteria.com')
 
 # Usuarios a crear
 usuarios = [
@@ -31,43 +50,233 @@ usuarios = [
     }
 ]
 
-for usuario in usuarios:
-    try:
-        user = auth.create_user(
-            email=usuario['email'],
-            password=usuario['password'],
-            display_name=usuario['display_name']
-        )
-        print(f"✅ Usuario '{usuario['display_name']}' creado exitosamente")
-        print(f"   📧 Email: {usuario['email']}")
-        print(f"   🔑 Password: {usuario['password']}")
-        print(f"   👤 Rol: {usuario['rol']}")
-        print(f"   🆔 UID: {user.uid}")
-        print()
-    except auth.EmailAlreadyExistsError:
-        print(f"ℹ️  Usuario '{usuario['email']}' ya existe")
-        print(f"   📧 Email: {usuario['email']}")
-        print(f"   🔑 Password: {usuario['password']}")
-        print(f"   👤 Rol: {usuario['rol']}")
-        print()
-    except Exception as e:
-        print(f"❌ Error creando '{usuario['email']}': {str(e)}")
-        print()
-
-print("=" * 70)
-print("✅ PROCESO COMPLETADO")
-print("=" * 70)
-print()
-print("🔐 Credenciales para login:")
-print()
-print("ADMINISTRADOR:")
-print("  Email: admin@paqueteria.com")
-print("  Password: Admin123!")
-print()
-print("REPARTIDOR:")
-print("  Email: repartidor@paqueteria.com")
-print("  Password: Rep123!")
-print()
 
+def create_users():
+    print("=" * 70)
+    print("🔐 CREANDO USUARIOS EN FIREBASE AUTHENTICATION")
+    print("=" * 70)
+    print()
+
+    auth = get_auth()
+    for usuario in usuarios:
+        try:
+            user = auth.create_user(
+                email=usuario['email'],
+                password=usuario['password'],
+                display_name=usuario['display_name']
+            )
+            print(f"✅ Usuario '{usuario['display_name']}' creado exitosamente")
+            print(f"   📧 Email: {usuario['email']}")
+            print(f"   🔑 Password: {usuario['password']}")
+            print(f"   👤 Rol: {usuario['rol']}")
+            print(f"   🆔 UID: {user.uid}")
+            print()
+        except auth.EmailAlreadyExistsError:
+            print(f"ℹ️  Usuario '{usuario['email']}' ya existe")
+            print(f"   📧 Email: {usuario['email']}")
+            print(f"   🔑 Password: {usuario['password']}")
+            print(f"   👤 Rol: {usuario['rol']}")
+            print()
+        except Exception as e:
+            print(f"❌ Error creando '{usuario['email']}': {str(e)}")
+            print()
+
+
+def print_credentials():
+    print("=" * 70)
+    print("✅ PROCESO COMPLETADO")
+    print("=" * 70)
+    print()
+    print("🔐 Credenciales para login:")
+    print()
+    print("ADMINISTRADOR:")
+    print("  Email: admin@paqueteria.com")
+    print("  Password: Admin123!")
+    print()
+    print("REPARTIDOR:")
+    print("  Email: repartidor@paqueteria.com")
+    print("  Password: Rep123!")
+    print()
+
+
+# ==============================================================================
+# ALTA MASIVA CON auth.import_users
+# ==============================================================================
+
+def uid_for_email(email):
+    """uid estable para un email: reimportar el mismo CSV actualiza la cuenta en vez de duplicarla."""
+    return uuid.uuid5(NAMESPACE_USUARIOS, email.strip().lower()).hex
+
+
+def read_users_file(path):
+    """Lee usuarios de un CSV con columnas email,password,display_name,rol[,uid]."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            email = row['email'].strip().lower()
+            yield {
+                'uid': (row.get('uid') or '').strip() or uid_for_email(email),
+                'email': email,
+                'password': row['password'],
+                'display_name': (row.get('display_name') or '').strip() or None,
+                'rol': (row.get('rol') or 'REPARTIDOR').strip().upper(),
+            }
+
+
+def hash_password(password, rounds=RONDAS_PBKDF2):
+    """Devuelve (hash, salt) en el formato que espera UserImportHash.pbkdf2_sha256."""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, rounds)
+    return digest, salt
+
+
+def to_import_record(usuario, rounds=RONDAS_PBKDF2):
+    auth = get_auth()
+    password_hash, password_salt = hash_password(usuario['password'], rounds)
+    claims = {'rol': usuario['rol']}
+    if usuario.get('tenant_id'):
+        claims['tenant_id'] = usuario['tenant_id']
+    return auth.ImportUserRecord(
+        uid=usuario['uid'],
+        email=usuario['email'],
+        display_name=usuario['display_name'],
+        password_hash=password_hash,
+        password_salt=password_salt,
+        custom_claims=claims,
+    )
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class RequestPacer:
+    """Espacia las llamadas para no superar `per_second` importaciones por segundo."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def import_users_bulk(usuarios_iter, chunk_size=MAX_USUARIOS_IMPORTACION, concurrency=4,
+                      imports_per_second=2.0, rounds=RONDAS_PBKDF2, pacer=None, latencies=None):
+    """
+    Importa usuarios en bloques concurrentes. Devuelve (importados, errores), donde
+    errores es una lista de (email, motivo) tomada del resultado de cada bloque.
+    `pacer` permite compartir un RequestPacer entre varias llamadas simultáneas.
+    Si se pasa la lista `latencies`, se le agrega la duración de cada import_users.
+    """
+    auth = get_auth()
+    hash_alg = auth.UserImportHash.pbkdf2_sha256(rounds=rounds)
+    pacer = pacer or RequestPacer(imports_per_second)
+    lock = threading.Lock()
+    imported = 0
+    errors = []
+
+    def send(chunk):
+        nonlocal imported
+        # Una fila que ImportUserRecord rechaza (email mal formado, ...) es un error
+        # de esa fila; el resto del bloque se importa igual
+        records = []
+        valid = []
+        for usuario in chunk:
+            try:
+                records.append(to_import_record(usuario, rounds))
+            except Exception as e:
+                with lock:
+                    errors.append((usuario.get('email'), str(e)))
+                continue
+            valid.append(usuario)
+        if not records:
+            return
+        pacer.wait()
+        start = time.perf_counter()
+        try:
+            result = auth.import_users(records, hash_alg=hash_alg)
+            if latencies is not None:
+                latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            with lock:
+                errors.extend((usuario['email'], str(e)) for usuario in valid)
+            return
+        with lock:
+            imported += result.success_count
+            errors.extend((valid[err.index]['email'], err.reason) for err in result.errors)
+            print(f"   ✓ Bloque de {len(chunk)}: {result.success_count} importados, "
+                  f"{result.failure_count + len(chunk) - len(valid)} con error")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Como mucho 2 bloques por hilo en cola para no leer todo el archivo a memoria
+        pending = threading.BoundedSemaphore(concurrency * 2)
+
+        def release(_future):
+            pending.release()
+
+        futures = []
+        for chunk in chunked(usuarios_iter, chunk_size):
+            pending.acquire()
+            future = executor.submit(send, chunk)
+            future.add_done_callback(release)
+            futures.append(future)
+
+    # Un error inesperado en un bloque no puede perderse en silencio
+    for future in futures:
+        future.result()
+    return imported, errors
+
+
+def create_users_bulk(path, concurrency, imports_per_second, rounds):
+    print("=" * 70)
+    print("🔐 IMPORTACIÓN MASIVA DE USUARIOS EN FIREBASE AUTHENTICATION")
+    print("=" * 70)
+    print()
+
+    start = time.perf_counter()
+    imported, errors = import_users_bulk(read_users_file(path), concurrency=concurrency,
+                                         imports_per_second=imports_per_second, rounds=rounds)
+    elapsed = time.perf_counter() - start
+
+    print()
+    print(f"✅ {imported} usuarios importados en {elapsed:.2f}s")
+    if errors:
+        print(f"❌ {len(errors)} usuarios con error:")
+        for email, reason in errors:
+            print(f"   - {email}: {reason}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crea usuarios en Firebase Authentication')
+    parser.add_argument('--archivo', help='CSV con los usuarios a importar en bloque')
+    parser.add_argument('--concurrencia', type=int, default=4,
+                        help='Bloques de importación en paralelo (por defecto: 4)')
+    parser.add_argument('--bloques-por-segundo', type=float, default=2.0,
+                        help='Máximo de llamadas a import_users por segundo (por defecto: 2)')
+    parser.add_argument('--rondas', type=int, default=RONDAS_PBKDF2,
+                        help=f'Rondas de PBKDF2-SHA256 (por defecto: {RONDAS_PBKDF2})')
+    args = parser.parse_args()
+
+    if args.archivo:
+        create_users_bulk(args.archivo, args.concurrencia, args.bloques_por_segundo, args.rondas)
+    else:
+        create_users()
+        print_credentials()
 
 
+if __name__ == "__main__":
+    main()
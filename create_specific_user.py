@@ -1,20 +1,20 @@
-import firebase_admin
-from firebase_admin import credentials, auth
-import os
+from firebase_client import get_auth
 
-SERVICE_ACCOUNT_KEY_PATH = 'paqueteria-web-app-firebase-adminsdk-fbsvc-5846fb7c81.json'
 
-try:
-    cred = credentials.Certificate(SERVICE_ACCOUNT_KEY_PATH)
-    firebase_admin.initialize_app(cred)
-    print("🔥 Conectando a Firebase Admin SDK...")
-    print("✅ Conexión exitosa!")
-except Exception as e:
-    print(f"❌ Error al inicializar Firebase Admin SDK: {e}")
-    print("Asegúrate de que el archivo de clave privada esté en la raíz del proyecto y sea correcto.")
-    exit()
+def connect():
+    try:
+        auth = get_auth()
+        print("🔥 Conectando a Firebase Admin SDK...")
+        print("✅ Conexión exitosa!")
+        return auth
+    except Exception as e:
+        print(f"❌ Error al inicializar Firebase Admin SDK: {e}")
+        print("Asegúrate de que el archivo de clave privada esté en la raíz del proyecto y sea correcto.")
+        exit()
+
 
 def create_specific_user():
+    auth = connect()
     print("======================================================================")
     print("🔐 CREANDO USUARIO ESPECÍFICO EN FIREBASE AUTHENTICATION")
     print("======================================================================")
@@ -1,21 +1,36 @@
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
-import os
-
-SERVICE_ACCOUNT_KEY_PATH = 'paqueteria-web-app-firebase-adminsdk-fbsvc-5846fb7c81.json'
-
-try:
-    cred = credentials.Certificate(SERVICE_ACCOUNT_KEY_PATH)
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
-    print("🔥 Conectando a Firebase...")
-    print("✅ Conexión exitosa!")
-except Exception as e:
-    print(f"❌ Error al inicializar Firebase: {e}")
-    print("Asegúrate de que el archivo de clave privada esté en la raíz del proyecto y sea correcto.")
-    exit()
+import argparse
+import asyncio
+
+from firebase_client import get_async_db, get_auth, get_db
+
+
+def connect(use_async=False):
+    try:
+        db = get_async_db() if use_async else get_db()
+        auth = get_auth()
+        print("🔥 Conectando a Firebase...")
+        print("✅ Conexión exitosa!")
+        return db, auth
+    except Exception as e:
+        print(f"❌ Error al inicializar Firebase: {e}")
+        print("Asegúrate de que el archivo de clave privada esté en la raíz del proyecto y sea correcto.")
+        exit()
+
+
+def build_user_profile(email, nombre, rol):
+    from firebase_admin import firestore
+
+    return {
+        'email': email,
+        'nombre': nombre,
+        'rol': rol,
+        'createdAt': firestore.SERVER_TIMESTAMP,
+        'updatedAt': firestore.SERVER_TIMESTAMP,
+    }
+
 
 def create_user_profile():
+    db, auth = connect()
     print("======================================================================")
     print("👤 CREANDO PERFIL DE USUARIO EN FIRESTORE")
     print("======================================================================")
@@ -26,26 +41,53 @@ def create_user_profile():
         print(f"✅ Usuario encontrado: {user.email} (UID: {user.uid})")
         
         # Crear perfil en Firestore
-        user_profile = {
-            'email': 'admin@paqueteria.com',
-            'nombre': 'Administrador Principal',
-            'rol': 'ADMINISTRADOR',
-            'createdAt': firestore.SERVER_TIMESTAMP,
-            'updatedAt': firestore.SERVER_TIMESTAMP,
-        }
+        user_profile = build_user_profile('admin@paqueteria.com', 'Administrador Principal',
+                                          'ADMINISTRADOR')
         
         # Guardar en Firestore
         db.collection('usuarios').document(user.uid).set(user_profile)
-        print(f"✅ Perfil creado en Firestore para {user.email}")
-        print(f"   👤 Nombre: {user_profile['nombre']}")
-        print(f"   🔑 Rol: {user_profile['rol']}")
-        print(f"   🆔 UID: {user.uid}")
+        print_profile(user, user_profile)
         
     except Exception as e:
         print(f"❌ Error creando perfil: {e}")
 
+
+async def create_user_profile_async():
+    """Mismo flujo con firestore.AsyncClient; Auth no tiene API asíncrona y va en un hilo."""
+    db, auth = connect(use_async=True)
+    print("======================================================================")
+    print("👤 CREANDO PERFIL DE USUARIO EN FIRESTORE (asyncio)")
+    print("======================================================================")
+
+    try:
+        user = await asyncio.to_thread(auth.get_user_by_email, 'admin@paqueteria.com')
+        print(f"✅ Usuario encontrado: {user.email} (UID: {user.uid})")
+        user_profile = build_user_profile('admin@paqueteria.com', 'Administrador Principal',
+                                          'ADMINISTRADOR')
+        await db.collection('usuarios').document(user.uid).set(user_profile)
+        print_profile(user, user_profile)
+    except Exception as e:
+        print(f"❌ Error creando perfil: {e}")
+
+
+def print_profile(user, user_profile):
+    print(f"✅ Perfil creado en Firestore para {user.email}")
+    print(f"   👤 Nombre: {user_profile['nombre']}")
+    print(f"   🔑 Rol: {user_profile['rol']}")
+    print(f"   🆔 UID: {user.uid}")
+
+
 if __name__ == "__main__":
-    create_user_profile()
+    parser = argparse.ArgumentParser(description='Crea el perfil del administrador en Firestore')
+    parser.add_argument('--motor', choices=('sync', 'async'), default='sync',
+                        help='sync o async (firestore.AsyncClient)')
+    args = parser.parse_args()
+    if args.motor == 'async':
+        from firestore_async import run
+
+        run(create_user_profile_async())
+    else:
+        create_user_profile()
     print("\n======================================================================")
     print("✅ PROCESO COMPLETADO")
     print("======================================================================")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Índice de deduplicación de emisores y receptores y re-enlace de órdenes.
+
+Las órdenes guardan emisorNombre/receptorNombre, teléfono y dirección como
+texto, sin referencia al documento del contacto, y cada re-siembra deja
+contactos casi duplicados. Este módulo:
+
+1. Carga emisores y receptores en un índice en memoria (ContactIndex) con
+   claves normalizadas: RUT, email, teléfono (últimos 8 dígitos) y nombre
+   (sin tildes, mayúsculas ni signos). Si varios contactos comparten RUT,
+   email o teléfono, el primero en orden de ID es el canónico y los demás
+   se marcan con duplicadoDe.
+2. Recorre 'ordenes' una sola vez por páginas, resuelve cada orden contra
+   el índice (clave exacta y, si no hay, nombre aproximado con difflib
+   entre los nombres que empiezan igual) y escribe emisorId/receptorId por
+   lotes, solo en las órdenes donde cambian.
+
+Después, la app y los scripts pueden buscar por ID en lugar de comparar
+cadenas.
+
+Uso:
+    python3 dedup_contactos.py --simular
+    python3 dedup_contactos.py [--modo lote] [--umbral 0.88]
+"""
+
+import argparse
+import difflib
+import re
+import unicodedata
+from collections import defaultdict
+
+from firebase_client import get_db
+from firestore_batch import add_writer_arguments, make_writer
+from firestore_pages import iter_pages
+from firestore_upsert import normalize_email, normalize_rut
+
+# Similitud mínima (difflib) para aceptar un nombre aproximado
+UMBRAL_SIMILITUD = 0.88
+
+# Dígitos finales del teléfono que identifican la línea (sin prefijo de país)
+DIGITOS_TELEFONO = 8
+
+CAMPOS_CONTACTO = ('nombre', 'telefono', 'email', 'rut', 'duplicadoDe')
+
+# Prefijo de los campos de la orden para cada tipo de contacto
+PREFIJOS = {'emisores': 'emisor', 'receptores': 'receptor'}
+
+
+def normalize_phone(telefono):
+    digits = re.sub(r'\D', '', telefono or '')
+    return digits[-DIGITOS_TELEFONO:] if len(digits) >= DIGITOS_TELEFONO else None
+
+
+def normalize_name(nombre):
+    sin_tildes = unicodedata.normalize('NFKD', nombre or '').encode('ascii', 'ignore').decode()
+    return ' '.join(re.sub(r'[^a-z0-9 ]+', ' ', sin_tildes.lower()).split()) or None
+
+
+class ContactIndex:
+    """Contactos de una colección indexados por sus claves normalizadas."""
+
+    def __init__(self, threshold=UMBRAL_SIMILITUD):
+        self.threshold = threshold
+        self.keys = {}
+        self.duplicates = {}
+        # Nombres agrupados por sus dos primeras letras, para acotar difflib
+        self._names_by_prefix = defaultdict(list)
+        self._fuzzy_cache = {}
+
+    @staticmethod
+    def contact_keys(rut=None, email=None, telefono=None, nombre=None):
+        """Claves en orden de confianza: la primera que coincida decide."""
+        keys = []
+        if rut and normalize_rut(rut):
+            keys.append(('rut', normalize_rut(rut)))
+        if email:
+            keys.append(('email', normalize_email(email)))
+        if normalize_phone(telefono):
+            keys.append(('telefono', normalize_phone(telefono)))
+        if normalize_name(nombre):
+            keys.append(('nombre', normalize_name(nombre)))
+        return keys
+
+    def add(self, doc_id, data):
+        """
+        Agrega un contacto. Si otro ya tiene su RUT, email o teléfono, queda como
+        duplicado de ese; el nombre solo no basta (hay homónimos).
+        """
+        keys = self.contact_keys(data.get('rut'), data.get('email'),
+                                 data.get('telefono'), data.get('nombre'))
+        canonical = next((self.keys[key] for key in keys
+                          if key[0] != 'nombre' and key in self.keys), None)
+        if canonical is not None:
+            self.duplicates[doc_id] = canonical
+            doc_id = canonical
+        for key in keys:
+            if key not in self.keys:
+                self.keys[key] = doc_id
+                if key[0] == 'nombre':
+                    self._names_by_prefix[key[1][:2]].append(key[1])
+        self._fuzzy_cache.clear()
+        return doc_id
+
+    def resolve(self, rut=None, email=None, telefono=None, nombre=None):
+        """ID canónico del contacto o None."""
+        for key in self.contact_keys(rut, email, telefono, nombre):
+            if key in self.keys:
+                return self.keys[key]
+        name = normalize_name(nombre)
+        if not name:
+            return None
+        if name not in self._fuzzy_cache:
+            match = difflib.get_close_matches(name, self._names_by_prefix.get(name[:2], ()),
+                                              n=1, cutoff=self.threshold)
+            self._fuzzy_cache[name] = self.keys[('nombre', match[0])] if match else None
+        return self._fuzzy_cache[name]
+
+    def __len__(self):
+        return len(set(self.keys.values()))
+
+
+def link_order(orden, emisores, receptores):
+    """{'emisorId': ..., 'receptorId': ...} con los contactos que se pudieron resolver."""
+    links = {}
+    for prefijo, index in (('emisor', emisores), ('receptor', receptores)):
+        doc_id = index.resolve(orden.get(f'{prefijo}Rut'), orden.get(f'{prefijo}Email'),
+                               orden.get(f'{prefijo}Telefono'), orden.get(f'{prefijo}Nombre'))
+        if doc_id:
+            links[f'{prefijo}Id'] = doc_id
+    return links
+
+
+def with_contact_ids(ordenes, emisores, receptores):
+    """Copia de cada orden con los emisorId/receptorId que se pudieron resolver."""
+    for orden in ordenes:
+        yield {**orden, **link_order(orden, emisores, receptores)}
+
+
+def load_index(db, collection_name, threshold=UMBRAL_SIMILITUD, page_size=1000):
+    """Índice de una colección de contactos (solo los campos de las claves)."""
+    index = ContactIndex(threshold)
+    marked = {}
+    for page in iter_pages(db.collection(collection_name), page_size, fields=CAMPOS_CONTACTO):
+        for snapshot in page:
+            data = snapshot.to_dict() or {}
+            index.add(snapshot.id, data)
+            marked[snapshot.id] = data.get('duplicadoDe')
+    return index, marked
+
+
+def _order_fields():
+    fields = ['emisorId', 'receptorId']
+    for prefijo in PREFIJOS.values():
+        fields += [f'{prefijo}{campo}' for campo in ('Nombre', 'Telefono', 'Email', 'Rut')]
+    return fields
+
+
+def relink_orders(db, writer, emisores, receptores, page_size=1000):
+    """Una pasada por 'ordenes'; devuelve (revisadas, actualizadas, sin_resolver)."""
+    revisadas = actualizadas = sin_resolver = 0
+    for page in iter_pages(db.collection('ordenes'), page_size, fields=_order_fields()):
+        for snapshot in page:
+            orden = snapshot.to_dict() or {}
+            links = link_order(orden, emisores, receptores)
+            revisadas += 1
+            if len(links) < 2:
+                sin_resolver += 1
+            changed = {k: v for k, v in links.items() if orden.get(k) != v}
+            if changed:
+                actualizadas += 1
+                if writer:
+                    writer.set(snapshot.reference, changed, merge=True)
+        print(f"   … {revisadas} órdenes revisadas, {actualizadas} con enlaces nuevos")
+    return revisadas, actualizadas, sin_resolver
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deduplica contactos y enlaza órdenes por ID')
+    add_writer_arguments(parser)
+    parser.set_defaults(modo='lote')
+    parser.add_argument('--umbral', type=float, default=UMBRAL_SIMILITUD,
+                        help=f'Similitud mínima para nombres aproximados (por defecto: {UMBRAL_SIMILITUD})')
+    parser.add_argument('--pagina', type=int, default=1000)
+    parser.add_argument('--simular', action='store_true',
+                        help='Solo informar, sin escribir')
+    args = parser.parse_args()
+
+    db = get_db()
+    print("=" * 70)
+    print(f"🔗 DEDUPLICACIÓN DE CONTACTOS Y ENLACE DE ÓRDENES"
+          f"{' (simulación)' if args.simular else ''}")
+    print("=" * 70)
+
+    indices = {}
+    for name in PREFIJOS:
+        index, marked = load_index(db, name, args.umbral, args.pagina)
+        indices[name] = (index, marked)
+        print(f"   ✓ '{name}': {len(index)} contactos únicos, {len(index.duplicates)} duplicados")
+
+    writer = None if args.simular else make_writer(db, args.modo, args.en_vuelo,
+                                                    rate_limit=not args.sin_limite)
+    try:
+        for name, (index, marked) in indices.items():
+            for doc_id, canonical in index.duplicates.items():
+                if writer and marked.get(doc_id) != canonical:
+                    writer.set(db.collection(name).document(doc_id),
+                               {'duplicadoDe': canonical}, merge=True)
+        revisadas, actualizadas, sin_resolver = relink_orders(
+            db, writer, indices['emisores'][0], indices['receptores'][0], args.pagina)
+    finally:
+        if writer:
+            writer.close()
+
+    print()
+    print(f"✅ {revisadas} órdenes revisadas: {actualizadas} enlazadas de nuevo, "
+          f"{sin_resolver} con algún contacto sin resolver")
+    if writer:
+        writer.stats.print_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Exportación / respaldo por streaming de colecciones de Firestore.
+
+Recorre ordenes, emisores, receptores y usuarios por páginas con máscara de
+campos y escribe cada colección en NDJSON comprimido (gzip) o en Parquet con
+grupos de filas de tamaño fijo. estadoHistorial se aplana en una tabla hija
+(ordenes_historial) con una fila por cambio de estado. En memoria solo hay
+una página de Firestore y un grupo de filas, sea cual sea el tamaño de la
+colección.
+
+Exportación incremental: para cada colección se guarda una marca de agua
+por campo de fecha (fechaCreacion o createdAt para lo creado, updatedAt para
+lo modificado) con el último valor y el último ID exportados. La siguiente
+ejecución consulta ordenando por ese campo y empieza justo después de la
+marca, así que solo lee lo que cambió. Un documento creado y modificado
+después de la marca puede aparecer dos veces; al restaurar gana la última
+fila con el mismo _id. Las marcas se guardan solo cuando todos los archivos
+de la ejecución quedaron escritos.
+
+Requiere pyarrow solo para --formato parquet (pip install pyarrow).
+
+Uso:
+    python3 export_firestore.py --destino respaldos                 # completo
+    python3 export_firestore.py --destino respaldos --incremental   # nocturno
+    python3 export_firestore.py --destino respaldos --formato parquet --filas 10000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime, timezone
+
+from firebase_client import get_db
+from firestore_pages import DOCUMENT_ID, iter_pages
+
+# Columnas exportadas por colección y su tipo; también es la máscara de campos
+ESQUEMAS = {
+    'ordenes': {
+        'numeroOrden': 'str', 'estado': 'str',
+        'emisorId': 'str', 'emisorNombre': 'str', 'emisorTelefono': 'str',
+        'emisorDireccion': 'str',
+        'receptorId': 'str', 'receptorNombre': 'str', 'receptorTelefono': 'str',
+        'receptorDireccion': 'str',
+        'provinciaDestino': 'str', 'municipioDestino': 'str', 'consejoPopularBatey': 'str',
+        'descripcion': 'str', 'notasAdicionales': 'str',
+        'fechaCreacion': 'str', 'fechaEstimadaEntrega': 'str', 'fechaEntrega': 'str',
+        'repartidorAsignado': 'str',
+        'peso': 'float', 'largo': 'float', 'ancho': 'float', 'alto': 'float',
+        'cantidadBultos': 'int', 'esUrgente': 'bool', 'fotoEntrega': 'str',
+        'requierePago': 'bool', 'montoCobrar': 'float', 'moneda': 'str',
+        'pagado': 'bool', 'fechaPago': 'str', 'notasPago': 'str',
+        'createdBy': 'str', 'activa': 'bool', 'createdAt': 'ts', 'updatedAt': 'ts',
+    },
+    'emisores': {
+        'nombre': 'str', 'telefono': 'str', 'direccion': 'str', 'email': 'str',
+        'rut': 'str', 'empresa': 'str', 'notas': 'str', 'activo': 'bool',
+        'createdAt': 'ts', 'updatedAt': 'ts',
+    },
+    'receptores': {
+        'nombre': 'str', 'telefono': 'str', 'direccion': 'str', 'email': 'str',
+        'rut': 'str', 'provincia': 'str', 'municipio': 'str',
+        'consejoPopularBatey': 'str', 'empresa': 'str', 'notas': 'str',
+        'activo': 'bool', 'createdAt': 'ts', 'updatedAt': 'ts',
+    },
+    'usuarios': {
+        'email': 'str', 'nombre': 'str', 'rol': 'str', 'activo': 'bool',
+        'telefono': 'str', 'createdAt': 'ts', 'updatedAt': 'ts',
+    },
+}
+
+ESQUEMA_HISTORIAL = {
+    'ordenId': 'str', 'numeroOrden': 'str', 'indice': 'int',
+    'estado': 'str', 'fecha': 'str', 'usuario': 'str',
+}
+
+# Campos de fecha que definen las marcas de agua de cada colección
+CAMPOS_MARCA = {
+    'ordenes': ('fechaCreacion', 'updatedAt'),
+    'emisores': ('createdAt', 'updatedAt'),
+    'receptores': ('createdAt', 'updatedAt'),
+    'usuarios': ('createdAt', 'updatedAt'),
+}
+
+FORMATOS = ('ndjson', 'parquet')
+ARCHIVO_MARCAS = 'marcas_exportacion.json'
+FILAS_POR_GRUPO = 5000
+
+
+def _convert(value, tipo):
+    if value is None:
+        return None
+    if tipo == 'ts':
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if isinstance(value, datetime) and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+    if tipo == 'str':
+        return value.isoformat() if isinstance(value, (datetime, date)) else str(value)
+    if tipo == 'float':
+        return float(value)
+    if tipo == 'int':
+        return int(value)
+    if tipo == 'bool':
+        return bool(value)
+    raise ValueError(f'Tipo de columna desconocido: {tipo}')
+
+
+def document_row(snapshot, schema):
+    data = snapshot.to_dict() or {}
+    row = {'_id': snapshot.id}
+    for field, tipo in schema.items():
+        row[field] = _convert(data.get(field), tipo)
+    return row
+
+
+def history_rows(snapshot):
+    """Una fila por evento de estadoHistorial, con el ID y el número de la orden."""
+    data = snapshot.to_dict() or {}
+    for indice, evento in enumerate(data.get('estadoHistorial') or ()):
+        yield {
+            'ordenId': snapshot.id,
+            'numeroOrden': data.get('numeroOrden'),
+            'indice': indice,
+            'estado': evento.get('estado'),
+            'fecha': _convert(evento.get('fecha'), 'str'),
+            'usuario': evento.get('usuario'),
+        }
+
+
+# ==============================================================================
+# SALIDAS
+# ==============================================================================
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Tipo no serializable: {type(value).__name__}')
+
+
+class NdjsonSink:
+    """Un objeto JSON por línea, comprimido con gzip a medida que se escribe."""
+
+    extension = 'ndjson.gz'
+
+    def __init__(self, path, schema, row_group_size=FILAS_POR_GRUPO):
+        self.path = path
+        self.rows = 0
+        self._file = gzip.open(f'{path}.tmp', 'wt', encoding='utf-8')
+
+    def add(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False, default=_json_default))
+        self._file.write('\n')
+        self.rows += 1
+
+    def close(self):
+        self._file.close()
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(f'{self.path}.tmp')
+
+
+class ParquetSink:
+    """Parquet comprimido con zstd; cada `row_group_size` filas se escribe un grupo."""
+
+    extension = 'parquet'
+
+    def __init__(self, path, schema, row_group_size=FILAS_POR_GRUPO):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tipos = {'str': pa.string(), 'float': pa.float64(), 'int': pa.int64(),
+                 'bool': pa.bool_(), 'ts': pa.timestamp('us', tz='UTC')}
+        self._pa = pa
+        self.path = path
+        self.rows = 0
+        self.row_group_size = row_group_size
+        self.schema = pa.schema([(name, tipos[tipo]) for name, tipo in schema.items()])
+        self._columns = {name: [] for name in self.schema.names}
+        self._buffered = 0
+        self._writer = pq.ParquetWriter(f'{path}.tmp', self.schema, compression='zstd')
+
+    def add(self, row):
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        self.rows += 1
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self._write_group()
+
+    def _write_group(self):
+        if self._buffered:
+            table = self._pa.Table.from_pydict(self._columns, schema=self.schema)
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        for values in self._columns.values():
+            values.clear()
+        self._buffered = 0
+
+    def close(self):
+        self._write_group()
+        self._writer.close()
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def abort(self):
+        self._writer.close()
+        os.remove(f'{self.path}.tmp')
+
+
+SALIDAS = {'ndjson': NdjsonSink, 'parquet': ParquetSink}
+
+
+# ==============================================================================
+# MARCAS DE AGUA
+# ==============================================================================
+
+def _encode_mark(value):
+    if isinstance(value, datetime):
+        return {'ts': value.isoformat()}
+    return {'str': value}
+
+
+def _decode_mark(encoded):
+    if 'ts' in encoded:
+        return datetime.fromisoformat(encoded['ts'])
+    return encoded['str']
+
+
+class Watermarks:
+    """Último (valor, ID) exportado por colección y campo, persistido en JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self._data = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._data = json.load(f)
+
+    def get(self, collection, field):
+        mark = self._data.get(collection, {}).get(field)
+        if not mark:
+            return None
+        return _decode_mark(mark['valor']), mark['ultimo_id']
+
+    def set(self, collection, field, value, last_id):
+        self._data.setdefault(collection, {})[field] = {
+            'valor': _encode_mark(value), 'ultimo_id': last_id}
+
+    def save(self):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def _after(mark, other):
+    """True si la marca (valor, ID) va después de `other` en el orden de Firestore."""
+    if other is None:
+        return True
+    # Firestore ordena primero por tipo: las cadenas van después de las fechas
+    return (isinstance(mark[0], str), mark[0], mark[1]) > \
+        (isinstance(other[0], str), other[0], other[1])
+
+
+# ==============================================================================
+# EXPORTACIÓN
+# ==============================================================================
+
+def iter_pages_since(collection, field, page_size, mark=None, fields=None):
+    """
+    Páginas ordenadas por (field, ID) a partir de la marca (valor, ID).
+    Los documentos sin `field` no aparecen: Firestore los excluye al ordenar.
+    """
+    while True:
+        query = collection.order_by(field).order_by(DOCUMENT_ID).limit(page_size)
+        if fields is not None:
+            query = query.select(list(fields))
+        if mark:
+            value, last_id = mark
+            query = query.start_after({field: value, DOCUMENT_ID: collection.document(last_id)})
+        page = list(query.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+        mark = (last.get(field), last.id)
+
+
+def export_collection(db, name, sinks, watermarks, page_size=1000, incremental=False):
+    """
+    Escribe `name` en sinks['documentos'] (y el historial en sinks['historial'])
+    y actualiza en memoria las marcas de agua. Devuelve los documentos leídos.
+    """
+    schema = ESQUEMAS[name]
+    mark_fields = CAMPOS_MARCA[name]
+    fields = sorted(set(schema) | ({'estadoHistorial'} if 'historial' in sinks else set()))
+    collection = db.collection(name)
+    latest = {field: watermarks.get(name, field) for field in mark_fields}
+    read = 0
+
+    def consume(page):
+        nonlocal read
+        for snapshot in page:
+            sinks['documentos'].add(document_row(snapshot, schema))
+            if 'historial' in sinks:
+                for row in history_rows(snapshot):
+                    sinks['historial'].add(row)
+            for field in mark_fields:
+                value = (snapshot.to_dict() or {}).get(field)
+                if value is None:
+                    continue
+                if _after((value, snapshot.id), latest[field]):
+                    latest[field] = (value, snapshot.id)
+        read += len(page)
+
+    if incremental:
+        for field in mark_fields:
+            for page in iter_pages_since(collection, field, page_size,
+                                         watermarks.get(name, field), fields):
+                consume(page)
+    else:
+        for page in iter_pages(collection, page_size, fields=fields):
+            consume(page)
+
+    for field, mark in latest.items():
+        if mark:
+            watermarks.set(name, field, *mark)
+    return read
+
+
+def _schema_with_id(schema):
+    return {'_id': 'str', **schema}
+
+
+def export_all(db, destination, collections, fmt='ndjson', page_size=1000,
+               row_group_size=FILAS_POR_GRUPO, incremental=False):
+    """
+    Exporta `collections` a una carpeta nueva dentro de `destination` y
+    devuelve {archivo: filas}. Las marcas de agua se guardan al final.
+    """
+    sink_class = SALIDAS[fmt]
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    run_dir = os.path.join(destination, f"{'incremental' if incremental else 'completo'}-{stamp}")
+    os.makedirs(run_dir, exist_ok=True)
+    watermarks = Watermarks(os.path.join(destination, ARCHIVO_MARCAS))
+    summary = {}
+
+    for name in collections:
+        start = time.perf_counter()
+        path = os.path.join(run_dir, f'{name}.{sink_class.extension}')
+        sinks = {'documentos': sink_class(path, _schema_with_id(ESQUEMAS[name]), row_group_size)}
+        if name == 'ordenes':
+            history_path = os.path.join(run_dir, f'ordenes_historial.{sink_class.extension}')
+            sinks['historial'] = sink_class(history_path, ESQUEMA_HISTORIAL, row_group_size)
+        try:
+            read = export_collection(db, name, sinks, watermarks, page_size, incremental)
+        except BaseException:
+            # Sin archivos a medias ni marcas nuevas: la próxima ejecución repite esta
+            for sink in sinks.values():
+                sink.abort()
+            raise
+        for sink in sinks.values():
+            sink.close()
+        for sink in sinks.values():
+            summary[os.path.basename(sink.path)] = sink.rows
+        print(f"   ✓ '{name}': {read} documentos en {time.perf_counter() - start:.2f}s")
+
+    watermarks.save()
+    return run_dir, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta colecciones de Firestore a NDJSON o Parquet')
+    parser.add_argument('--destino', default='respaldos',
+                        help='Carpeta de los respaldos y de las marcas de agua')
+    parser.add_argument('--colecciones', default=','.join(ESQUEMAS),
+                        help='Colecciones a exportar (por defecto: todas)')
+    parser.add_argument('--formato', choices=FORMATOS, default='ndjson')
+    parser.add_argument('--pagina', type=int, default=1000,
+                        help='Documentos por consulta (por defecto: 1000)')
+    parser.add_argument('--filas', type=int, default=FILAS_POR_GRUPO,
+                        help=f'Filas por grupo de Parquet (por defecto: {FILAS_POR_GRUPO})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Exportar solo lo creado o modificado desde la última marca de agua')
+    args = parser.parse_args()
+
+    collections = [c.strip() for c in args.colecciones.split(',') if c.strip()]
+    unknown = [c for c in collections if c not in ESQUEMAS]
+    if unknown:
+        parser.error(f"Colecciones sin esquema: {', '.join(unknown)}")
+
+    print("=" * 70)
+    print(f"💾 EXPORTACIÓN DE FIRESTORE ({'incremental' if args.incremental else 'completa'}, "
+          f"{args.formato})")
+    print("=" * 70)
+    run_dir, summary = export_all(get_db(), args.destino, collections, args.formato,
+                                  args.pagina, args.filas, args.incremental)
+    print()
+    print(f"✅ Respaldo en {run_dir}")
+    for archivo, filas in summary.items():
+        print(f"   - {archivo}: {filas} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Cliente compartido de Firebase para los scripts de administración.
+
+La app de Firebase Admin, el cliente de Firestore y el módulo de Auth se
+crean la primera vez que se piden y se reutilizan durante todo el proceso.
+Los imports pesados (firebase_admin, google-auth y sobre todo
+google-cloud-firestore con gRPC) también se hacen en ese momento, así que un
+script que solo usa Auth nunca carga Firestore ni gRPC, y un --help no carga
+nada de Firebase.
+
+Si FIRESTORE_EMULATOR_HOST o FIREBASE_AUTH_EMULATOR_HOST están definidas se
+usan credenciales anónimas y el proyecto de GCLOUD_PROJECT.
+
+Caché del token de acceso: con el service account, cada proceso tenía que
+leer la clave privada y pedir un token OAuth a Google antes de su primera
+llamada, aun cuando el proceso anterior (cron, un bucle de shell) acababa de
+pedir uno que sigue vigente casi una hora. El token se guarda en
+CARPETA_CACHE_TOKENS (FIREBASE_TOKEN_CACHE_DIR, por defecto
+~/.cache/paqueteria-admin; un archivo por service account, permisos 0600 en
+una carpeta 0700) y los procesos siguientes lo reutilizan hasta
+MARGEN_TOKEN segundos antes de que expire; solo entonces se lee la clave y
+se pide uno nuevo. Si la carpeta o el archivo son de otro usuario o tienen
+permisos para otros, la caché no se usa. FIREBASE_TOKEN_CACHE=off la
+desactiva.
+
+Uso:
+    from firebase_client import get_async_db, get_auth, get_db
+
+    db = get_db()
+    auth = get_auth()
+    async_db = get_async_db()   # motor asyncio
+
+Medir el costo de arranque (imports) antes y después:
+    python3 firebase_client.py --medir-arranque
+
+Medir el tiempo hasta la primera llamada, con y sin la caché del token:
+    python3 firebase_client.py --medir-primer-rpc
+"""
+
+import os
+import threading
+
+SERVICE_ACCOUNT_KEY_PATH = os.environ.get(
+    'FIREBASE_SERVICE_ACCOUNT',
+    'paqueteria-web-app-firebase-adminsdk-fbsvc-5846fb7c81.json')
+
+PROYECTO_EMULADOR = 'demo-paqueteria'
+
+CACHE_TOKENS = os.environ.get('FIREBASE_TOKEN_CACHE', 'on')
+CARPETA_CACHE_TOKENS = os.environ.get(
+    'FIREBASE_TOKEN_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'paqueteria-admin'))
+# Segundos antes de la expiración en que un token guardado deja de reutilizarse
+MARGEN_TOKEN = 300
+# Scopes que firebase_admin.credentials.Certificate pide para el service account
+SCOPES_FIREBASE = (
+    'https://www.googleapis.com/auth/cloud-platform',
+    'https://www.googleapis.com/auth/datastore',
+    'https://www.googleapis.com/auth/devstorage.read_write',
+    'https://www.googleapis.com/auth/firebase',
+    'https://www.googleapis.com/auth/identitytoolkit',
+    'https://www.googleapis.com/auth/userinfo.email',
+)
+
+_lock = threading.RLock()
+_app = None
+_db = None
+_async_db = None
+
+
+def using_emulators():
+    return bool(os.environ.get('FIRESTORE_EMULATOR_HOST')
+                or os.environ.get('FIREBASE_AUTH_EMULATOR_HOST'))
+
+
+def token_cache_enabled():
+    return CACHE_TOKENS.strip().lower() not in ('', 'off', '0', 'no')
+
+
+def token_cache_path(info, scopes):
+    """Archivo de caché del token para un service account y unos scopes."""
+    import hashlib
+
+    key = '|'.join([info.get('client_email', ''), info.get('token_uri', ''), *sorted(scopes)])
+    return os.path.join(CARPETA_CACHE_TOKENS,
+                        f"token_{hashlib.sha256(key.encode()).hexdigest()[:16]}.json")
+
+
+def _private(stat):
+    """Si es del usuario actual y sin permisos para el grupo ni para otros."""
+    return not stat.st_mode & 0o077 and (not hasattr(os, 'getuid') or stat.st_uid == os.getuid())
+
+
+def cache_dir_ok(folder):
+    """Si la carpeta de la caché es un directorio real (no enlace) y privado."""
+    import stat as stat_module
+
+    try:
+        stat = os.lstat(folder)
+    except OSError:
+        return False
+    return stat_module.S_ISDIR(stat.st_mode) and _private(stat)
+
+
+def read_cached_token(path):
+    """(token, expiry) si el archivo es seguro y al token le queda más de MARGEN_TOKEN; si no, None."""
+    import json
+    import time
+    from datetime import datetime, timezone
+
+    if not cache_dir_ok(os.path.dirname(path)):
+        return None
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+    except OSError:
+        return None
+    with os.fdopen(fd, encoding='utf-8') as f:
+        if not _private(os.fstat(f.fileno())):
+            return None
+        try:
+            data = json.load(f)
+            token, expires_at = data['token'], float(data['expira'])
+        except (ValueError, KeyError, TypeError):
+            return None
+    if expires_at - time.time() <= MARGEN_TOKEN:
+        return None
+    # google-auth compara con datetimes UTC sin zona horaria
+    return token, datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None)
+
+
+def write_cached_token(path, token, expiry):
+    """
+    Guarda el token (escritura atómica, 0600). Si no se puede, o la carpeta ya
+    existía con permisos para otros, se sigue sin caché.
+    """
+    import json
+    from datetime import timezone
+
+    folder = os.path.dirname(path)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        # makedirs no cambia los permisos de una carpeta que ya existe
+        os.makedirs(folder, mode=0o700, exist_ok=True)
+        if not cache_dir_ok(folder):
+            return
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_NOFOLLOW', 0),
+                     0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'token': token,
+                       'expira': expiry.replace(tzinfo=timezone.utc).timestamp()}, f)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _cached_certificate(key_path):
+    """
+    Credencial del service account (como credentials.Certificate) cuyo token
+    de acceso se comparte entre procesos por un archivo. La clave privada (lo
+    caro de leer el JSON) solo se carga si hay que pedir un token nuevo o
+    firmar algo, como los custom tokens de Auth.
+    """
+    import json
+
+    from firebase_admin import credentials
+    from google.auth import credentials as google_credentials
+
+    with open(key_path, encoding='utf-8') as f:
+        info = json.load(f)
+    if info.get('type') != 'service_account':
+        return credentials.Certificate(info)  # mismo error que sin caché
+    scopes = list(SCOPES_FIREBASE)
+    cache_path = token_cache_path(info, scopes)
+    service_account_lock = threading.Lock()
+    service_account = None
+
+    def load_service_account():
+        nonlocal service_account
+        if service_account is None:
+            with service_account_lock:
+                if service_account is None:
+                    from google.oauth2 import service_account as google_service_account
+
+                    service_account = (google_service_account.Credentials
+                                       .from_service_account_info(info, scopes=scopes))
+        return service_account
+
+    class CachedToken(google_credentials.Credentials, google_credentials.Signing):
+        """
+        Token del service account: primero el del archivo, si no uno nuevo que
+        se guarda. Firma (custom tokens de Auth) con la clave del service account.
+        """
+
+        def __init__(self):
+            super().__init__()
+            cached = read_cached_token(cache_path)
+            if cached:
+                self.token, self.expiry = cached
+
+        def refresh(self, request):
+            cached = read_cached_token(cache_path)
+            if cached:
+                self.token, self.expiry = cached
+                return
+            credential = load_service_account()
+            credential.refresh(request)
+            self.token, self.expiry = credential.token, credential.expiry
+            write_cached_token(cache_path, self.token, self.expiry)
+
+        def sign_bytes(self, message):
+            return load_service_account().sign_bytes(message)
+
+        @property
+        def signer(self):
+            return load_service_account().signer
+
+        @property
+        def signer_email(self):
+            return info.get('client_email')
+
+    class CachedCertificate(credentials.Base):
+        def __init__(self):
+            self._token = CachedToken()
+
+        @property
+        def project_id(self):
+            return info.get('project_id')
+
+        def get_credential(self):
+            return self._token
+
+    return CachedCertificate()
+
+
+def _make_credential():
+    from firebase_admin import credentials
+
+    if using_emulators():
+        class EmulatorCredential(credentials.Base):
+            """Los emuladores no validan tokens; evita buscar credenciales reales."""
+
+            def get_credential(self):
+                from google.auth.credentials import AnonymousCredentials
+                return AnonymousCredentials()
+
+        return EmulatorCredential()
+    if token_cache_enabled():
+        return _cached_certificate(SERVICE_ACCOUNT_KEY_PATH)
+    return credentials.Certificate(SERVICE_ACCOUNT_KEY_PATH)
+
+
+def get_app():
+    """Inicializa (una sola vez) y devuelve la app por defecto de Firebase Admin."""
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                import firebase_admin
+
+                options = None
+                if using_emulators():
+                    options = {'projectId': os.environ.setdefault('GCLOUD_PROJECT',
+                                                                  PROYECTO_EMULADOR)}
+                _app = firebase_admin.initialize_app(_make_credential(), options)
+    return _app
+
+
+def get_db():
+    """Cliente de Firestore compartido. Es aquí donde se importa gRPC."""
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                from firebase_admin import firestore
+
+                _db = firestore.client(get_app())
+    return _db
+
+
+def get_async_db():
+    """Cliente asíncrono de Firestore (AsyncClient) compartido, para el motor asyncio."""
+    global _async_db
+    if _async_db is None:
+        with _lock:
+            if _async_db is None:
+                from firebase_admin import firestore_async
+
+                _async_db = firestore_async.client(get_app())
+    return _async_db
+
+
+def get_auth():
+    """Módulo firebase_admin.auth con la app ya inicializada (no carga Firestore)."""
+    get_app()
+    from firebase_admin import auth
+
+    return auth
+
+
+# ==============================================================================
+# MEDICIÓN DEL ARRANQUE
+# ==============================================================================
+
+# Lo que hacía cada script al importarse, antes de este módulo
+_IMPORTS_ANTES = 'import firebase_admin; from firebase_admin import credentials, firestore, auth'
+
+_IMPORTS_DESPUES = {
+    'solo argumentos (--help)': 'import firebase_client',
+    'script solo Auth': 'import firebase_client; import firebase_admin; from firebase_admin import credentials, auth',
+    'script con Firestore': _IMPORTS_ANTES,
+}
+
+
+def _median_import_ms(code, runs, env=None):
+    import statistics
+    import subprocess
+    import sys
+    import time
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=here, check=True,
+                       env=dict(os.environ, **env) if env else None)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure_startup(runs=7):
+    """Tiempo mediano de un proceso nuevo que hace solo los imports de cada caso."""
+    baseline = _median_import_ms('pass', runs)
+    before = _median_import_ms(_IMPORTS_ANTES, runs) - baseline
+    print(f"⏱️  Costo de imports en arranque en frío (mediana de {runs}, sin el intérprete):")
+    print(f"   Antes (todos los scripts):        {before:8.1f} ms")
+    for label, code in _IMPORTS_DESPUES.items():
+        after = _median_import_ms(code, runs) - baseline
+        print(f"   Después, {label + ':':<26}{after:8.1f} ms")
+
+
+# Primera llamada de un script solo Auth y de uno con Firestore
+_PRIMER_RPC = {
+    'Auth (list_users)': 'import firebase_client; '
+                         'firebase_client.get_auth().list_users(max_results=1)',
+    'Firestore (get)': 'import firebase_client; '
+                       "firebase_client.get_db().collection('configuracion').limit(1).get()",
+}
+
+
+def measure_first_rpc(runs=7):
+    """
+    Tiempo mediano de un proceso nuevo hasta terminar su primera llamada, sin
+    caché (clave + token nuevo en cada proceso) y con la caché ya llena.
+    Usa el service account real: no tiene sentido con emuladores.
+    """
+    import tempfile
+
+    if using_emulators():
+        print("❌ Con emuladores no se piden tokens: quitar FIRESTORE_EMULATOR_HOST y "
+              "FIREBASE_AUTH_EMULATOR_HOST")
+        return
+    print(f"⏱️  Tiempo hasta la primera llamada (mediana de {runs}, proceso completo):")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label, code in _PRIMER_RPC.items():
+            env = {'FIREBASE_TOKEN_CACHE': 'on', 'FIREBASE_TOKEN_CACHE_DIR': cache_dir}
+            without = _median_import_ms(code, runs, {'FIREBASE_TOKEN_CACHE': 'off'})
+            _median_import_ms(code, 1, env)  # llena la caché
+            cached = _median_import_ms(code, runs, env)
+            print(f"   {label + ':':<20} sin caché {without:8.1f} ms, con caché {cached:8.1f} ms "
+                  f"({without - cached:.1f} ms ahorrados)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Cliente compartido de Firebase')
+    parser.add_argument('--medir-arranque', action='store_true',
+                        help='Compara el costo de imports antes y después de la carga diferida')
+    parser.add_argument('--medir-primer-rpc', action='store_true',
+                        help='Compara el tiempo hasta la primera llamada con y sin caché del token')
+    parser.add_argument('--repeticiones', type=int, default=7)
+    args = parser.parse_args()
+    if args.medir_arranque:
+        measure_startup(args.repeticiones)
+    elif args.medir_primer_rpc:
+        measure_first_rpc(args.repeticiones)
+    else:
+        parser.print_help()
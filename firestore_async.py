@@ -0,0 +1,218 @@
+"""
+Motor asyncio para los scripts de Firestore (AsyncClient).
+
+Equivalentes asíncronos del escritor por lotes y del borrado masivo: las
+escrituras y los commits se lanzan como tareas y un semáforo limita cuántas
+RPC hay en vuelo. Si la ejecución se cancela (Ctrl-C), las tareas pendientes
+se cancelan y se esperan antes de salir. Con un AdaptiveRateLimiter los
+commits siguen la rampa 500/50/5 y se reintentan los errores transitorios.
+"""
+
+import asyncio
+import time
+
+from firestore_batch import MAX_OPERACIONES_LOTE, WriteStats, apply_operation, has_increment
+from firestore_delete import DeleteCheckpoint, PageTracker
+from firestore_ratelimit import call_with_retry_async
+from firestore_pages import collection_path, page_query
+
+CONCURRENCIA_POR_DEFECTO = 8
+
+
+class AsyncBatchWriter:
+    """
+    Agrupa operaciones en lotes de hasta 500 y confirma cada lote como una
+    tarea; como máximo `concurrency` commits a la vez.
+
+        async with AsyncBatchWriter(db) as writer:
+            await writer.add('ordenes', orden)
+    """
+
+    modo = 'async'
+
+    def __init__(self, db, concurrency=CONCURRENCIA_POR_DEFECTO, batch_size=MAX_OPERACIONES_LOTE,
+                 limiter=None):
+        if not 1 <= batch_size <= MAX_OPERACIONES_LOTE:
+            raise ValueError(f'batch_size debe estar entre 1 y {MAX_OPERACIONES_LOTE}')
+        self.db = db
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.stats = WriteStats(self.modo)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self._batch = None
+        self._pending = 0
+        self._idempotent = True
+
+    async def add(self, collection_name, data):
+        ref = self.db.collection(collection_name).document()
+        await self.set(ref, data)
+        return ref
+
+    async def set(self, ref, data, merge=False):
+        self._current().set(ref, data, merge=merge)
+        self._idempotent = self._idempotent and not has_increment(data)
+        await self._operation_added()
+
+    async def update(self, ref, data):
+        self._current().update(ref, data)
+        self._idempotent = self._idempotent and not has_increment(data)
+        await self._operation_added()
+
+    async def delete(self, ref):
+        self._current().delete(ref)
+        await self._operation_added()
+
+    async def write_group(self, operations):
+        """Agrega varias operaciones (ref, datos, merge) garantizando que vayan en el mismo lote."""
+        if len(operations) > self.batch_size:
+            raise ValueError(f'Un grupo de {len(operations)} operaciones no cabe en un lote '
+                             f'de {self.batch_size}')
+        if self._pending + len(operations) > self.batch_size:
+            await self.flush()
+        batch = self._current()
+        for operation in operations:
+            apply_operation(batch, operation)
+            self._idempotent = self._idempotent and not has_increment(operation[1])
+        self._pending += len(operations) - 1
+        await self._operation_added()
+
+    def _current(self):
+        if self._batch is None:
+            self._batch = self.db.batch()
+            self._pending = 0
+            self._idempotent = True
+        return self._batch
+
+    async def _operation_added(self):
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if self._batch is None or self._pending == 0:
+            return
+        batch, size, idempotent = self._batch, self._pending, self._idempotent
+        self._batch = None
+        self._pending = 0
+        # Espera turno antes de crear la tarea: así la memoria queda acotada
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._commit(batch, size, idempotent))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _commit(self, batch, size, idempotent=True):
+        try:
+            start = time.perf_counter()
+            if self.limiter is None:
+                await batch.commit()
+            else:
+                await call_with_retry_async(lambda: batch.commit(retry=None), self.limiter, size,
+                                            on_retry=self._retried, idempotent=idempotent)
+            self.stats.latencias.append(time.perf_counter() - start)
+            self.stats.documentos += size
+            self.stats.commits += 1
+        finally:
+            self._semaphore.release()
+
+    def _retried(self, exc):
+        self.stats.reintentos += 1
+
+    async def close(self):
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        self.stats.stop()
+        return self.stats
+
+    async def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.stats.stop()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            await self.cancel()
+        return False
+
+
+async def bulk_delete_collection_async(db, collection, page_size=MAX_OPERACIONES_LOTE,
+                                       concurrency=CONCURRENCIA_POR_DEFECTO, checkpoint=None,
+                                       limiter=None):
+    """
+    Versión asyncio de firestore_delete.bulk_delete_collection (sin subcolecciones).
+    Con `limiter` (AdaptiveRateLimiter) los commits respetan su ritmo y se
+    reintentan los errores transitorios.
+    """
+    if isinstance(collection, str):
+        collection = db.collection(collection)
+    checkpoint = checkpoint or DeleteCheckpoint()
+    path = collection_path(collection)
+    previous = checkpoint.get(path)
+    last_id = previous.get('ultimo_id')
+    tracker = PageTracker(checkpoint, path, previous.get('eliminados', 0))
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = []
+
+    async def commit(index, refs):
+        try:
+            batch = db.batch()
+            for ref in refs:
+                batch.delete(ref)
+            if limiter is None:
+                await batch.commit()
+            else:
+                await call_with_retry_async(lambda: batch.commit(retry=None), limiter, len(refs))
+            tracker.done(index, refs[-1].id, len(refs))
+        finally:
+            semaphore.release()
+
+    page_index = 0
+    try:
+        while True:
+            query = page_query(collection, page_size, last_id, fields=[])
+            refs = [snapshot.reference async for snapshot in query.stream()]
+            if not refs:
+                break
+            # Cortar en el primer commit fallido en vez de seguir paginando
+            pending = []
+            for task in tasks:
+                if task.done():
+                    task.result()
+                else:
+                    pending.append(task)
+            tasks[:] = pending
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(commit(page_index, refs)))
+            page_index += 1
+            last_id = refs[-1].id
+            if len(refs) < page_size:
+                break
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    checkpoint.finish(path)
+    return tracker.deleted
+
+
+def run(main_coro):
+    """
+    asyncio.run con salida limpia en Ctrl-C: asyncio cancela la tarea
+    principal, los escritores cancelan sus commits pendientes y se sale con 130.
+    """
+    try:
+        return asyncio.run(main_coro)
+    except KeyboardInterrupt:
+        print()
+        print("⛔ Cancelado por el usuario; las operaciones pendientes se cancelaron.")
+        raise SystemExit(130)
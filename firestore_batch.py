@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Escritores de Firestore para cargas masivas.
+
+Tres modos con la misma interfaz (set / add / update / delete / write_group / close):
+- individual: una llamada por documento (el bucle original de los scripts)
+- lote: agrupa hasta 500 operaciones por WriteBatch y mantiene varios
+  commits en vuelo a la vez
+- bulk: usa el BulkWriter del SDK de Firestore en modo paralelo
+
+Los modos individual y lote escriben al ritmo de un AdaptiveRateLimiter
+(regla 500/50/5 y backoff ante RESOURCE_EXHAUSTED y otros errores
+transitorios, ver firestore_ratelimit.py); bulk usa el limitador propio del
+SDK. Un error transitorio ya no corta la carga a mitad de camino. Los
+commits con firestore.Increment no se reenvían ante errores ambiguos (el
+commit pudo haberse aplicado y el contador se sumaría dos veces).
+
+Al cerrar, cada escritor devuelve estadísticas con documentos/segundo para
+poder comparar los modos.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from firestore_ratelimit import MAX_REINTENTOS, AdaptiveRateLimiter, call_with_retry
+
+# Límite de operaciones por commit impuesto por Firestore
+MAX_OPERACIONES_LOTE = 500
+
+MODOS_ESCRITURA = ('individual', 'lote', 'bulk')
+
+
+def has_increment(data):
+    """Si `data` lleva un firestore.Increment: reenviarlo tras un error ambiguo sumaría dos veces."""
+    if not data:
+        return False
+    for value in data.values():
+        if type(value).__name__ == 'Increment':
+            return True
+        if isinstance(value, dict) and has_increment(value):
+            return True
+    return False
+
+
+def apply_operation(batch, operation):
+    """Aplica una operación (ref, datos, merge) a un WriteBatch; datos None borra ref."""
+    ref, data, merge = operation
+    if data is None:
+        batch.delete(ref)
+    else:
+        batch.set(ref, data, merge=merge)
+
+
+class WriteStats:
+    """Contadores de una sesión de escritura."""
+
+    def __init__(self, modo):
+        self.modo = modo
+        self.documentos = 0
+        self.commits = 0
+        self.reintentos = 0
+        # Duración de cada RPC de escritura (por documento o por commit)
+        self.latencias = []
+        self.inicio = time.perf_counter()
+        self.fin = None
+
+    def stop(self):
+        if self.fin is None:
+            self.fin = time.perf_counter()
+
+    @property
+    def segundos(self):
+        fin = self.fin if self.fin is not None else time.perf_counter()
+        return fin - self.inicio
+
+    @property
+    def docs_por_segundo(self):
+        return self.documentos / self.segundos if self.segundos > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'modo': self.modo,
+            'documentos': self.documentos,
+            'commits': self.commits,
+            'reintentos': self.reintentos,
+            'segundos': round(self.segundos, 3),
+            'docs_por_segundo': round(self.docs_por_segundo, 1),
+        }
+
+    def print_summary(self):
+        print(f"⏱️  Modo '{self.modo}': {self.documentos} documentos en "
+              f"{self.segundos:.2f}s ({self.docs_por_segundo:.1f} docs/s, "
+              f"{self.commits} commits)")
+        if self.reintentos:
+            print(f"   ↻ {self.reintentos} reintentos por errores transitorios")
+
+
+class _BaseWriter:
+    modo = None
+
+    def __init__(self, db, limiter=None):
+        self.db = db
+        self.stats = WriteStats(self.modo)
+        self.limiter = limiter
+        # Con limitador, los reintentos son los suyos y no los del SDK
+        self._rpc = {'retry': None} if limiter else {}
+
+    def _retried(self, exc):
+        self.stats.reintentos += 1
+
+    def _write(self, fn, n=1, idempotent=True):
+        """Ejecuta una escritura de `n` operaciones al ritmo del limitador, con reintentos."""
+        if self.limiter is None:
+            return fn()
+        return call_with_retry(fn, self.limiter, n, on_retry=self._retried, idempotent=idempotent)
+
+    def add(self, collection_name, data):
+        """Equivalente a collection.add(): crea un documento con ID automático."""
+        ref = self.db.collection(collection_name).document()
+        self.set(ref, data)
+        return ref
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class SingleWriter(_BaseWriter):
+    """Una llamada RPC por documento, igual que los scripts originales."""
+
+    modo = 'individual'
+
+    def set(self, ref, data, merge=False):
+        start = time.perf_counter()
+        self._write(lambda: ref.set(data, merge=merge, **self._rpc),
+                    idempotent=not has_increment(data))
+        self._count(start)
+
+    def update(self, ref, data):
+        start = time.perf_counter()
+        self._write(lambda: ref.update(data, **self._rpc), idempotent=not has_increment(data))
+        self._count(start)
+
+    def delete(self, ref):
+        start = time.perf_counter()
+        self._write(lambda: ref.delete(**self._rpc))
+        self._count(start)
+
+    def write_group(self, operations):
+        """Escribe varias operaciones (ref, datos, merge) de forma atómica en un solo commit."""
+        start = time.perf_counter()
+        batch = self.db.batch()
+        for operation in operations:
+            apply_operation(batch, operation)
+        idempotent = not any(has_increment(data) for _, data, _ in operations)
+        self._write(lambda: batch.commit(**self._rpc), len(operations), idempotent)
+        self._count(start, len(operations))
+
+    def _count(self, start, documents=1):
+        self.stats.latencias.append(time.perf_counter() - start)
+        self.stats.documentos += documents
+        self.stats.commits += 1
+
+    def close(self):
+        self.stats.stop()
+        return self.stats
+
+
+class BatchWriter(_BaseWriter):
+    """
+    Agrupa las operaciones en WriteBatch de hasta 500 y los confirma en un
+    pool de hilos, con como máximo `max_in_flight` commits pendientes.
+    """
+
+    modo = 'lote'
+
+    def __init__(self, db, batch_size=MAX_OPERACIONES_LOTE, max_in_flight=4, limiter=None):
+        super().__init__(db, limiter)
+        if not 1 <= batch_size <= MAX_OPERACIONES_LOTE:
+            raise ValueError(f'batch_size debe estar entre 1 y {MAX_OPERACIONES_LOTE}')
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._futures = []
+        self._batch = None
+        self._pending = 0
+        self._idempotent = True
+
+    def set(self, ref, data, merge=False):
+        self._current().set(ref, data, merge=merge)
+        self._idempotent = self._idempotent and not has_increment(data)
+        self._operation_added()
+
+    def update(self, ref, data):
+        self._current().update(ref, data)
+        self._idempotent = self._idempotent and not has_increment(data)
+        self._operation_added()
+
+    def delete(self, ref):
+        self._current().delete(ref)
+        self._operation_added()
+
+    def write_group(self, operations):
+        """Agrega varias operaciones (ref, datos, merge) garantizando que vayan en el mismo lote."""
+        if len(operations) > self.batch_size:
+            raise ValueError(f'Un grupo de {len(operations)} operaciones no cabe en un lote '
+                             f'de {self.batch_size}')
+        if self._pending + len(operations) > self.batch_size:
+            self.flush()
+        batch = self._current()
+        for operation in operations:
+            apply_operation(batch, operation)
+            self._idempotent = self._idempotent and not has_increment(operation[1])
+        self._pending += len(operations) - 1
+        self._operation_added()
+
+    def _current(self):
+        if self._batch is None:
+            self._batch = self.db.batch()
+            self._pending = 0
+            self._idempotent = True
+        return self._batch
+
+    def _operation_added(self):
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Envía el lote actual sin esperar a que termine el commit."""
+        if self._batch is None or self._pending == 0:
+            return
+        batch, size, idempotent = self._batch, self._pending, self._idempotent
+        self._batch = None
+        self._pending = 0
+        # Bloquea si ya hay max_in_flight commits pendientes
+        self._slots.acquire()
+        self._futures.append(self._executor.submit(self._commit, batch, size, idempotent))
+
+    def _retried(self, exc):
+        with self._lock:
+            self.stats.reintentos += 1
+
+    def _commit(self, batch, size, idempotent=True):
+        try:
+            start = time.perf_counter()
+            self._write(lambda: batch.commit(**self._rpc), size, idempotent)
+            with self._lock:
+                self.stats.latencias.append(time.perf_counter() - start)
+                self.stats.documentos += size
+                self.stats.commits += 1
+        finally:
+            self._slots.release()
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self.stats.stop()
+        # Propagar el primer error de commit, si lo hubo
+        for future in self._futures:
+            future.result()
+        return self.stats
+
+
+class BulkWriter(_BaseWriter):
+    """
+    Envuelve el BulkWriter del SDK, que ya paraleliza y reintenta. Las
+    escrituras que fallan sin remedio se anotan y close() las propaga.
+    """
+
+    modo = 'bulk'
+
+    # Códigos gRPC transitorios: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED,
+    # INTERNAL, UNAVAILABLE. Sin idempotencia, solo los que no aplican nada.
+    CODIGOS_REINTENTABLES = frozenset({4, 8, 10, 13, 14})
+    CODIGOS_SIN_APLICAR = frozenset({8, 10})
+
+    def __init__(self, db):
+        super().__init__(db)
+        from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions, SendMode
+
+        self._writer = db.bulk_writer(options=BulkWriterOptions(mode=SendMode.parallel))
+        self._writer.on_write_result(self._on_result)
+        self._writer.on_batch_result(self._on_batch)
+        self._writer.on_write_error(self._on_error)
+        self._lock = threading.Lock()
+        # Ruta del documento -> inicio de sus escrituras pendientes, para las latencias
+        self._started = {}
+        self.errores = []
+
+    def _start(self, ref):
+        with self._lock:
+            self._started.setdefault(ref._document_path, []).append(time.perf_counter())
+
+    def _finish(self, path):
+        """Latencia de la escritura más antigua pendiente sobre `path`."""
+        starts = self._started.get(path)
+        if not starts:
+            return None
+        start = starts.pop(0)
+        if not starts:
+            del self._started[path]
+        return time.perf_counter() - start
+
+    def _on_result(self, reference, result, bulk_writer):
+        with self._lock:
+            latency = self._finish(reference._document_path)
+            if latency is not None:
+                self.stats.latencias.append(latency)
+            self.stats.documentos += 1
+
+    def _on_batch(self, batch, response, bulk_writer):
+        with self._lock:
+            self.stats.commits += 1
+
+    def _on_error(self, error, bulk_writer):
+        operation = error.operation
+        data = getattr(operation, 'document_data', None)
+        codes = self.CODIGOS_SIN_APLICAR if has_increment(data) else self.CODIGOS_REINTENTABLES
+        if error.code in codes and error.attempts < MAX_REINTENTOS:
+            with self._lock:
+                self.stats.reintentos += 1
+            return True
+        with self._lock:
+            self._finish(operation.reference._document_path)
+            self.errores.append((operation.reference.path, error.code, error.message))
+        return False
+
+    def set(self, ref, data, merge=False):
+        self._start(ref)
+        self._writer.set(ref, data, merge=merge)
+
+    def update(self, ref, data):
+        self._start(ref)
+        self._writer.update(ref, data)
+
+    def delete(self, ref):
+        self._start(ref)
+        self._writer.delete(ref)
+
+    def write_group(self, operations):
+        """
+        El BulkWriter no ofrece atomicidad: el grupo va en su propio WriteBatch.
+        Si alguno de sus documentos tiene escrituras pendientes, se envían antes.
+        """
+        if len(operations) > MAX_OPERACIONES_LOTE:
+            raise ValueError(f'Un grupo de {len(operations)} operaciones no cabe en un lote '
+                             f'de {MAX_OPERACIONES_LOTE}')
+        with self._lock:
+            pending = any(ref._document_path in self._started for ref, _, _ in operations)
+        if pending:
+            self._writer.flush()
+        start = time.perf_counter()
+        batch = self.db.batch()
+        for operation in operations:
+            apply_operation(batch, operation)
+        batch.commit()
+        with self._lock:
+            self.stats.latencias.append(time.perf_counter() - start)
+            self.stats.documentos += len(operations)
+            self.stats.commits += 1
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+        self.stats.stop()
+        if self.errores:
+            path, code, message = self.errores[0]
+            raise RuntimeError(f'{len(self.errores)} escrituras fallaron en el BulkWriter '
+                               f'(la primera, {path}: código {code}, {message})')
+        return self.stats
+
+
+def make_writer(db, modo='individual', max_in_flight=4, rate_limit=True, limiter=None):
+    """
+    Crea el escritor correspondiente a `modo` (individual, lote o bulk). Con
+    rate_limit=False no hay limitador ni reintentos propios (p. ej. emulador).
+    `limiter` reemplaza al AdaptiveRateLimiter nuevo, p. ej. una parte de un
+    FairShareLimiter compartido con otros escritores; bulk no lo admite, porque
+    el BulkWriter del SDK regula su propio ritmo.
+    """
+    if modo == 'bulk' and rate_limit and limiter is not None:
+        raise ValueError("El modo bulk usa el limitador del SDK y no admite `limiter`")
+    if not rate_limit:
+        limiter = None
+    elif limiter is None:
+        limiter = AdaptiveRateLimiter()
+    if modo == 'individual':
+        return SingleWriter(db, limiter)
+    if modo == 'lote':
+        return BatchWriter(db, max_in_flight=max_in_flight, limiter=limiter)
+    if modo == 'bulk':
+        return BulkWriter(db)
+    raise ValueError(f"Modo de escritura desconocido: {modo}")
+
+
+def add_writer_arguments(parser):
+    """Agrega las opciones --modo y --en-vuelo a un ArgumentParser."""
+    parser.add_argument('--modo', choices=MODOS_ESCRITURA, default='individual',
+                        help='Forma de escribir en Firestore (por defecto: individual)')
+    parser.add_argument('--en-vuelo', type=int, default=4,
+                        help='Commits en paralelo en modo lote (por defecto: 4)')
+    parser.add_argument('--sin-limite', action='store_true',
+                        help='Escribir sin la rampa 500/50/5 ni reintentos (solo emulador)')
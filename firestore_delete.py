@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Borrado masivo de colecciones de Firestore.
+
+Recorre la colección por páginas ordenadas por ID (limit + start_after),
+pidiendo solo las referencias de los documentos (sin datos de campos), y
+elimina cada página en un único commit por lotes. Varias páginas pueden
+estar en vuelo a la vez. Opcionalmente borra las subcolecciones de cada
+documento antes que el documento.
+
+El avance se guarda en un archivo de checkpoint, de modo que una ejecución
+interrumpida puede continuar donde se quedó. Los commits siguen la rampa
+500/50/5 y reintentan los errores transitorios (firestore_ratelimit.py).
+
+Uso:
+    python3 firestore_delete.py emisores receptores ordenes \\
+        [--pagina 500] [--en-vuelo 4] [--recursivo] [--checkpoint borrado.json] [--sin-limite]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_client import get_db
+from firestore_batch import MAX_OPERACIONES_LOTE
+from firestore_pages import collection_path, iter_pages
+from firestore_ratelimit import AdaptiveRateLimiter, call_with_retry
+
+
+class DeleteCheckpoint:
+    """Último documento confirmado por colección, persistido en JSON."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._data = json.load(f)
+
+    def get(self, collection_path):
+        return self._data.get(collection_path, {})
+
+    def update(self, collection_path, last_id, deleted):
+        with self._lock:
+            self._data[collection_path] = {'ultimo_id': last_id, 'eliminados': deleted}
+            self._save()
+
+    def finish(self, collection_path):
+        with self._lock:
+            self._data.pop(collection_path, None)
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class PageTracker:
+    """
+    Los commits terminan en cualquier orden; el checkpoint solo avanza hasta
+    la última página cuya página anterior ya también está confirmada.
+    """
+
+    def __init__(self, checkpoint, collection_path, deleted):
+        self.checkpoint = checkpoint
+        self.collection_path = collection_path
+        self.deleted = deleted
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._next = 0
+
+    def done(self, index, last_id, size):
+        with self._lock:
+            self._pages[index] = (last_id, size)
+            advanced = False
+            while self._next in self._pages:
+                last_id, size = self._pages.pop(self._next)
+                self.deleted += size
+                self._next += 1
+                advanced = True
+            if advanced:
+                self.checkpoint.update(self.collection_path, last_id, self.deleted)
+
+
+def bulk_delete_collection(db, collection, page_size=MAX_OPERACIONES_LOTE, max_in_flight=4,
+                           recursive=False, checkpoint=None, progress_every=5000, limiter=None,
+                           latencies=None):
+    """
+    Borra todos los documentos de `collection` (nombre o CollectionReference)
+    y devuelve cuántos se eliminaron. Con `limiter` (AdaptiveRateLimiter) los
+    commits respetan su ritmo y se reintentan los errores transitorios. Si se
+    pasa la lista `latencies`, se le agrega la duración de cada commit.
+    """
+    if isinstance(collection, str):
+        collection = db.collection(collection)
+    if not 1 <= page_size <= MAX_OPERACIONES_LOTE:
+        raise ValueError(f'page_size debe estar entre 1 y {MAX_OPERACIONES_LOTE}')
+    checkpoint = checkpoint or DeleteCheckpoint()
+    path = collection_path(collection)
+
+    previous = checkpoint.get(path)
+    last_id = previous.get('ultimo_id')
+    tracker = PageTracker(checkpoint, path, previous.get('eliminados', 0))
+    if last_id:
+        print(f"   ↪ Reanudando '{path}' después de '{last_id}' "
+              f"({tracker.deleted} ya eliminados)")
+
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    slots = threading.BoundedSemaphore(max_in_flight)
+    futures = []
+    start = time.perf_counter()
+    queued = 0
+    next_report = progress_every
+    page_index = 0
+
+    def commit(index, refs):
+        try:
+            batch = db.batch()
+            for ref in refs:
+                batch.delete(ref)
+            commit_start = time.perf_counter()
+            if limiter is None:
+                batch.commit()
+            else:
+                call_with_retry(lambda: batch.commit(retry=None), limiter, len(refs))
+            if latencies is not None:
+                latencies.append(time.perf_counter() - commit_start)
+            tracker.done(index, refs[-1].id, len(refs))
+        finally:
+            slots.release()
+
+    try:
+        # fields=[]: solo referencias, sin datos de los documentos
+        for page in iter_pages(collection, page_size, last_id, fields=[]):
+            refs = [snapshot.reference for snapshot in page]
+
+            if recursive:
+                for ref in refs:
+                    for subcollection in ref.collections():
+                        bulk_delete_collection(db, subcollection, page_size, max_in_flight,
+                                               recursive=True, checkpoint=checkpoint,
+                                               progress_every=progress_every, limiter=limiter,
+                                               latencies=latencies)
+
+            # Cortar en el primer commit fallido en vez de seguir paginando
+            pending = []
+            for future in futures:
+                if future.done():
+                    future.result()
+                else:
+                    pending.append(future)
+            futures = pending
+
+            slots.acquire()
+            futures.append(executor.submit(commit, page_index, refs))
+            page_index += 1
+            queued += len(refs)
+
+            if queued >= next_report:
+                elapsed = time.perf_counter() - start
+                print(f"   … '{path}': {queued} documentos enviados a borrar "
+                      f"({queued / elapsed:.0f} docs/s)")
+                next_report += progress_every
+    finally:
+        executor.shutdown(wait=True)
+
+    # Propagar el error de los commits que quedaban; el checkpoint conserva el avance
+    for future in futures:
+        future.result()
+
+    checkpoint.finish(path)
+    return tracker.deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Borra colecciones de Firestore por lotes')
+    parser.add_argument('colecciones', nargs='+', help='Colecciones a borrar')
+    parser.add_argument('--pagina', type=int, default=MAX_OPERACIONES_LOTE,
+                        help='Documentos por página y por commit (máx. 500)')
+    parser.add_argument('--en-vuelo', type=int, default=4,
+                        help='Páginas borrándose en paralelo (por defecto: 4)')
+    parser.add_argument('--recursivo', action='store_true',
+                        help='Borrar también las subcolecciones de cada documento')
+    parser.add_argument('--checkpoint', default='borrado_checkpoint.json',
+                        help='Archivo para guardar el avance y poder reanudar')
+    parser.add_argument('--sin-limite', action='store_true',
+                        help='Borrar sin la rampa 500/50/5 ni reintentos (solo emulador)')
+    args = parser.parse_args()
+
+    db = get_db()
+
+    print("=" * 70)
+    print("🗑️  BORRADO MASIVO DE COLECCIONES")
+    print("=" * 70)
+    print()
+
+    checkpoint = DeleteCheckpoint(args.checkpoint)
+    limiter = None if args.sin_limite else AdaptiveRateLimiter()
+    for name in args.colecciones:
+        start = time.perf_counter()
+        deleted = bulk_delete_collection(db, name, args.pagina, args.en_vuelo,
+                                         recursive=args.recursivo, checkpoint=checkpoint,
+                                         limiter=limiter)
+        elapsed = time.perf_counter() - start
+        rate = deleted / elapsed if elapsed > 0 else 0.0
+        print(f"   ✓ {deleted} documentos eliminados de '{name}' en {elapsed:.2f}s "
+              f"({rate:.0f} docs/s)")
+
+    print()
+    print("✅ PROCESO COMPLETADO")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Recorrido paginado de colecciones de Firestore.
+
+Las consultas se ordenan por ID de documento y avanzan con start_after, en
+vez de un único stream() sobre toda la colección: cada página es una RPC
+corta, la memoria queda acotada al tamaño de página y el último ID sirve
+como punto de reanudación.
+"""
+
+# Campo especial con el ID del documento (FieldPath.document_id())
+DOCUMENT_ID = '__name__'
+
+
+def page_query(collection, page_size, start_after_id=None, fields=None):
+    """
+    Consulta de una página. `fields` es la máscara de campos (lista de rutas);
+    con fields=[] solo se piden las referencias, sin datos.
+    """
+    query = collection.order_by(DOCUMENT_ID).limit(page_size)
+    if fields is not None:
+        query = query.select(list(fields) or [DOCUMENT_ID])
+    if start_after_id:
+        query = query.start_after({DOCUMENT_ID: collection.document(start_after_id)})
+    return query
+
+
+def iter_pages(collection, page_size=500, start_after_id=None, fields=None):
+    """Genera listas de DocumentSnapshot, una por página, hasta agotar la colección."""
+    last_id = start_after_id
+    while True:
+        page = list(page_query(collection, page_size, last_id, fields).stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1].id
+
+
+def collection_path(collection):
+    """Ruta completa de una colección, p. ej. 'ordenes' o 'ordenes/abc/fotos'."""
+    if collection.parent is None:
+        return collection.id
+    return f'{collection.parent.path}/{collection.id}'
@@ -0,0 +1,282 @@
+"""
+Control de ritmo y reintentos para escrituras masivas en Firestore.
+
+Firestore recomienda la regla 500/50/5 para tráfico nuevo: empezar con 500
+operaciones por segundo y subir como máximo un 50 % cada 5 minutos. Si se
+escribe más rápido en una colección recién creada, los rangos de claves se
+calientan y aparecen RESOURCE_EXHAUSTED, ABORTED o contención.
+
+AdaptiveRateLimiter es un token bucket cuyo ritmo es el menor entre el techo
+de la regla 500/50/5 y un ritmo adaptativo: cada error reintentable lo
+reduce a la mitad y cada operación exitosa lo sube un poco (AIMD), así una
+carga grande se mantiene cerca del máximo sostenible. call_with_retry
+reintenta los errores reintentables con backoff exponencial y jitter.
+
+Ojo con los errores ambiguos: tras DeadlineExceeded, ServiceUnavailable,
+InternalServerError o GatewayTimeout el commit pudo haberse aplicado. Volver
+a enviar un set es inofensivo, pero un firestore.Increment (contadores de
+order_counters.py) se sumaría dos veces; por eso las escrituras no
+idempotentes (idempotent=False) solo se reintentan ante errores que
+garantizan que nada se aplicó (ERRORES_SIN_APLICAR).
+
+FairShareLimiter reparte el ritmo de un AdaptiveRateLimiter entre varios
+escritores a la vez (p. ej. uno por tenant): cada parte tiene su propio
+token bucket con el ritmo global dividido entre las partes activas, así
+ninguno acapara el presupuesto y, cuando uno termina, los demás heredan su
+porción.
+
+El BulkWriter del SDK ya implementa la misma regla y sus propios
+reintentos; esto es para los modos individual y lote y para el motor
+asyncio.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+OPERACIONES_INICIALES = 500
+FASE_SEGUNDOS = 5 * 60
+FACTOR_FASE = 1.5
+
+# Ritmo adaptativo: nunca por debajo de este mínimo (operaciones/s)
+RITMO_MINIMO = 20
+# Aumento del ritmo por cada operación confirmada (operaciones/s)
+AUMENTO_POR_OPERACION = 0.05
+# Tras un recorte, los errores de commits que ya estaban en vuelo no vuelven a recortar
+PAUSA_ENTRE_RECORTES = 1.0
+
+MAX_REINTENTOS = 8
+ESPERA_BASE = 0.25
+ESPERA_MAXIMA = 32.0
+
+# Excepciones de google.api_core que indican sobrecarga o fallos transitorios
+ERRORES_REINTENTABLES = frozenset({
+    'ResourceExhausted', 'TooManyRequests', 'Aborted', 'DeadlineExceeded',
+    'ServiceUnavailable', 'InternalServerError', 'GatewayTimeout',
+})
+
+
+# Errores con los que Firestore rechaza la escritura sin aplicar nada
+ERRORES_SIN_APLICAR = frozenset({'ResourceExhausted', 'TooManyRequests', 'Aborted'})
+
+# Funciones llamadas con la excepción en cada reintento (p. ej. rpc_metrics)
+_retry_listeners = []
+
+
+def is_retryable(exc, idempotent=True):
+    """Si conviene reintentar; sin idempotencia, solo si es seguro que no se aplicó nada."""
+    names = ERRORES_REINTENTABLES if idempotent else ERRORES_SIN_APLICAR
+    return any(cls.__name__ in names for cls in type(exc).__mro__)
+
+
+def add_retry_listener(listener):
+    """Registra `listener(exc)`, que se llama en cada reintento de call_with_retry."""
+    if listener not in _retry_listeners:
+        _retry_listeners.append(listener)
+
+
+def _notify_retry(exc, on_retry):
+    if on_retry:
+        on_retry(exc)
+    for listener in _retry_listeners:
+        listener(exc)
+
+
+def backoff_delay(attempt, rng=random):
+    """Espera antes del reintento `attempt` (1, 2, ...): backoff exponencial con jitter completo."""
+    return rng.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** attempt))
+
+
+class AdaptiveRateLimiter:
+    """Token bucket compartido entre hilos con techo 500/50/5 y ritmo AIMD."""
+
+    def __init__(self, initial_rate=OPERACIONES_INICIALES, phase_seconds=FASE_SEGUNDOS,
+                 minimum_rate=RITMO_MINIMO, clock=time.monotonic):
+        self.initial_rate = initial_rate
+        self.phase_seconds = phase_seconds
+        self.minimum_rate = minimum_rate
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._start = None
+        self._rate = float(initial_rate)
+        self._tokens = float(initial_rate)
+        self._updated = None
+        self._last_cut = None
+        self.operaciones = 0
+        self.errores = 0
+
+    def ceiling(self, now=None):
+        """Máximo permitido por la regla 500/50/5 desde la primera operación."""
+        if self._start is None:
+            return float(self.initial_rate)
+        now = self._clock() if now is None else now
+        return self.initial_rate * FACTOR_FASE ** int((now - self._start) // self.phase_seconds)
+
+    @property
+    def rate(self):
+        return min(self._rate, self.ceiling())
+
+    def reserve(self, n=1):
+        """
+        Reserva `n` tokens y devuelve cuántos segundos hay que esperar antes de
+        usarlos. El saldo puede quedar negativo: las reservas siguientes esperan
+        a que se pague, así el ritmo total se respeta aunque haya varios hilos.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._start is None:
+                self._start = self._updated = now
+            rate = min(self._rate, self.ceiling(now))
+            # Capacidad de un segundo de ritmo (al menos un lote completo)
+            capacity = max(rate, n)
+            self._tokens = min(capacity, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= n
+            return 0.0 if self._tokens >= 0 else -self._tokens / rate
+
+    def acquire(self, n=1):
+        wait = self.reserve(n)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, n=1):
+        wait = self.reserve(n)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self, n=1):
+        with self._lock:
+            self.operaciones += n
+            self._rate = min(self.ceiling(), self._rate + n * AUMENTO_POR_OPERACION)
+
+    def on_error(self):
+        with self._lock:
+            self.errores += 1
+            now = self._clock()
+            if self._last_cut is None or now - self._last_cut >= PAUSA_ENTRE_RECORTES:
+                self._rate = max(self.minimum_rate, min(self._rate, self.ceiling(now)) / 2)
+                self._last_cut = now
+
+
+def call_with_retry(fn, limiter, n=1, on_retry=None, max_retries=MAX_REINTENTOS,
+                    idempotent=True):
+    """
+    Llama a `fn` (que escribe `n` operaciones) respetando el ritmo del limitador
+    y reintenta los errores reintentables. Los demás errores, y el último
+    intento fallido, se propagan. Con idempotent=False (p. ej. un lote con
+    Increment) los errores ambiguos también se propagan.
+    """
+    attempt = 0
+    while True:
+        limiter.acquire(n)
+        try:
+            result = fn()
+        except Exception as exc:
+            if not is_retryable(exc, idempotent) or attempt >= max_retries:
+                raise
+            limiter.on_error()
+            attempt += 1
+            _notify_retry(exc, on_retry)
+            time.sleep(backoff_delay(attempt))
+            continue
+        limiter.on_success(n)
+        return result
+
+
+async def call_with_retry_async(fn, limiter, n=1, on_retry=None, max_retries=MAX_REINTENTOS,
+                                idempotent=True):
+    """Versión asyncio de call_with_retry; `fn` devuelve una corrutina nueva en cada intento."""
+    attempt = 0
+    while True:
+        await limiter.acquire_async(n)
+        try:
+            result = await fn()
+        except Exception as exc:
+            if not is_retryable(exc, idempotent) or attempt >= max_retries:
+                raise
+            limiter.on_error()
+            attempt += 1
+            _notify_retry(exc, on_retry)
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        limiter.on_success(n)
+        return result
+
+
+class FairShareLimiter:
+    """Presupuesto de un AdaptiveRateLimiter repartido en partes iguales entre participantes."""
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self._lock = threading.Lock()
+        self.activos = 0
+
+    def share(self):
+        """Nueva parte del presupuesto; usar como context manager (`with fair.share() as limiter`)."""
+        return _Share(self)
+
+    def share_rate(self):
+        return self.limiter.rate / max(1, self.activos)
+
+    def _join(self):
+        with self._lock:
+            self.activos += 1
+
+    def _leave(self):
+        with self._lock:
+            self.activos -= 1
+
+
+class _Share:
+    """Misma interfaz que AdaptiveRateLimiter: su ritmo y además el global."""
+
+    def __init__(self, parent):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._updated = None
+        self.operaciones = 0
+
+    def __enter__(self):
+        self.parent._join()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.parent._leave()
+        return False
+
+    @property
+    def rate(self):
+        return self.parent.share_rate()
+
+    def reserve(self, n=1):
+        with self._lock:
+            now = time.monotonic()
+            rate = self.parent.share_rate()
+            if self._updated is None:
+                self._tokens, self._updated = max(rate, n), now
+            capacity = max(rate, n)
+            self._tokens = min(capacity, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= n
+            own = 0.0 if self._tokens >= 0 else -self._tokens / rate
+        return max(own, self.parent.limiter.reserve(n))
+
+    def acquire(self, n=1):
+        wait = self.reserve(n)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, n=1):
+        wait = self.reserve(n)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self, n=1):
+        with self._lock:
+            self.operaciones += n
+        self.parent.limiter.on_success(n)
+
+    def on_error(self):
+        self.parent.limiter.on_error()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Recorrido de una colección completa en paralelo, con varios procesos.
+
+Un stream() (o iter_pages) sobre 'ordenes' usa un solo núcleo y una sola
+conexión. scan_collection parte la colección en rangos de IDs con
+get_partitions (partition query de Firestore), reparte los rangos en un
+pool de procesos (cada uno con su propio cliente y su propia conexión
+gRPC) y combina los resultados al estilo map/reduce:
+
+- `mapper(pagina)` recibe una lista de DocumentSnapshot y devuelve un
+  resultado parcial
+- `reducer(a, b)` combina dos resultados; debe ser asociativo y `initial`
+  su elemento neutro, porque el orden en que terminan los rangos varía
+
+mapper y reducer tienen que ser funciones de nivel de módulo (los procesos
+se crean con spawn y los reciben serializados con pickle).
+
+Se piden más rangos que procesos (PARTICIONES_POR_PROCESO) para que los
+rangos más cargados no dejen procesos ociosos al final.
+
+Uso:
+    python3 firestore_scan.py estados [--procesos 16] [--particiones 64]
+    python3 firestore_scan.py auditoria --procesos 8
+    python3 firestore_scan.py estados --escalado 1,2,4,8,16
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from firestore_pages import DOCUMENT_ID
+
+PARTICIONES_POR_PROCESO = 4
+TAMANO_PAGINA = 1000
+
+
+def partition_bounds(db, collection_name, partition_count):
+    """
+    Límites [(inicio, fin)] de cada rango como rutas de documento (None = sin
+    límite). Son cadenas para poder enviarlas a otros procesos.
+
+    get_partitions solo existe para collection groups: si hubiera subcolecciones
+    con el mismo nombre, también entrarían en el recorrido.
+    """
+    bounds = []
+    for partition in db.collection_group(collection_name).get_partitions(partition_count):
+        bounds.append((partition.start_at.path if partition.start_at else None,
+                       partition.end_at.path if partition.end_at else None))
+    return bounds
+
+
+def iter_partition_pages(db, collection_name, start, end, page_size=TAMANO_PAGINA, fields=None):
+    """Páginas de DocumentSnapshot de un rango [start, end) de la colección."""
+    query = db.collection_group(collection_name).order_by(DOCUMENT_ID)
+    if fields is not None:
+        query = query.select(list(fields) or [DOCUMENT_ID])
+    if end:
+        query = query.end_before({DOCUMENT_ID: db.document(end)})
+    cursor = query.start_at({DOCUMENT_ID: db.document(start)}) if start else query
+    while True:
+        page = list(cursor.limit(page_size).stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        cursor = query.start_after({DOCUMENT_ID: page[-1].reference})
+
+
+def _scan_partition(collection_name, start, end, mapper, reducer, initial, page_size, fields):
+    """Trabajo de un proceso: recorre un rango y reduce sus páginas."""
+    from firebase_client import get_db
+
+    db = get_db()
+    result = initial
+    documents = 0
+    for page in iter_partition_pages(db, collection_name, start, end, page_size, fields):
+        documents += len(page)
+        result = reducer(result, mapper(page))
+    return result, documents
+
+
+def scan_collection(collection_name, mapper, reducer, initial, workers=None,
+                    partitions=None, page_size=TAMANO_PAGINA, fields=None, db=None):
+    """
+    Aplica mapper/reducer a toda la colección con `workers` procesos (por
+    defecto, uno por núcleo). Devuelve (resultado, documentos, segundos).
+    """
+    if db is None:
+        from firebase_client import get_db
+
+        db = get_db()
+    workers = workers or os.cpu_count()
+    start_time = time.perf_counter()
+    bounds = partition_bounds(db, collection_name,
+                              partitions or workers * PARTICIONES_POR_PROCESO)
+
+    result = initial
+    documents = 0
+    # spawn: gRPC no admite fork con canales abiertos
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(bounds)), mp_context=context) as pool:
+        futures = [pool.submit(_scan_partition, collection_name, start, end, mapper, reducer,
+                               initial, page_size, fields)
+                   for start, end in bounds]
+        for future in as_completed(futures):
+            partial, count = future.result()
+            result = reducer(result, partial)
+            documents += count
+    return result, documents, time.perf_counter() - start_time
+
+
+# ==============================================================================
+# TRABAJOS
+# ==============================================================================
+
+def count_states(page):
+    return Counter((snapshot.to_dict() or {}).get('estado') or 'SIN_ESTADO' for snapshot in page)
+
+
+def merge_counters(a, b):
+    a.update(b)
+    return a
+
+
+# Campos que toda orden debe tener
+CAMPOS_AUDITORIA = ('numeroOrden', 'estado', 'estadoHistorial', 'fechaCreacion',
+                    'receptorNombre', 'provinciaDestino', 'municipioDestino')
+
+
+def audit_orders(page):
+    """Problemas por tipo: campos faltantes y estado que no coincide con el historial."""
+    problems = Counter()
+    for snapshot in page:
+        orden = snapshot.to_dict() or {}
+        for field in CAMPOS_AUDITORIA:
+            if orden.get(field) in (None, '', []):
+                problems[f'falta {field}'] += 1
+        historial = orden.get('estadoHistorial') or []
+        if historial and historial[-1].get('estado') != orden.get('estado'):
+            problems['estado distinto del último del historial'] += 1
+    return problems
+
+
+TRABAJOS = {
+    'estados': (count_states, ['estado']),
+    'auditoria': (audit_orders, list(CAMPOS_AUDITORIA)),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recorrido paralelo de una colección')
+    parser.add_argument('trabajo', choices=TRABAJOS)
+    parser.add_argument('--coleccion', default='ordenes')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count(),
+                        help='Procesos en paralelo (por defecto: uno por núcleo)')
+    parser.add_argument('--particiones', type=int, default=None,
+                        help=f'Rangos a pedir (por defecto: {PARTICIONES_POR_PROCESO} por proceso)')
+    parser.add_argument('--pagina', type=int, default=TAMANO_PAGINA)
+    parser.add_argument('--escalado', default=None,
+                        help='Repetir con varias cantidades de procesos, p. ej. 1,2,4,8,16')
+    args = parser.parse_args()
+
+    mapper, fields = TRABAJOS[args.trabajo]
+    print("=" * 70)
+    print(f"🔎 RECORRIDO PARALELO: {args.trabajo} sobre '{args.coleccion}'")
+    print("=" * 70)
+
+    if args.escalado:
+        base = None
+        for workers in (int(w) for w in args.escalado.split(',')):
+            _, documents, elapsed = scan_collection(args.coleccion, mapper, merge_counters,
+                                                    Counter(), workers, args.particiones,
+                                                    args.pagina, fields)
+            rate = documents / elapsed if elapsed else 0
+            base = base or rate
+            print(f"   {workers:>3} procesos: {documents} docs en {elapsed:6.2f} s "
+                  f"({rate:,.0f} docs/s, ×{rate / base if base else 1:.1f})")
+        return
+
+    result, documents, elapsed = scan_collection(args.coleccion, mapper, merge_counters,
+                                                 Counter(), args.procesos, args.particiones,
+                                                 args.pagina, fields)
+    print(f"   {documents} documentos en {elapsed:.2f} s con {args.procesos} procesos")
+    print()
+    for clave, total in result.most_common():
+        print(f"   - {clave}: {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Siembra incremental e idempotente en Firestore.
+
+Cada documento recibe un ID determinista (numeroOrden para órdenes, email o
+RUT normalizado para emisores y receptores) y un hash de su contenido en el
+campo contentHash. Antes de escribir se leen los hashes guardados con
+get_all por bloques, pidiendo solo ese campo, y se escriben únicamente los
+documentos nuevos o cambiados. Volver a sembrar datos sin cambios cuesta
+solo lecturas.
+"""
+
+import hashlib
+import json
+import re
+from datetime import date, datetime
+
+CAMPO_HASH = 'contentHash'
+
+# Documentos por llamada a get_all
+TAMANO_LECTURA = 300
+
+
+def normalize_email(email):
+    return email.strip().lower().replace('@', '_at_').replace('.', '_')
+
+
+def normalize_rut(rut):
+    return re.sub(r'[^0-9kK]', '', rut).upper()
+
+
+def _is_sentinel(value):
+    # SERVER_TIMESTAMP, DELETE_FIELD, Increment...: valores que resuelve el servidor
+    return type(value).__module__.startswith('google.cloud.firestore')
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Tipo no serializable para el hash: {type(value).__name__}')
+
+
+def stable_fields(data):
+    """Campos que definen el contenido: sin centinelas del servidor ni el propio hash."""
+    return {k: v for k, v in data.items() if k != CAMPO_HASH and not _is_sentinel(v)}
+
+
+def content_hash(data):
+    canonical = json.dumps(stable_fields(data), sort_keys=True, ensure_ascii=False,
+                           separators=(',', ':'), default=_json_default)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def document_id(collection_name, data):
+    """ID determinista según la colección; si no hay clave natural, hash del contenido."""
+    if collection_name == 'ordenes' and data.get('numeroOrden'):
+        return data['numeroOrden']
+    if collection_name in ('emisores', 'receptores'):
+        if data.get('email'):
+            return normalize_email(data['email'])
+        if data.get('rut'):
+            return normalize_rut(data['rut'])
+    if collection_name == 'usuarios' and data.get('email'):
+        return normalize_email(data['email'])
+    return content_hash(data)[:20]
+
+
+class UpsertStats:
+    def __init__(self):
+        self.nuevos = 0
+        self.cambiados = 0
+        self.sin_cambios = 0
+        self.duplicados = 0
+
+    def __str__(self):
+        return (f"{self.nuevos} nuevos, {self.cambiados} cambiados, "
+                f"{self.sin_cambios} sin cambios, {self.duplicados} duplicados")
+
+
+def _upsert_chunk(db, writer, collection, chunk, stats, on_create=None):
+    from firebase_admin import firestore
+
+    refs = [collection.document(doc_id) for doc_id in chunk]
+    stored = {}
+    # Solo se pide el campo del hash: una lectura por documento, sin traer los datos
+    for snapshot in db.get_all(refs, field_paths=[CAMPO_HASH]):
+        if snapshot.exists:
+            stored[snapshot.id] = (snapshot.to_dict() or {}).get(CAMPO_HASH)
+
+    for (doc_id, (data, digest)), ref in zip(chunk.items(), refs):
+        if doc_id not in stored:
+            if on_create:
+                writer.write_group(on_create(ref, {**data, CAMPO_HASH: digest}))
+            else:
+                writer.set(ref, {**data, CAMPO_HASH: digest})
+            stats.nuevos += 1
+        elif stored[doc_id] != digest:
+            # No pisar createdAt ni otros valores que puso el servidor al crearlo
+            update = stable_fields(data)
+            update[CAMPO_HASH] = digest
+            update['updatedAt'] = firestore.SERVER_TIMESTAMP
+            writer.set(ref, update, merge=True)
+            stats.cambiados += 1
+        else:
+            stats.sin_cambios += 1
+
+
+def upsert_documents(db, writer, collection_name, documents, stats=None, on_create=None):
+    """
+    Escribe en `collection_name` solo los documentos nuevos o cambiados de
+    `documents` (iterable, se procesa por bloques). Devuelve UpsertStats.
+
+    `on_create(ref, datos)` devuelve las operaciones (ref, datos, merge) con que
+    se crea un documento nuevo, p. ej. para agregar campos que no forman parte
+    del hash (estado inicial, fechas) o incrementos de contadores.
+
+    Filas con el mismo ID dentro de un bloque se escriben una sola vez (gana la
+    última) y se cuentan como duplicados: si no, ambas pasarían por on_create.
+    """
+    stats = stats or UpsertStats()
+    collection = db.collection(collection_name)
+    chunk = {}
+    for data in documents:
+        doc_id = document_id(collection_name, data)
+        if doc_id in chunk:
+            stats.duplicados += 1
+        chunk[doc_id] = (data, content_hash(data))
+        if len(chunk) == TAMANO_LECTURA:
+            _upsert_chunk(db, writer, collection, chunk, stats, on_create)
+            chunk = {}
+    if chunk:
+        _upsert_chunk(db, writer, collection, chunk, stats, on_create)
+    return stats
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Generador de órdenes sintéticas para pruebas de carga.
+
+Produce N órdenes (de 10k a millones) como un flujo perezoso: nunca se arma
+la lista completa en memoria. La distribución entre estados es configurable
+y cada orden trae un estadoHistorial coherente con su estado actual, además
+de los campos nuevos del modelo Orden (peso, dimensiones, bultos, pago,
+urgencia, provincia y municipio).
+
+Con la misma semilla y los mismos parámetros se obtienen exactamente las
+mismas órdenes, para poder repetir una prueba de carga.
+
+Uso:
+    python3 generate_ordenes.py 100000 --semilla 42 > ordenes.ndjson
+    python3 generate_ordenes.py 100000 --firestore --modo lote
+
+Con --firestore cada orden se escribe junto con sus contadores
+(order_counters.py), como en setup_firestore_complete.py.
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+from municipios import load_municipios
+from order_records import Estado, EstadoEvento, Orden, to_epoch
+
+ESTADOS = ('CREADA', 'ENVIADA', 'REPARTIENDO', 'ENTREGADA')
+
+DISTRIBUCION_POR_DEFECTO = {
+    'CREADA': 0.20,
+    'ENVIADA': 0.20,
+    'REPARTIENDO': 0.15,
+    'ENTREGADA': 0.45,
+}
+
+SEMILLA_POR_DEFECTO = 20250101
+
+# Fecha base fija: usar datetime.now() haría que dos corridas no coincidieran
+FECHA_BASE = datetime(2025, 1, 1, 8, 0, 0)
+
+NOMBRES = ('Juan', 'María', 'Carlos', 'Ana', 'Pedro', 'Laura', 'Luis', 'Yanet',
+           'Yoel', 'Dayana', 'Osmany', 'Yudith', 'Alejandro', 'Daniela', 'Jorge', 'Lisandra')
+APELLIDOS = ('Pérez', 'González', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'Díaz',
+             'Hernández', 'García', 'Álvarez', 'Ramírez', 'Torres', 'Cruz', 'Reyes')
+CALLES = ('Calle 23', 'Calle Línea', 'Av. Independencia', 'Calle Martí', 'Calle Maceo',
+          'Av. de los Presidentes', 'Calle San Rafael', 'Calle Obispo', 'Av. 51')
+DESCRIPCIONES = ('Paquete con ropa y calzado', 'Medicamentos', 'Alimentos no perecederos',
+                 'Artículos de aseo', 'Equipos electrónicos', 'Documentos',
+                 'Piezas de repuesto', 'Juguetes', 'Útiles escolares')
+REPARTIDORES = ('Juan Repartidor', 'Yoel Repartidor', 'Osmany Repartidor', 'Luis Repartidor')
+USUARIO_ADMIN = 'Administrador Principal'
+
+
+def parse_distribution(text):
+    """Convierte 'CREADA=0.2,ENTREGADA=0.8' en un dict normalizado."""
+    weights = {}
+    for part in text.split(','):
+        estado, _, value = part.partition('=')
+        estado = estado.strip().upper()
+        if estado not in ESTADOS:
+            raise ValueError(f"Estado desconocido en la distribución: {estado}")
+        weights[estado] = float(value)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError('La distribución debe tener algún peso positivo')
+    return {estado: weights.get(estado, 0.0) / total for estado in ESTADOS}
+
+
+def _telefono(rng):
+    return f"+53 5{rng.randrange(1000000, 9999999)}"
+
+
+def _persona(rng):
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+
+
+def _historial(rng, estado, creada, repartidor):
+    """Cronología CREADA → … → estado, con intervalos realistas entre pasos."""
+    pasos = ESTADOS[:ESTADOS.index(estado) + 1]
+    fecha = creada
+    historial = []
+    for paso in pasos:
+        if paso == 'ENVIADA':
+            fecha += timedelta(seconds=rng.randrange(1 * 3600, 24 * 3600))
+        elif paso == 'REPARTIENDO':
+            fecha += timedelta(seconds=rng.randrange(12 * 3600, 96 * 3600))
+        elif paso == 'ENTREGADA':
+            fecha += timedelta(seconds=rng.randrange(1800, 8 * 3600))
+        usuario = repartidor if paso in ('REPARTIENDO', 'ENTREGADA') else USUARIO_ADMIN
+        historial.append(EstadoEvento(Estado(paso), to_epoch(fecha), usuario))
+    return historial, fecha
+
+
+def generate_orders(count, seed=SEMILLA_POR_DEFECTO, distribution=None, start=FECHA_BASE,
+                    days=365, first_number=1):
+    """Como generate_order_records, pero cada orden como dict de Firestore."""
+    for orden in generate_order_records(count, seed, distribution, start, days, first_number):
+        yield orden.to_firestore()
+
+
+def generate_order_records(count, seed=SEMILLA_POR_DEFECTO, distribution=None, start=FECHA_BASE,
+                           days=365, first_number=1):
+    """
+    Genera `count` órdenes una a una (generador de order_records.Orden).
+    `days` es el rango de fechas de creación a partir de `start`.
+    """
+    rng = random.Random(seed)
+    distribution = distribution or DISTRIBUCION_POR_DEFECTO
+    estados = list(distribution)
+    cum_weights = []
+    acumulado = 0.0
+    for estado in estados:
+        acumulado += distribution[estado]
+        cum_weights.append(acumulado)
+
+    municipios = load_municipios()
+    provincias = list(municipios)
+    rango_segundos = days * 24 * 3600
+
+    for i in range(first_number, first_number + count):
+        estado = rng.choices(estados, cum_weights=cum_weights)[0]
+        creada = start + timedelta(seconds=rng.randrange(rango_segundos))
+        provincia = rng.choice(provincias)
+        municipio = rng.choice(municipios[provincia])
+        repartidor = rng.choice(REPARTIDORES) if estado != 'CREADA' else None
+        historial, ultima = _historial(rng, estado, creada, repartidor)
+        estimada = creada + timedelta(days=rng.randint(2, 7))
+        entregada = ultima if estado == 'ENTREGADA' else None
+        requiere_pago = rng.random() < 0.3
+        pagado = requiere_pago and entregada is not None and rng.random() < 0.9
+        emisor = _persona(rng)
+        receptor = _persona(rng)
+        direccion = f"{rng.choice(CALLES)} #{rng.randint(1, 999)}, {municipio}, {provincia}"
+
+        yield Orden(
+            numeroOrden=f"ORD-{creada.year}-{i:04d}",
+            emisorNombre=emisor,
+            emisorTelefono=_telefono(rng),
+            emisorDireccion=f"{rng.randint(1, 9999)} NW {rng.randint(1, 200)}th St, Miami, FL",
+            receptorNombre=receptor,
+            receptorTelefono=_telefono(rng),
+            receptorDireccion=direccion,
+            descripcion=rng.choice(DESCRIPCIONES),
+            notasAdicionales='',
+            estado=Estado(estado),
+            estadoHistorial=historial,
+            fechaCreacion=to_epoch(creada),
+            fechaEstimadaEntrega=to_epoch(estimada),
+            fechaEntrega=to_epoch(entregada),
+            repartidorAsignado=repartidor,
+            provinciaDestino=provincia,
+            municipioDestino=municipio,
+            peso=round(rng.uniform(0.2, 40.0), 2),
+            largo=round(rng.uniform(10, 120), 1),
+            ancho=round(rng.uniform(10, 80), 1),
+            alto=round(rng.uniform(5, 80), 1),
+            cantidadBultos=rng.choices((1, 2, 3, 4), weights=(70, 18, 8, 4))[0],
+            esUrgente=rng.random() < 0.1,
+            requierePago=requiere_pago,
+            montoCobrar=round(rng.uniform(5, 300), 2) if requiere_pago else 0.0,
+            moneda=rng.choice(('USD', 'CUP')),
+            pagado=pagado,
+            fechaPago=to_epoch(entregada) if pagado else None,
+            createdBy='admin@paqueteria.com',
+            activa=True,
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera órdenes sintéticas para pruebas de carga')
+    parser.add_argument('cantidad', type=int, help='Número de órdenes a generar')
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO,
+                        help='Semilla del generador (misma semilla = mismas órdenes)')
+    parser.add_argument('--distribucion', type=parse_distribution,
+                        default=DISTRIBUCION_POR_DEFECTO,
+                        help='Pesos por estado, p. ej. CREADA=0.2,ENVIADA=0.2,REPARTIENDO=0.1,ENTREGADA=0.5')
+    parser.add_argument('--firestore', action='store_true',
+                        help='Escribir en la colección ordenes en vez de NDJSON por stdout')
+    parser.add_argument('--modo', default='lote', help='Modo de escritura en Firestore')
+    parser.add_argument('--en-vuelo', type=int, default=4, help='Commits en paralelo en modo lote')
+    parser.add_argument('--sin-limite', action='store_true',
+                        help='Escribir sin la rampa 500/50/5 ni reintentos (solo emulador)')
+    args = parser.parse_args()
+
+    ordenes = generate_orders(args.cantidad, seed=args.semilla, distribution=args.distribucion)
+
+    if not args.firestore:
+        for orden in ordenes:
+            sys.stdout.write(json.dumps(orden, ensure_ascii=False))
+            sys.stdout.write('\n')
+        return
+
+    from firebase_client import get_db
+    from firestore_batch import make_writer
+    from order_counters import order_write_ops
+
+    db = get_db()
+
+    print(f"📋 Generando {args.cantidad} órdenes (semilla {args.semilla})...")
+    with make_writer(db, args.modo, max_in_flight=args.en_vuelo,
+                     rate_limit=not args.sin_limite) as writer:
+        # Cada orden con sus incrementos de contadores, en el mismo lote
+        for orden in ordenes:
+            writer.write_group(order_write_ops(db, orden))
+    writer.stats.print_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Importación masiva de órdenes desde las planillas CSV o Excel de los
+operadores.
+
+El archivo se lee por bloques (pandas para CSV, openpyxl en modo solo
+lectura para XLSX) y cada bloque se valida por columnas completas, sin
+recorrer las filas en Python:
+
+- campos obligatorios presentes
+- provincia y municipio según lib/data/municipios_cuba.dart (sin importar
+  tildes ni mayúsculas; se guardan con el nombre oficial)
+- teléfonos con 8 a 15 dígitos
+- peso (kg) y dimensiones (cm) numéricos, positivos y dentro de rango
+- cantidad de bultos entera y positiva
+- moneda USD o CUP y monto positivo si la orden requiere pago
+
+Las filas válidas se escriben en 'ordenes' por lotes (con la rampa 500/50/5
+de firestore_batch) como órdenes CREADA, junto con sus contadores. El ID es
+numeroOrden si la planilla lo trae y, si no, un hash del contenido de la
+fila, así que reimportar la misma planilla no duplica órdenes ni reinicia
+el estado de las que ya avanzaron. A las órdenes nuevas sin número se les
+asigna uno al crearlas (order_numbers.py). Las filas rechazadas van a un CSV con
+el número de fila y los motivos.
+
+Requiere pandas (y openpyxl para .xlsx).
+
+Uso:
+    python3 import_ordenes.py planilla.csv [--errores rechazadas.csv] [--modo lote]
+    python3 import_ordenes.py planilla.xlsx --hoja Enero --bloque 20000 --validar
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+from generate_ordenes import USUARIO_ADMIN
+from municipios import load_municipios
+
+FILAS_POR_BLOQUE = 10000
+
+PESO_MAXIMO_KG = 1000
+DIMENSION_MAXIMA_CM = 300
+MONEDAS = ('USD', 'CUP')
+DIGITOS_TELEFONO = (8, 15)
+
+OBLIGATORIOS = ('emisorNombre', 'receptorNombre', 'receptorTelefono', 'receptorDireccion',
+                'provinciaDestino', 'municipioDestino', 'descripcion')
+OPCIONALES = ('numeroOrden', 'emisorTelefono', 'emisorDireccion', 'consejoPopularBatey',
+              'notasAdicionales', 'peso', 'largo', 'ancho', 'alto', 'cantidadBultos',
+              'esUrgente', 'requierePago', 'montoCobrar', 'moneda')
+NUMERICOS = ('peso', 'largo', 'ancho', 'alto', 'montoCobrar')
+VERDADEROS = ('si', 'sí', 's', 'x', 'true', '1', 'yes')
+
+# Encabezados habituales en las planillas (ya normalizados) → campo de la orden
+ALIAS = {
+    'numero': 'numeroOrden', 'orden': 'numeroOrden',
+    'emisor': 'emisorNombre', 'remitente': 'emisorNombre',
+    'telefonoemisor': 'emisorTelefono', 'direccionemisor': 'emisorDireccion',
+    'receptor': 'receptorNombre', 'destinatario': 'receptorNombre',
+    'destinatarionombre': 'receptorNombre',
+    'telefono': 'receptorTelefono', 'telefonodestinatario': 'receptorTelefono',
+    'direccion': 'receptorDireccion', 'direcciondestino': 'receptorDireccion',
+    'provincia': 'provinciaDestino', 'municipio': 'municipioDestino',
+    'consejopopular': 'consejoPopularBatey', 'batey': 'consejoPopularBatey',
+    'notas': 'notasAdicionales', 'observaciones': 'notasAdicionales',
+    'bultos': 'cantidadBultos', 'urgente': 'esUrgente', 'cobrar': 'requierePago',
+    'monto': 'montoCobrar',
+}
+
+
+def _normalize_text(series):
+    """Minúsculas, sin tildes y con los espacios colapsados (vectorizado)."""
+    return (series.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+            .str.lower().str.replace(r'\s+', ' ', regex=True).str.strip())
+
+
+def header_field(header):
+    import unicodedata
+
+    key = unicodedata.normalize('NFKD', str(header)).encode('ascii', 'ignore').decode().lower()
+    key = ''.join(ch for ch in key if ch.isalnum())
+    for field in OBLIGATORIOS + OPCIONALES:
+        if key == field.lower():
+            return field
+    return ALIAS.get(key)
+
+
+def municipios_table():
+    """DataFrame con las claves normalizadas y los nombres oficiales de cada municipio."""
+    import pandas as pd
+
+    pares = [(p, m) for p, municipios in load_municipios().items() for m in municipios]
+    table = pd.DataFrame(pares, columns=['provinciaDestino', 'municipioDestino'])
+    table['_prov'] = _normalize_text(table['provinciaDestino'])
+    table['_mun'] = _normalize_text(table['municipioDestino'])
+    return table
+
+
+# ==============================================================================
+# LECTURA POR BLOQUES
+# ==============================================================================
+
+def read_chunks(path, chunk_size=FILAS_POR_BLOQUE, sheet=None):
+    """Genera DataFrames de texto con las columnas renombradas a los campos de la orden."""
+    import pandas as pd
+
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        chunks = _read_excel_chunks(path, chunk_size, sheet)
+    else:
+        chunks = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size,
+                             encoding='utf-8-sig', sep=None, engine='python')
+    for chunk in chunks:
+        renamed = {c: header_field(c) for c in chunk.columns}
+        chunk = chunk.rename(columns={c: f for c, f in renamed.items() if f})
+        yield chunk.loc[:, ~chunk.columns.duplicated()]
+
+
+def _read_excel_chunks(path, chunk_size, sheet):
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = (workbook[sheet] if sheet else workbook.active).iter_rows(values_only=True)
+        header = [str(h) if h is not None else '' for h in next(rows)]
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == chunk_size:
+                yield pd.DataFrame(buffer, columns=header).fillna('').astype(str)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header).fillna('').astype(str)
+    finally:
+        workbook.close()
+
+
+# ==============================================================================
+# VALIDACIÓN POR COLUMNAS
+# ==============================================================================
+
+def validate_chunk(chunk, municipios, first_row=2):
+    """
+    Devuelve (válidas, rechazadas). `válidas` tiene los campos de la orden ya
+    convertidos; `rechazadas` las columnas originales más 'fila' y 'errores'.
+    `first_row` es el número de fila de la planilla de la primera fila del bloque.
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = chunk.copy()
+    df.index = pd.RangeIndex(first_row, first_row + len(df))
+    for field in OBLIGATORIOS + OPCIONALES:
+        if field not in df.columns:
+            df[field] = ''
+        df[field] = df[field].astype(str).str.strip()
+    errores = pd.Series('', index=df.index)
+
+    def reject(mask, message):
+        nonlocal errores
+        errores = errores.mask(mask, errores + message + '; ')
+
+    for field in OBLIGATORIOS:
+        reject(df[field].eq(''), f'falta {field}')
+
+    # Provincia y municipio: un merge contra la lista oficial
+    keys = pd.DataFrame({'_prov': _normalize_text(df['provinciaDestino']),
+                         '_mun': _normalize_text(df['municipioDestino'])}, index=df.index)
+    found = keys.reset_index().merge(municipios, on=['_prov', '_mun'], how='left') \
+        .set_index('index')
+    provincias = set(municipios['_prov'])
+    reject(~keys['_prov'].isin(provincias) & df['provinciaDestino'].ne(''), 'provincia desconocida')
+    reject(keys['_prov'].isin(provincias) & found['municipioDestino'].isna()
+           & df['municipioDestino'].ne(''), 'municipio no pertenece a la provincia')
+    df['provinciaDestino'] = found['provinciaDestino'].fillna(df['provinciaDestino'])
+    df['municipioDestino'] = found['municipioDestino'].fillna(df['municipioDestino'])
+
+    for field in ('receptorTelefono', 'emisorTelefono'):
+        digits = df[field].str.replace(r'\D', '', regex=True).str.len()
+        bad = df[field].ne('') & ~digits.between(*DIGITOS_TELEFONO)
+        reject(bad, f'{field} inválido')
+
+    numbers = {}
+    for field in NUMERICOS:
+        numbers[field] = pd.to_numeric(df[field].str.replace(',', '.', regex=False),
+                                       errors='coerce')
+        reject(df[field].ne('') & numbers[field].isna(), f'{field} no es numérico')
+    reject(numbers['peso'].le(0) | numbers['peso'].gt(PESO_MAXIMO_KG),
+           f'peso fuera de rango (0-{PESO_MAXIMO_KG} kg)')
+    for field in ('largo', 'ancho', 'alto'):
+        reject(numbers[field].le(0) | numbers[field].gt(DIMENSION_MAXIMA_CM),
+               f'{field} fuera de rango (0-{DIMENSION_MAXIMA_CM} cm)')
+
+    bultos = pd.to_numeric(df['cantidadBultos'], errors='coerce')
+    reject(df['cantidadBultos'].ne('') & (bultos.isna() | bultos.lt(1) | bultos.mod(1).ne(0)),
+           'cantidadBultos debe ser un entero positivo')
+
+    requiere_pago = _normalize_text(df['requierePago']).isin(VERDADEROS)
+    moneda = df['moneda'].str.upper()
+    reject(df['moneda'].ne('') & ~moneda.isin(MONEDAS), f"moneda debe ser {' o '.join(MONEDAS)}")
+    reject(requiere_pago & ~numbers['montoCobrar'].gt(0), 'requiere pago sin monto positivo')
+    reject(numbers['montoCobrar'].lt(0), 'monto negativo')
+
+    invalid = errores.ne('')
+    rejected = chunk.set_axis(df.index).loc[invalid].copy()
+    rejected.insert(0, 'fila', rejected.index)
+    rejected['errores'] = errores[invalid].str.rstrip('; ')
+
+    valid = df.loc[~invalid, list(OBLIGATORIOS + OPCIONALES)].copy()
+    ok = ~invalid
+    for field in NUMERICOS:
+        valid[field] = numbers[field][ok].round(2)
+    valid['cantidadBultos'] = bultos[ok].fillna(1).astype(int)
+    valid['esUrgente'] = _normalize_text(df['esUrgente'])[ok].isin(VERDADEROS)
+    valid['requierePago'] = requiere_pago[ok]
+    valid['moneda'] = moneda[ok].where(moneda[ok].ne(''), MONEDAS[0])
+    valid['montoCobrar'] = valid['montoCobrar'].fillna(0.0)
+    valid['pagado'] = False
+    valid = valid.replace({np.nan: None, '': None})
+    return valid, rejected
+
+
+# ==============================================================================
+# ESCRITURA
+# ==============================================================================
+
+def order_documents(valid):
+    """Diccionarios de orden (solo los campos de la planilla, que definen el hash)."""
+    for record in valid.to_dict('records'):
+        yield {k: v for k, v in record.items() if v is not None}
+
+
+def creation_ops(db, imported_at):
+    """on_create de upsert_documents: estado inicial, fechas y contadores de una orden nueva."""
+    from firebase_admin import firestore
+
+    from order_counters import order_write_ops
+    from order_numbers import OrderNumberAllocator
+
+    fecha = imported_at.isoformat()
+    numbers = OrderNumberAllocator(db)
+
+    def on_create(ref, data):
+        # El número no entra en el hash: reimportar la fila no pide otro
+        if not data.get('numeroOrden'):
+            data = {**data, 'numeroOrden': numbers.next(imported_at.year)}
+        orden = {
+            **data,
+            'estado': 'CREADA',
+            'estadoHistorial': [{'estado': 'CREADA', 'fecha': fecha, 'usuario': USUARIO_ADMIN}],
+            'fechaCreacion': fecha,
+            'activa': True,
+            'createdBy': USUARIO_ADMIN,
+            'createdAt': firestore.SERVER_TIMESTAMP,
+        }
+        return order_write_ops(db, orden, ref)
+
+    return on_create
+
+
+def import_file(path, db=None, writer=None, errors_path=None, chunk_size=FILAS_POR_BLOQUE,
+                sheet=None):
+    """
+    Valida (y, con `writer`, escribe) todas las filas de `path`. Devuelve
+    (filas leídas, válidas, rechazadas, UpsertStats o None).
+    """
+    from firestore_upsert import UpsertStats, upsert_documents
+
+    municipios = municipios_table()
+    stats = UpsertStats() if writer else None
+    on_create = creation_ops(db, datetime.now().replace(microsecond=0)) if writer else None
+    read = valid_rows = rejected_rows = 0
+    start = time.perf_counter()
+    if errors_path and os.path.exists(errors_path):
+        os.remove(errors_path)
+
+    for chunk in read_chunks(path, chunk_size, sheet):
+        valid, rejected = validate_chunk(chunk, municipios, first_row=read + 2)
+        read += len(chunk)
+        valid_rows += len(valid)
+        rejected_rows += len(rejected)
+        if errors_path and len(rejected):
+            rejected.to_csv(errors_path, mode='a', index=False,
+                            header=not os.path.exists(errors_path), encoding='utf-8')
+        if writer:
+            upsert_documents(db, writer, 'ordenes', order_documents(valid), stats, on_create)
+        elapsed = time.perf_counter() - start
+        print(f"   … {read} filas ({valid_rows} válidas, {rejected_rows} rechazadas, "
+              f"{read / elapsed * 60:.0f} filas/min)")
+    return read, valid_rows, rejected_rows, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa órdenes desde CSV o Excel')
+    parser.add_argument('archivo', help='Planilla .csv o .xlsx')
+    parser.add_argument('--hoja', help='Hoja del Excel (por defecto: la activa)')
+    parser.add_argument('--bloque', type=int, default=FILAS_POR_BLOQUE,
+                        help=f'Filas por bloque (por defecto: {FILAS_POR_BLOQUE})')
+    parser.add_argument('--errores', default='ordenes_rechazadas.csv',
+                        help='CSV con las filas rechazadas y sus motivos')
+    parser.add_argument('--validar', action='store_true',
+                        help='Solo validar, sin escribir en Firestore')
+    from firestore_batch import add_writer_arguments, make_writer
+
+    add_writer_arguments(parser)
+    parser.set_defaults(modo='lote')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"📥 IMPORTACIÓN DE ÓRDENES: {args.archivo}{' (solo validación)' if args.validar else ''}")
+    print("=" * 70)
+
+    if args.validar:
+        read, valid, rejected, stats = import_file(args.archivo, errors_path=args.errores,
+                                                   chunk_size=args.bloque, sheet=args.hoja)
+    else:
+        from firebase_client import get_db
+
+        db = get_db()
+        with make_writer(db, args.modo, args.en_vuelo, rate_limit=not args.sin_limite) as writer:
+            read, valid, rejected, stats = import_file(args.archivo, db, writer, args.errores,
+                                                       args.bloque, args.hoja)
+
+    print()
+    print(f"✅ {read} filas: {valid} válidas, {rejected} rechazadas")
+    if rejected:
+        print(f"   📄 Rechazadas en {args.errores}")
+    if stats:
+        print(f"   📋 ordenes: {stats}")
+        writer.stats.print_summary()
+
+
+if __name__ == "__main__":
+    main()
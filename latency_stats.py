@@ -0,0 +1,16 @@
+"""
+Percentiles de latencias compartidos por benchmark_admin y rpc_metrics.
+
+Sin dependencias: rpc_metrics se importa en cualquier script instrumentado y
+no debe arrastrar el benchmark ni sus imports.
+"""
+
+import math
+
+
+def percentile(sorted_values, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Migración de Firestore a Supabase/Postgres por streaming.
+
+Lee las colecciones ordenes, emisores y receptores por páginas (cursor por
+ID de documento), convierte los campos camelCase a las columnas snake_case
+que usa la app (numeroOrden → numero_orden, emisorNombre → emisor_nombre,
+receptorNombre → destinatario_nombre, ...) y carga cada página con COPY.
+Nunca hay más de una página en memoria.
+
+Destino: el esquema de la app (enum estado_orden de create_ordenes_simple.sql
+más los add_*.sql y create_destinatarios_table.sql), no supabase_migration.sql.
+Antes de la primera corrida hay que ejecutar preparar_migracion_firestore.sql,
+que agrega las columnas que falten. Los estados de Firestore se traducen a los
+del enum (ESTADOS_POSTGRES) y emisorId/receptorId a emisor_id/destinatario_id.
+
+Cada página se carga con COPY en una tabla temporal y de ahí con
+INSERT ... ON CONFLICT (id) DO UPDATE, en la misma transacción que el
+checkpoint (tabla migracion_checkpoint): una migración interrumpida se
+reanuda desde la última página confirmada, y repetirla (--reiniciar)
+actualiza las filas en vez de duplicarlas. Los IDs de Postgres son UUID v5
+derivados de la ruta del documento, por lo que son estables entre corridas.
+
+Requiere psycopg2 (pip install psycopg2-binary).
+
+Uso:
+    python3 migrate_firestore_to_supabase.py --dsn postgresql://postgres@localhost:5432/postgres
+    python3 migrate_firestore_to_supabase.py --colecciones ordenes --pagina 2000 --con-historial
+
+Para probar en local: exportar FIRESTORE_EMULATOR_HOST y usar un Postgres local.
+"""
+
+import argparse
+import csv
+import io
+import os
+import time
+import uuid
+from datetime import date, datetime
+
+from firebase_client import get_db
+from firestore_pages import iter_pages
+
+# Espacio de nombres para derivar UUIDs estables de las rutas de Firestore
+NAMESPACE_PAQUETERIA = uuid.uuid5(uuid.NAMESPACE_URL, 'paqueteria-web-app/firestore')
+
+TABLA_CHECKPOINT = 'migracion_checkpoint'
+
+
+def firestore_uuid(path):
+    return str(uuid.uuid5(NAMESPACE_PAQUETERIA, path))
+
+
+# Estado de Firestore → valor del enum estado_orden de la app
+ESTADOS_POSTGRES = {
+    'CREADA': 'POR ENVIAR',
+    'ENVIADA': 'EN TRANSITO',
+    'REPARTIENDO': 'EN TRANSITO',
+    'ENTREGADA': 'ENTREGADO',
+    'CANCELADA': 'CANCELADA',
+    'ATRASADO': 'ATRASADO',
+    # Órdenes creadas por setup_firestore.py y la app, ya con los valores del enum
+    'POR ENVIAR': 'POR ENVIAR',
+    'EN TRANSITO': 'EN TRANSITO',
+    'ENTREGADO': 'ENTREGADO',
+}
+
+
+def postgres_estado(estado):
+    """Valor de estado_orden para un estado de Firestore; None (NULL) si no se conoce."""
+    return ESTADOS_POSTGRES.get((estado or '').strip().upper())
+
+
+def _contact_uuid(collection):
+    return lambda doc_id: firestore_uuid(f'{collection}/{doc_id}') if doc_id else None
+
+
+# Columna de Postgres → campos de Firestore a probar, en orden
+MAPEO_ORDENES = {
+    'numero_orden': ('numeroOrden',),
+    'emisor_id': ('emisorId',),
+    'emisor_nombre': ('emisorNombre', 'emisor'),
+    'destinatario_id': ('receptorId',),
+    'destinatario_nombre': ('receptorNombre', 'receptor'),
+    'telefono_destinatario': ('receptorTelefono', 'telefonoDestinatario'),
+    'direccion_destino': ('receptorDireccion', 'direccionDestino'),
+    'provincia_destino': ('provinciaDestino',),
+    'municipio_destino': ('municipioDestino',),
+    'consejo_popular_batey': ('consejoPopularBatey',),
+    'descripcion': ('descripcion',),
+    'notas': ('notasAdicionales', 'notas', 'observaciones'),
+    'estado': ('estado',),
+    'fecha_creacion': ('fechaCreacion', 'createdAt'),
+    'fecha_estimada_entrega': ('fechaEstimadaEntrega',),
+    'fecha_entrega': ('fechaEntrega',),
+    'repartidor_nombre': ('repartidorAsignado', 'repartidor'),
+    'peso': ('peso',),
+    'largo': ('largo',),
+    'ancho': ('ancho',),
+    'alto': ('alto',),
+    'cantidad_bultos': ('cantidadBultos',),
+    'es_urgente': ('esUrgente',),
+    'foto_entrega': ('fotoEntrega',),
+    'requiere_pago': ('requierePago',),
+    'monto_cobrar': ('montoCobrar',),
+    'moneda': ('moneda',),
+    'pagado': ('pagado',),
+    'fecha_pago': ('fechaPago',),
+    'notas_pago': ('notasPago',),
+}
+
+MAPEO_EMISORES = {
+    'nombre': ('nombre',),
+    'telefono': ('telefono',),
+    'direccion': ('direccion',),
+    'email': ('email',),
+    'empresa': ('empresa',),
+    'notas': ('notas',),
+    'created_at': ('createdAt',),
+}
+
+MAPEO_RECEPTORES = {
+    'nombre': ('nombre',),
+    'telefono': ('telefono',),
+    'direccion': ('direccion',),
+    'email': ('email',),
+    'provincia': ('provincia',),
+    'municipio': ('municipio',),
+    'consejo_popular_batey': ('consejoPopularBatey',),
+    'empresa': ('empresa',),
+    'notas': ('notas',),
+    'created_at': ('createdAt',),
+}
+
+# Columna → conversión del valor de Firestore
+CONVERSIONES_ORDENES = {
+    'estado': postgres_estado,
+    'emisor_id': _contact_uuid('emisores'),
+    'destinatario_id': _contact_uuid('receptores'),
+}
+
+# Colección de Firestore → (tabla de Postgres, mapeo, conversiones)
+MIGRACIONES = {
+    'emisores': ('emisores', MAPEO_EMISORES, {}),
+    'receptores': ('destinatarios', MAPEO_RECEPTORES, {}),
+    'ordenes': ('ordenes', MAPEO_ORDENES, CONVERSIONES_ORDENES),
+}
+
+COLUMNAS_HISTORIAL = ('id', 'orden_id', 'estado_anterior', 'estado_nuevo', 'created_at')
+
+
+def _csv_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+def map_document(data, mapping, conversions=None):
+    """Devuelve los valores de las columnas de `mapping` para un documento."""
+    row = []
+    for column, fields in mapping.items():
+        value = None
+        for field in fields:
+            if data.get(field) is not None:
+                value = data[field]
+                break
+        if conversions and column in conversions:
+            value = conversions[column](value)
+        row.append(_csv_value(value))
+    return row
+
+
+def history_rows(orden_id, historial):
+    """Filas de historial_estados; el ID sale de la orden y la posición, estable entre corridas."""
+    anterior = None
+    for i, evento in enumerate(historial or ()):
+        estado = postgres_estado(evento.get('estado')) or evento.get('estado')
+        yield [firestore_uuid(f'{orden_id}/historial/{i}'), orden_id, anterior, estado,
+               _csv_value(evento.get('fecha'))]
+        anterior = estado
+
+
+class _CsvBuffer:
+    """Filas en CSV para COPY; None y '' se escriben como campo vacío, que COPY lee como NULL."""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+        self.rows = 0
+
+    def add(self, row):
+        self.writer.writerow(['' if v is None else v for v in row])
+        self.rows += 1
+
+    def rewind(self):
+        self.buffer.seek(0)
+        return self.buffer
+
+
+def _copy_upsert(cursor, table, columns, csv_buffer):
+    """COPY a una tabla temporal con los tipos de `table` y upsert por id a la tabla real."""
+    staging = f'_carga_{table}'
+    column_list = ', '.join(columns)
+    updates = ', '.join(f'{c} = EXCLUDED.{c}' for c in columns if c != 'id')
+    cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+                   f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+    cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '')",
+                       csv_buffer.rewind())
+    cursor.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} "
+                   f"ON CONFLICT (id) DO UPDATE SET {updates}")
+
+
+def ensure_checkpoint_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLA_CHECKPOINT} (
+                coleccion TEXT PRIMARY KEY,
+                ultimo_id TEXT,
+                filas BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+            )""")
+    conn.commit()
+
+
+def read_checkpoint(conn, collection):
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT ultimo_id, filas FROM {TABLA_CHECKPOINT} WHERE coleccion = %s",
+                       (collection,))
+        row = cursor.fetchone()
+    return (row[0], row[1]) if row else (None, 0)
+
+
+def _save_checkpoint(cursor, collection, last_id, rows):
+    cursor.execute(f"""
+        INSERT INTO {TABLA_CHECKPOINT} (coleccion, ultimo_id, filas, updated_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (coleccion) DO UPDATE
+        SET ultimo_id = EXCLUDED.ultimo_id, filas = EXCLUDED.filas, updated_at = NOW()
+    """, (collection, last_id, rows))
+
+
+def migrate_collection(db, conn, collection, page_size=1000, with_history=False):
+    """Migra una colección completa y devuelve el total de filas cargadas."""
+    table, mapping, conversions = MIGRACIONES[collection]
+    columns = ('id',) + tuple(mapping)
+    last_id, total = read_checkpoint(conn, collection)
+    if last_id:
+        print(f"   ↪ Reanudando '{collection}' después de '{last_id}' ({total} filas ya cargadas)")
+
+    fields = sorted({f for fs in mapping.values() for f in fs}
+                    | ({'estadoHistorial'} if with_history and collection == 'ordenes' else set()))
+    start = time.perf_counter()
+    loaded = 0
+    unknown_states = 0
+    state_index = list(mapping).index('estado') if 'estado' in conversions else None
+
+    for page in iter_pages(db.collection(collection), page_size, last_id, fields=fields):
+        rows = _CsvBuffer()
+        history = _CsvBuffer()
+        for snapshot in page:
+            data = snapshot.to_dict() or {}
+            row_id = firestore_uuid(snapshot.reference.path)
+            row = map_document(data, mapping, conversions)
+            if state_index is not None and data.get('estado') and row[state_index] is None:
+                unknown_states += 1
+            rows.add([row_id] + row)
+            if with_history and collection == 'ordenes':
+                for event in history_rows(row_id, data.get('estadoHistorial')):
+                    history.add(event)
+
+        with conn.cursor() as cursor:
+            _copy_upsert(cursor, table, columns, rows)
+            if history.rows:
+                _copy_upsert(cursor, 'historial_estados', COLUMNAS_HISTORIAL, history)
+            total += rows.rows
+            _save_checkpoint(cursor, collection, page[-1].id, total)
+        conn.commit()
+
+        loaded += rows.rows
+        elapsed = time.perf_counter() - start
+        print(f"   … '{collection}' → {table}: {total} filas ({loaded / elapsed:.0f} filas/s)")
+
+    if unknown_states:
+        print(f"   ⚠️  {unknown_states} órdenes con un estado sin equivalente en estado_orden "
+              f"(cargadas con estado NULL)")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migra Firestore a Supabase/Postgres con COPY')
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='Cadena de conexión de Postgres (por defecto: $DATABASE_URL)')
+    parser.add_argument('--colecciones', default='emisores,receptores,ordenes',
+                        help='Colecciones a migrar, en orden')
+    parser.add_argument('--pagina', type=int, default=1000,
+                        help='Documentos por página y por COPY (por defecto: 1000)')
+    parser.add_argument('--con-historial', action='store_true',
+                        help='Cargar también estadoHistorial en historial_estados')
+    parser.add_argument('--reiniciar', action='store_true',
+                        help='Ignorar los checkpoints guardados y empezar desde cero')
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('Falta --dsn o la variable DATABASE_URL')
+
+    import psycopg2
+
+    collections = [c.strip() for c in args.colecciones.split(',') if c.strip()]
+    unknown = [c for c in collections if c not in MIGRACIONES]
+    if unknown:
+        parser.error(f"Colecciones sin mapeo: {', '.join(unknown)}")
+
+    db = get_db()
+    conn = psycopg2.connect(args.dsn)
+    try:
+        ensure_checkpoint_table(conn)
+        if args.reiniciar:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {TABLA_CHECKPOINT} WHERE coleccion = ANY(%s)",
+                               (collections,))
+            conn.commit()
+
+        print("=" * 70)
+        print("🚚 MIGRACIÓN FIRESTORE → SUPABASE")
+        print("=" * 70)
+        for collection in collections:
+            start = time.perf_counter()
+            total = migrate_collection(db, conn, collection, args.pagina, args.con_historial)
+            print(f"   ✓ '{collection}': {total} filas en {time.perf_counter() - start:.2f}s")
+        print()
+        print("✅ MIGRACIÓN COMPLETADA")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
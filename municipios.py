@@ -0,0 +1,25 @@
+"""
+Provincias y municipios de Cuba para los scripts de Python.
+
+La fuente de verdad es lib/data/municipios_cuba.dart (la que usa la app);
+aquí se lee ese archivo para no mantener dos copias de la lista.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+MUNICIPIOS_DART = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'lib', 'data', 'municipios_cuba.dart')
+
+_PROVINCIA_RE = re.compile(r"'([^']+)'\s*:\s*\[(.*?)\]", re.DOTALL)
+_NOMBRE_RE = re.compile(r"'([^']+)'")
+
+
+@lru_cache(maxsize=None)
+def load_municipios(path=MUNICIPIOS_DART):
+    """Devuelve {provincia: (municipio, ...)} en el mismo orden que el archivo Dart."""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    return {provincia: tuple(_NOMBRE_RE.findall(cuerpo))
+            for provincia, cuerpo in _PROVINCIA_RE.findall(source)}
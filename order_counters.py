@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Contadores pre-agregados de órdenes en Firestore.
+
+En vez de leer toda la colección ordenes para saber cuántas hay por estado,
+se mantienen contadores por estado, por repartidor y por día en la colección
+'contadores'. Cada contador está repartido en NUM_SHARDS documentos
+(`estado_CREADA-<resumen>_0` … `_9`) para no superar el límite de
+escrituras por segundo de un solo documento; el total es la suma de sus
+shards. Leer todos los contadores de un tipo es una consulta de pocas
+decenas de documentos.
+
+Una orden con tenant_id suma en los contadores de su tenant
+(`{tenant_id}_estado_CREADA-<resumen>_0`, con el campo tenant_id); sin
+tenant_id, en los globales de siempre. <resumen> son 8 caracteres del SHA-1
+de la clave original: dos claves que se normalizan igual no comparten
+contador. `reconstruir` pone en cero los documentos con IDs anteriores.
+
+Los scripts de siembra agregan los incrementos en el mismo lote que la
+orden (ver order_write_ops); un cambio de estado o de repartidor resta uno
+en el contador anterior y suma uno en el nuevo, en el mismo lote que el
+cambio (ver order_update_ops). Para calcularlos a partir de datos existentes:
+
+    python3 order_counters.py reconstruir
+    python3 order_counters.py mostrar estado [--tenant TENANT_ID]
+"""
+
+import argparse
+import hashlib
+import random
+import re
+from collections import Counter
+from datetime import date, datetime
+
+from firestore_pages import iter_pages
+
+COLECCION_CONTADORES = 'contadores'
+NUM_SHARDS = 10
+TIPOS_CONTADOR = ('estado', 'repartidor', 'dia')
+SIN_ASIGNAR = 'SIN_ASIGNAR'
+
+_rng = random.Random()
+
+
+def _slug(value):
+    """Clave legible para el ID del documento, más un resumen de la clave sin normalizar."""
+    text = str(value)
+    digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]
+    return f"{re.sub(r'[^0-9A-Za-z_-]+', '-', text).strip('-') or '_'}-{digest}"
+
+
+def _day(value):
+    if isinstance(value, str) and len(value) >= 10:
+        return value[:10]
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    # SERVER_TIMESTAMP u otro centinela: la orden se crea hoy
+    return date.today().isoformat()
+
+
+def counter_keys(orden):
+    """(tipo, clave) de cada contador que cuenta esta orden."""
+    return (
+        ('estado', orden.get('estado') or 'SIN_ESTADO'),
+        ('repartidor', orden.get('repartidorAsignado') or SIN_ASIGNAR),
+        ('dia', _day(orden.get('fechaCreacion'))),
+    )
+
+
+def shard_ref(db, tipo, clave, shard, tenant_id=None):
+    prefix = f'{tenant_id}_' if tenant_id else ''
+    return db.collection(COLECCION_CONTADORES).document(f'{prefix}{tipo}_{_slug(clave)}_{shard}')
+
+
+def _shard_data(tipo, clave, shard, count, tenant_id=None):
+    data = {'tipo': tipo, 'clave': clave, 'shard': shard, 'count': count}
+    if tenant_id:
+        data['tenant_id'] = tenant_id
+    return data
+
+
+def counter_op(db, tipo, clave, delta=1, tenant_id=None):
+    """Operación (ref, datos, merge) que suma `delta` a un contador, en un shard al azar."""
+    from firebase_admin import firestore
+
+    shard = _rng.randrange(NUM_SHARDS)
+    return (shard_ref(db, tipo, clave, shard, tenant_id),
+            _shard_data(tipo, clave, shard, firestore.Increment(delta), tenant_id),
+            True)
+
+
+def increment_ops(db, orden, delta=1):
+    """Operaciones (ref, datos, merge) que suman `delta` en un shard al azar de cada contador."""
+    tenant_id = orden.get('tenant_id')
+    return [counter_op(db, tipo, clave, delta, tenant_id) for tipo, clave in counter_keys(orden)]
+
+
+def order_write_ops(db, orden, ref=None):
+    """La escritura de la orden más sus incrementos, para confirmarlos en el mismo lote."""
+    ref = ref or db.collection('ordenes').document()
+    return [(ref, orden, False)] + increment_ops(db, orden)
+
+
+def change_ops(db, antes, despues):
+    """
+    Pares −1/+1 en los contadores de estado y repartidor que cambian entre
+    `antes` y `despues` (la orden completa antes y después del cambio).
+    """
+    ops = []
+    tenant_id = antes.get('tenant_id')
+    for (tipo, previa), (_, nueva) in zip(counter_keys(antes)[:2], counter_keys(despues)[:2]):
+        if previa != nueva:
+            ops.append(counter_op(db, tipo, previa, -1, tenant_id))
+            ops.append(counter_op(db, tipo, nueva, 1, tenant_id))
+    return ops
+
+
+def order_update_ops(db, ref, orden, cambios):
+    """
+    La actualización `cambios` de la orden `orden` (sus datos actuales) más
+    los ajustes de contadores, para confirmarlos en el mismo lote.
+    """
+    return [(ref, cambios, True)] + change_ops(db, orden, {**orden, **cambios})
+
+
+def read_counters(db, tipo, tenant_id=None):
+    """
+    Totales {clave: cantidad} de un tipo de contador (suma de los shards).
+    Sin `tenant_id` suma los de todos los tenants y los globales.
+    """
+    totals = Counter()
+    query = db.collection(COLECCION_CONTADORES).where('tipo', '==', tipo)
+    if tenant_id:
+        query = query.where('tenant_id', '==', tenant_id)
+    for snapshot in query.stream():
+        data = snapshot.to_dict()
+        totals[data['clave']] += data.get('count', 0)
+    return dict(totals)
+
+
+def count_orders(ordenes, totals=None):
+    """Suma cada orden (dict) en `totals`, un Counter {(tenant_id, tipo, clave): cantidad}."""
+    totals = Counter() if totals is None else totals
+    for orden in ordenes:
+        tenant_id = orden.get('tenant_id')
+        for tipo, clave in counter_keys(orden):
+            totals[tenant_id, tipo, clave] += 1
+    return totals
+
+
+def write_counter_totals(db, writer, totals, tenant_id=None):
+    """
+    Reescribe los contadores con `totals` (de count_orders): el total en el
+    shard 0 y en cero los demás shards que existan. Los contadores existentes
+    que no aparecen en `totals` quedan en cero; con `tenant_id` solo se tocan
+    los de ese tenant.
+    """
+    existing = {}
+    for tipo in TIPOS_CONTADOR:
+        query = db.collection(COLECCION_CONTADORES).where('tipo', '==', tipo)
+        if tenant_id:
+            query = query.where('tenant_id', '==', tenant_id)
+        for snapshot in query.stream():
+            data = snapshot.to_dict() or {}
+            existing[snapshot.id] = snapshot.reference
+            totals.setdefault((data.get('tenant_id'), tipo, data.get('clave')), 0)
+
+    written = set()
+    for (tenant, tipo, clave), total in totals.items():
+        ref = shard_ref(db, tipo, clave, 0, tenant)
+        writer.set(ref, _shard_data(tipo, clave, 0, total, tenant))
+        written.add(ref.id)
+    # Los demás shards, y los documentos con IDs de versiones anteriores, en cero
+    for doc_id, ref in existing.items():
+        if doc_id not in written:
+            writer.set(ref, {'count': 0}, merge=True)
+    return totals
+
+
+def rebuild_counters(db, writer, page_size=1000):
+    """
+    Recalcula todos los contadores (globales y por tenant) leyendo ordenes una
+    vez, solo los campos necesarios, y los reescribe con write_counter_totals.
+    """
+    totals = Counter()
+    fields = ['estado', 'repartidorAsignado', 'fechaCreacion', 'tenant_id']
+    for page in iter_pages(db.collection('ordenes'), page_size, fields=fields):
+        count_orders((snapshot.to_dict() or {} for snapshot in page), totals)
+    return write_counter_totals(db, writer, totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Contadores pre-agregados de órdenes')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('reconstruir', help='Recalcula los contadores desde la colección ordenes')
+    mostrar = sub.add_parser('mostrar', help='Muestra los totales de un tipo de contador')
+    mostrar.add_argument('tipo', choices=TIPOS_CONTADOR, nargs='?', default='estado')
+    mostrar.add_argument('--tenant', help='Solo los contadores de este tenant_id')
+    args = parser.parse_args()
+
+    from firebase_client import get_db
+    from firestore_batch import make_writer
+
+    db = get_db()
+    if args.comando == 'reconstruir':
+        print("🔢 Reconstruyendo contadores desde 'ordenes'...")
+        with make_writer(db, 'lote') as writer:
+            totals = rebuild_counters(db, writer)
+        print(f"   ✓ {len(totals)} contadores escritos")
+        writer.stats.print_summary()
+    else:
+        totals = read_counters(db, args.tipo, args.tenant)
+        print(f"📊 Órdenes por {args.tipo}{f' (tenant {args.tenant})' if args.tenant else ''}:")
+        for clave, total in sorted(totals.items()):
+            print(f"   - {clave}: {total}")
+
+
+if __name__ == "__main__":
+    main()
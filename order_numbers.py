@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Numeración de órdenes (ORD-YYYY-NNNN) sin un contador único en Firestore.
+
+En Postgres la numeración sale de una secuencia (update_ordenes_with_numbering.sql);
+Firestore no tiene secuencias y un solo documento contador actualizado en
+transacción aguanta del orden de una escritura por segundo. Aquí la
+numeración de cada año está repartida en NUM_SHARDS documentos de la
+colección 'numeracion' (`2026_0` … `2026_9`):
+
+- cada shard es dueño de tramos fijos de NUMEROS_POR_TRAMO números, de forma
+  intercalada: con 10 shards y tramos de 100, el shard 0 tiene 1-100,
+  1001-1100, …, el shard 1 tiene 101-200, 1101-1200, …
+- el campo `usados` de un shard dice cuántos de sus números ya se entregaron
+- un escritor reserva un bloque de `block_size` números con una transacción
+  sobre un shard al azar (lee `usados` y lo incrementa) y después entrega
+  los números del bloque localmente, sin más RPCs
+
+Los números nunca se repiten, pero no son consecutivos: un bloque que no se
+termina de usar y los shards que avanzan a distinto ritmo dejan huecos,
+igual que una secuencia de Postgres con CACHE. Cada año empieza de nuevo en 1.
+
+Uso:
+    python3 order_numbers.py siguiente [--cantidad 5]
+    python3 order_numbers.py estres --hilos 32 --numeros 2000 --bloque 50   (emulador)
+"""
+
+import argparse
+import random
+import threading
+import time
+from datetime import datetime
+
+COLECCION_NUMERACION = 'numeracion'
+NUM_SHARDS = 10
+NUMEROS_POR_TRAMO = 100
+TAMANO_BLOQUE = 100
+# Intentos por reserva: con muchos escritores en el mismo shard la transacción se repite
+MAX_INTENTOS_TRANSACCION = 20
+
+
+def format_number(year, number):
+    return f"ORD-{year}-{number:04d}"
+
+
+def shard_ref(db, year, shard):
+    return db.collection(COLECCION_NUMERACION).document(f'{year}_{shard}')
+
+
+def shard_numbers(shard, start, count, shards=NUM_SHARDS):
+    """Los números `start` … `start + count - 1` del shard (contando desde 0) en la numeración global."""
+    for offset in range(start, start + count):
+        tramo, posicion = divmod(offset, NUMEROS_POR_TRAMO)
+        yield (tramo * shards + shard) * NUMEROS_POR_TRAMO + posicion + 1
+
+
+class OrderNumberAllocator:
+    """
+    Entrega números de orden por año reservando bloques en los shards de
+    'numeracion'. Es seguro usar una instancia desde varios hilos.
+    """
+
+    def __init__(self, db, block_size=TAMANO_BLOQUE, shards=NUM_SHARDS, rng=None):
+        self.db = db
+        self.block_size = block_size
+        self.shards = shards
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        # Aparte de _lock, que ya está tomado mientras corre la transacción
+        self._stats_lock = threading.Lock()
+        self._blocks = {}
+        self.reservas = 0
+        self.intentos = 0
+
+    def _attempted(self):
+        with self._stats_lock:
+            self.intentos += 1
+
+    def _reserve(self, year):
+        """Reserva un bloque en un shard al azar; devuelve un iterador de números."""
+        from firebase_admin import firestore
+
+        shard = self._rng.randrange(self.shards)
+        ref = shard_ref(self.db, year, shard)
+
+        @firestore.transactional
+        def reserve(transaction):
+            self._attempted()
+            snapshot = ref.get(transaction=transaction)
+            used = (snapshot.get('usados') if snapshot.exists else 0) or 0
+            transaction.set(ref, {'anio': year, 'shard': shard, 'usados': used + self.block_size,
+                                  'actualizado': firestore.SERVER_TIMESTAMP})
+            return used
+
+        start = reserve(self.db.transaction(max_attempts=MAX_INTENTOS_TRANSACCION))
+        with self._stats_lock:
+            self.reservas += 1
+        return shard_numbers(shard, start, self.block_size, self.shards)
+
+    def next_number(self, year=None):
+        """Siguiente número (entero) del año; solo hace una RPC cuando se agota el bloque."""
+        year = year or datetime.now().year
+        with self._lock:
+            block = self._blocks.get(year)
+            number = next(block, None) if block else None
+            if number is None:
+                block = self._blocks[year] = self._reserve(year)
+                number = next(block)
+            return number
+
+    def next(self, year=None):
+        """Siguiente numeroOrden, p. ej. 'ORD-2026-0042'."""
+        year = year or datetime.now().year
+        return format_number(year, self.next_number(year))
+
+
+# ==============================================================================
+# PRUEBA DE CONCURRENCIA
+# ==============================================================================
+
+def stress(db, threads, numbers_per_thread, block_size, year):
+    """
+    `threads` escritores, cada uno con su propio asignador, piden números a la
+    vez. Devuelve (números entregados, repetidos, reservas, intentos, segundos).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from firestore_delete import bulk_delete_collection
+
+    bulk_delete_collection(db, COLECCION_NUMERACION)
+    allocators = [OrderNumberAllocator(db, block_size) for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def worker(allocator):
+        barrier.wait()
+        return [allocator.next_number(year) for _ in range(numbers_per_thread)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, allocators))
+    elapsed = time.perf_counter() - start
+
+    numbers = [n for result in results for n in result]
+    duplicated = len(numbers) - len(set(numbers))
+    # Los shards en Firestore deben cubrir todos los números entregados
+    used = sum((snapshot.get('usados') or 0)
+               for snapshot in db.collection(COLECCION_NUMERACION)
+               .where('anio', '==', year).stream())
+    reserved = sum(a.reservas for a in allocators) * block_size
+    if used != reserved:
+        raise RuntimeError(f"Los shards suman {used} números pero se reservaron {reserved}")
+    return (len(numbers), duplicated, sum(a.reservas for a in allocators),
+            sum(a.intentos for a in allocators), elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Numeración de órdenes ORD-YYYY-NNNN')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    siguiente = sub.add_parser('siguiente', help='Reserva y muestra números de orden')
+    siguiente.add_argument('--cantidad', type=int, default=1)
+    siguiente.add_argument('--anio', type=int, default=None)
+    estres = sub.add_parser('estres', help='Prueba de concurrencia contra el emulador')
+    estres.add_argument('--hilos', type=int, default=32)
+    estres.add_argument('--numeros', type=int, default=1000, help='Números por hilo')
+    estres.add_argument('--bloque', type=int, default=50)
+    estres.add_argument('--anio', type=int, default=2999,
+                        help='Año de prueba (por defecto: 2999)')
+    args = parser.parse_args()
+
+    if args.comando == 'estres':
+        # Nunca contra producción: borra la colección de numeración
+        from benchmark_admin import use_emulators
+
+        use_emulators()
+
+    from firebase_client import get_db
+
+    db = get_db()
+    if args.comando == 'siguiente':
+        allocator = OrderNumberAllocator(db, block_size=args.cantidad)
+        for _ in range(args.cantidad):
+            print(allocator.next(args.anio))
+        return
+
+    print("=" * 70)
+    print(f"🔢 PRUEBA DE CONCURRENCIA: {args.hilos} hilos × {args.numeros} números "
+          f"(bloques de {args.bloque})")
+    print("=" * 70)
+    total, duplicated, reservas, intentos, elapsed = stress(
+        db, args.hilos, args.numeros, args.bloque, args.anio)
+    print(f"   Números entregados:  {total} en {elapsed:.2f} s ({total / elapsed:.0f}/s)")
+    print(f"   Reservas de bloque:  {reservas} ({intentos - reservas} reintentos por contención)")
+    print(f"   RPCs por número:     {intentos / total:.3f} transacciones")
+    if duplicated:
+        print(f"❌ {duplicated} números repetidos")
+        raise SystemExit(1)
+    print("✅ Sin números repetidos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Registros compactos para manejar órdenes, contactos y usuarios en memoria.
+
+Los scripts representan cada orden como un dict con ~30 claves repetidas y
+un estadoHistorial de dicts con fechas ISO; con millones de órdenes en
+memoria (generación, migraciones) eso son cientos de bytes por registro
+solo en diccionarios. Estas clases usan __slots__ (dataclass con
+slots=True), el estado es un Enum (una sola instancia por valor; un estado
+que no conoce se conserva como texto internado), las fechas
+son segundos desde la época (int) y los textos de pocos valores distintos
+(provincia, municipio, usuario, moneda…) se internan.
+
+Los atributos se llaman igual que los campos de Firestore y del modelo Dart.
+La conversión a dict se hace solo al escribir (to_firestore) y la inversa al
+leer (from_firestore); los campos que no modela la clase (emisorId,
+contentHash, createdAt…) viajan en `extras`.
+
+Las fechas se guardan con precisión de segundos y, como en el resto de los
+scripts, sin zona horaria.
+
+Para comparar la memoria con los dicts:
+    python3 benchmark_admin.py memoria --tamanos 10000,100000
+"""
+
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Optional
+
+EPOCA = datetime(1970, 1, 1)
+
+
+class Estado(str, Enum):
+    CREADA = 'CREADA'
+    ENVIADA = 'ENVIADA'
+    REPARTIENDO = 'REPARTIENDO'
+    ENTREGADA = 'ENTREGADA'
+    # Estados de la app Flutter (enum estado_orden de Postgres)
+    POR_ENVIAR = 'POR ENVIAR'
+    EN_TRANSITO = 'EN TRANSITO'
+    ENTREGADO = 'ENTREGADO'
+    CANCELADA = 'CANCELADA'
+    ATRASADO = 'ATRASADO'
+
+
+def to_estado(value):
+    """Estado del valor de Firestore; uno desconocido queda como texto para no perder la orden."""
+    try:
+        return Estado(value)
+    except ValueError:
+        return _intern(value)
+
+
+def _estado_value(estado):
+    return estado.value if isinstance(estado, Estado) else estado
+
+
+def to_epoch(value):
+    """Segundos desde la época de una fecha ISO, datetime, int o float (None se conserva)."""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        return int(value.timestamp())
+    return int((value - EPOCA).total_seconds())
+
+
+def from_epoch(seconds):
+    return None if seconds is None else EPOCA + timedelta(seconds=seconds)
+
+
+def _iso(seconds):
+    return None if seconds is None else from_epoch(seconds).isoformat()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _split(data, fields):
+    """(campos modelados, resto) de un dict de Firestore."""
+    known = {k: data[k] for k in fields if k in data}
+    extras = {k: v for k, v in data.items() if k not in known}
+    return known, extras or None
+
+
+@dataclass(slots=True)
+class EstadoEvento:
+    estado: Estado
+    fecha: int
+    usuario: str
+
+    def to_firestore(self):
+        return {'estado': _estado_value(self.estado), 'fecha': _iso(self.fecha),
+                'usuario': self.usuario}
+
+    @classmethod
+    def from_firestore(cls, data):
+        return cls(to_estado(data['estado']), to_epoch(data.get('fecha')),
+                   _intern(data.get('usuario')))
+
+
+# Campos de texto con pocos valores distintos: se internan al leer
+_INTERNADOS = ('provinciaDestino', 'municipioDestino', 'repartidorAsignado', 'moneda',
+               'createdBy', 'descripcion')
+_FECHAS_ORDEN = ('fechaCreacion', 'fechaEstimadaEntrega', 'fechaEntrega', 'fechaPago')
+
+
+@dataclass(slots=True)
+class Orden:
+    numeroOrden: Optional[str] = None
+    emisorNombre: Optional[str] = None
+    emisorTelefono: Optional[str] = None
+    emisorDireccion: Optional[str] = None
+    receptorNombre: Optional[str] = None
+    receptorTelefono: Optional[str] = None
+    receptorDireccion: Optional[str] = None
+    descripcion: Optional[str] = None
+    notasAdicionales: str = ''
+    estado: Estado = Estado.CREADA
+    estadoHistorial: list = field(default_factory=list)
+    fechaCreacion: Optional[int] = None
+    fechaEstimadaEntrega: Optional[int] = None
+    fechaEntrega: Optional[int] = None
+    repartidorAsignado: Optional[str] = None
+    provinciaDestino: Optional[str] = None
+    municipioDestino: Optional[str] = None
+    peso: Optional[float] = None
+    largo: Optional[float] = None
+    ancho: Optional[float] = None
+    alto: Optional[float] = None
+    cantidadBultos: int = 1
+    esUrgente: bool = False
+    requierePago: bool = False
+    montoCobrar: float = 0.0
+    moneda: str = 'USD'
+    pagado: bool = False
+    fechaPago: Optional[int] = None
+    createdBy: Optional[str] = None
+    activa: bool = True
+    extras: Optional[dict] = None
+
+    def to_firestore(self):
+        data = {}
+        for name in _CAMPOS_ORDEN:
+            value = getattr(self, name)
+            if name in _FECHAS_ORDEN:
+                value = _iso(value)
+            data[name] = value
+        data['estado'] = _estado_value(self.estado)
+        data['estadoHistorial'] = [evento.to_firestore() for evento in self.estadoHistorial]
+        if self.extras:
+            data.update(self.extras)
+        return data
+
+    @classmethod
+    def from_firestore(cls, data):
+        known, extras = _split(data, _CAMPOS_ORDEN)
+        for name in _FECHAS_ORDEN:
+            if name in known:
+                known[name] = to_epoch(known[name])
+        for name in _INTERNADOS:
+            if name in known:
+                known[name] = _intern(known[name])
+        known['estado'] = to_estado(known.get('estado', Estado.CREADA))
+        known['estadoHistorial'] = [EstadoEvento.from_firestore(evento)
+                                    for evento in known.get('estadoHistorial') or ()]
+        return cls(**known, extras=extras)
+
+
+_CAMPOS_ORDEN = tuple(name for name in Orden.__dataclass_fields__ if name != 'extras')
+
+
+@dataclass(slots=True)
+class Contacto:
+    """Emisor o receptor."""
+    nombre: Optional[str] = None
+    telefono: Optional[str] = None
+    direccion: Optional[str] = None
+    email: Optional[str] = None
+    rut: Optional[str] = None
+    activo: bool = True
+    extras: Optional[dict] = None
+
+    def to_firestore(self):
+        data = {name: getattr(self, name) for name in _CAMPOS_CONTACTO}
+        if self.extras:
+            data.update(self.extras)
+        return data
+
+    @classmethod
+    def from_firestore(cls, data):
+        known, extras = _split(data, _CAMPOS_CONTACTO)
+        return cls(**known, extras=extras)
+
+
+_CAMPOS_CONTACTO = tuple(name for name in Contacto.__dataclass_fields__ if name != 'extras')
+
+
+@dataclass(slots=True)
+class Usuario:
+    email: Optional[str] = None
+    nombre: Optional[str] = None
+    rol: Optional[str] = None
+    activo: bool = True
+    extras: Optional[dict] = None
+
+    def to_firestore(self):
+        data = {'email': self.email, 'nombre': self.nombre, 'rol': self.rol,
+                'activo': self.activo}
+        if self.extras:
+            data.update(self.extras)
+        return data
+
+    @classmethod
+    def from_firestore(cls, data):
+        known, extras = _split(data, ('email', 'nombre', 'rol', 'activo'))
+        if 'rol' in known:
+            known['rol'] = _intern(known['rol'])
+        return cls(**known, extras=extras)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Miniaturas y variantes WebP de las fotos de entrega y de perfil.
+
+Las órdenes guardan fotoEntrega (foto_entrega en Postgres) y los usuarios
+foto_perfil: fotos de teléfono a tamaño completo que los paneles descargan
+enteras solo para mostrar una miniatura. Este script recorre la carpeta de
+fotos (copia local del bucket fotos-perfil) y, en un pool de procesos,
+genera para cada foto nueva:
+
+- una miniatura JPEG de LADO_MINIATURA px de lado mayor
+- una variante WebP de LADO_WEBP px de lado mayor
+
+Las variantes se nombran por el hash del contenido (<sha256>_min.jpg y
+<sha256>.webp): dos fotos con el mismo nombre en subcarpetas distintas no se
+pisan, y dos copias de la misma foto comparten variantes.
+
+Las fotos .heic solo se procesan si está instalado pillow-heif (plugin HEIF
+de Pillow); sin él se omiten con un aviso.
+
+Con JPEG se usa Image.draft para decodificar ya reducida (mucho más rápido
+que abrir la foto completa) y se respeta la orientación EXIF.
+
+Qué se salta: un manifiesto JSON guarda, por foto, tamaño, fecha de
+modificación y hash SHA-256 del contenido. Si tamaño y fecha no cambiaron
+no se vuelve a leer; si cambiaron pero el hash es uno ya procesado, se
+reutilizan sus variantes.
+
+Los nombres siguen los de la app: entrega_<idOrden>_<ms>.jpg para entregas
+y <idUsuario>_<ms>.jpg para perfiles. Las rutas (o URLs, con --url-base) de
+las variantes se escriben por lotes en fotoEntregaMiniatura/fotoEntregaWebp
+de la orden o fotoPerfilMiniatura/fotoPerfilWebp del usuario, solo si el
+documento existe (se comprueba con get_all). El manifiesto se guarda al
+final, después de las escrituras.
+
+Requiere Pillow (pip install pillow) y, para HEIC, pillow-heif.
+
+Uso:
+    python3 photo_pipeline.py fotos/ --salida miniaturas/ [--procesos 8] [--simular]
+    python3 photo_pipeline.py fotos/ --salida miniaturas/ --url-base https://cdn.ejemplo/miniaturas
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from firestore_upsert import TAMANO_LECTURA
+
+LADO_MINIATURA = 320
+LADO_WEBP = 1280
+CALIDAD_JPEG = 80
+CALIDAD_WEBP = 78
+EXTENSIONES = ('.jpg', '.jpeg', '.png', '.heic', '.webp')
+ARCHIVO_MANIFIESTO = 'manifiesto_fotos.json'
+
+_ENTREGA_RE = re.compile(r'^entrega_(?P<id>.+)_\d+$')
+_PERFIL_RE = re.compile(r'^(?P<id>.+)_\d+$')
+
+
+def photo_target(filename):
+    """(colección, ID, prefijo de campo) del documento al que pertenece la foto, o None."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    match = _ENTREGA_RE.match(stem)
+    if match:
+        return 'ordenes', match['id'], 'fotoEntrega'
+    match = _PERFIL_RE.match(stem)
+    if match:
+        return 'usuarios', match['id'], 'fotoPerfil'
+    return None
+
+
+def _register_heif():
+    """Registra el plugin HEIF de Pillow si pillow-heif está instalado."""
+    try:
+        from pillow_heif import register_heif_opener
+    except ImportError:
+        return False
+    register_heif_opener()
+    return True
+
+
+def photo_extensions():
+    """Las EXTENSIONES que Pillow sabe abrir aquí (.heic solo con el plugin HEIF)."""
+    from PIL import Image
+
+    _register_heif()
+    registered = Image.registered_extensions()
+    return tuple(ext for ext in EXTENSIONES if ext in registered)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _resized(image, side):
+    copy = image.copy()
+    copy.thumbnail((side, side))
+    return copy
+
+
+def process_photo(path, output_dir, digest):
+    """
+    Trabajo de un proceso: genera la miniatura y el WebP de `path`, con
+    nombres a partir de su hash `digest`. Devuelve
+    ({miniatura, webp}, bytes originales, bytes miniatura, bytes webp).
+    """
+    from PIL import Image, ImageOps
+
+    if path.lower().endswith('.heic'):
+        # Los procesos del pool no heredan el registro si se crean con spawn
+        _register_heif()
+    thumb_path = os.path.join(output_dir, f'{digest}_min.jpg')
+    webp_path = os.path.join(output_dir, f'{digest}.webp')
+
+    with Image.open(path) as image:
+        # Decodificar JPEG ya reducido: basta con el doble del lado más grande pedido
+        image.draft('RGB', (LADO_WEBP * 2, LADO_WEBP * 2))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        _resized(image, LADO_WEBP).save(webp_path, 'WEBP', quality=CALIDAD_WEBP, method=4)
+        _resized(image, LADO_MINIATURA).save(thumb_path, 'JPEG', quality=CALIDAD_JPEG,
+                                             optimize=True)
+    return ({'miniatura': thumb_path, 'webp': webp_path}, os.path.getsize(path),
+            os.path.getsize(thumb_path), os.path.getsize(webp_path))
+
+
+class Manifest:
+    """Fotos ya procesadas: por ruta (tamaño, mtime, hash) y por hash (variantes)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.archivos = {}
+        self.hashes = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.archivos = data.get('archivos', {})
+            self.hashes = data.get('hashes', {})
+
+    def unchanged(self, path, stat):
+        entry = self.archivos.get(path)
+        return bool(entry) and entry['tamano'] == stat.st_size and entry['mtime'] == stat.st_mtime
+
+    def add(self, path, stat, digest, variants):
+        self.archivos[path] = {'tamano': stat.st_size, 'mtime': stat.st_mtime, 'hash': digest}
+        self.hashes[digest] = variants
+
+    def save(self):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'archivos': self.archivos, 'hashes': self.hashes}, f)
+        os.replace(tmp, self.path)
+
+
+class PipelineStats:
+    def __init__(self):
+        self.procesadas = 0
+        self.sin_cambios = 0
+        self.repetidas = 0
+        self.fallidas = []
+        self.bytes_originales = 0
+        self.bytes_miniaturas = 0
+        self.bytes_webp = 0
+        self.segundos = 0.0
+
+    def print_summary(self):
+        rate = self.procesadas / self.segundos if self.segundos else 0
+        print(f"   🖼️  Procesadas:        {self.procesadas} ({rate:.1f} imágenes/s)")
+        print(f"   ⏭️  Sin cambios:       {self.sin_cambios}")
+        print(f"   ♻️  Contenido repetido: {self.repetidas}")
+        if self.fallidas:
+            print(f"   ❌ Fallidas:          {len(self.fallidas)}")
+        if self.bytes_originales:
+            mb = 1024 * 1024
+            print(f"   📦 Originales: {self.bytes_originales / mb:.1f} MB → "
+                  f"WebP {self.bytes_webp / mb:.1f} MB "
+                  f"({(1 - self.bytes_webp / self.bytes_originales) * 100:.0f}% menos), "
+                  f"miniaturas {self.bytes_miniaturas / mb:.1f} MB "
+                  f"({(1 - self.bytes_miniaturas / self.bytes_originales) * 100:.0f}% menos)")
+
+
+def scan_photos(source_dir, extensions=EXTENSIONES):
+    for root, _, files in os.walk(source_dir):
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                yield os.path.join(root, name)
+
+
+def process_directory(source_dir, output_dir, manifest, workers=None, extensions=None):
+    """Procesa las fotos nuevas o cambiadas. Devuelve (PipelineStats, {foto: variantes})."""
+    stats = PipelineStats()
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    pending = []
+    for path in scan_photos(source_dir, extensions or photo_extensions()):
+        stat = os.stat(path)
+        if manifest.unchanged(path, stat):
+            stats.sin_cambios += 1
+        else:
+            pending.append((path, stat))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashes = [(path, stat, pool.submit(file_hash, path)) for path, stat in pending]
+        # Hash nuevo → fotos con ese contenido; cada contenido se procesa una sola vez
+        new = {}
+        for path, stat, future in hashes:
+            digest = future.result()
+            if digest in manifest.hashes:
+                manifest.add(path, stat, digest, manifest.hashes[digest])
+                results[path] = manifest.hashes[digest]
+                stats.repetidas += 1
+            elif digest in new:
+                new[digest].append((path, stat))
+                stats.repetidas += 1
+            else:
+                new[digest] = [(path, stat)]
+        work = {digest: pool.submit(process_photo, photos[0][0], output_dir, digest)
+                for digest, photos in new.items()}
+        for digest, future in work.items():
+            try:
+                variants, original, thumb, webp = future.result()
+            except Exception as e:
+                stats.fallidas.append((new[digest][0][0], f'{type(e).__name__}: {e}'))
+                continue
+            for path, stat in new[digest]:
+                manifest.add(path, stat, digest, variants)
+                results[path] = variants
+            stats.procesadas += 1
+            stats.bytes_originales += original
+            stats.bytes_miniaturas += thumb
+            stats.bytes_webp += webp
+    stats.segundos = time.perf_counter() - start
+    return stats, results
+
+
+def write_references(db, writer, results, output_dir, url_base=None):
+    """Escribe las rutas de las variantes en los documentos que existen. Devuelve cuántos."""
+    from firebase_admin import firestore
+
+    def location(path):
+        if not url_base:
+            return path
+        return f"{url_base.rstrip('/')}/{os.path.relpath(path, output_dir).replace(os.sep, '/')}"
+
+    updates = []
+    for photo, variants in results.items():
+        target = photo_target(photo)
+        if target:
+            collection, doc_id, prefix = target
+            updates.append((db.collection(collection).document(doc_id), prefix, variants))
+
+    written = 0
+    for i in range(0, len(updates), TAMANO_LECTURA):
+        chunk = updates[i:i + TAMANO_LECTURA]
+        existing = {s.reference.path for s in db.get_all([ref for ref, _, _ in chunk],
+                                                          field_paths=[]) if s.exists}
+        for ref, prefix, variants in chunk:
+            if ref.path not in existing:
+                continue
+            writer.set(ref, {f'{prefix}Miniatura': location(variants['miniatura']),
+                             f'{prefix}Webp': location(variants['webp']),
+                             'updatedAt': firestore.SERVER_TIMESTAMP}, merge=True)
+            written += 1
+    return written
+
+
+def main():
+    from firestore_batch import add_writer_arguments, make_writer
+
+    parser = argparse.ArgumentParser(description='Miniaturas y WebP de fotos de entrega y perfil')
+    parser.add_argument('origen', help='Carpeta con las fotos originales')
+    parser.add_argument('--salida', default='miniaturas', help='Carpeta de las variantes')
+    parser.add_argument('--manifiesto', default=ARCHIVO_MANIFIESTO)
+    parser.add_argument('--procesos', type=int, default=None,
+                        help='Procesos en paralelo (por defecto: uno por núcleo)')
+    parser.add_argument('--url-base', default=None,
+                        help='Prefijo de URL para las variantes (por defecto: la ruta local)')
+    parser.add_argument('--simular', action='store_true',
+                        help='Generar las variantes sin escribir en Firestore ni en el manifiesto')
+    add_writer_arguments(parser)
+    parser.set_defaults(modo='lote')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"🖼️  PROCESAMIENTO DE FOTOS: {args.origen} → {args.salida}")
+    print("=" * 70)
+
+    extensions = photo_extensions()
+    skipped = sorted(set(EXTENSIONES) - set(extensions))
+    if skipped:
+        print(f"⚠️  Pillow no sabe abrir {', '.join(skipped)} (¿falta pillow-heif?): se omiten")
+
+    manifest = Manifest(args.manifiesto)
+    stats, results = process_directory(args.origen, args.salida, manifest, args.procesos,
+                                       extensions)
+    stats.print_summary()
+    for path, error in stats.fallidas[:10]:
+        print(f"      {path}: {error}")
+
+    if args.simular or not results:
+        return
+
+    from firebase_client import get_db
+
+    db = get_db()
+    with make_writer(db, args.modo, args.en_vuelo, rate_limit=not args.sin_limite) as writer:
+        written = write_references(db, writer, results, args.salida, args.url_base)
+    manifest.save()
+    print()
+    print(f"✅ {written} documentos actualizados "
+          f"({len(results) - written} fotos sin orden o usuario en Firestore)")
+    writer.stats.print_summary()
+
+
+if __name__ == "__main__":
+    main()
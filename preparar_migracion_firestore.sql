@@ -0,0 +1,71 @@
+-- =====================================================
+-- PREPARAR EL ESQUEMA PARA migrate_firestore_to_supabase.py
+-- =====================================================
+-- Destino: el esquema de la app (create_ordenes_simple.sql con el enum
+-- estado_orden, los add_*.sql, update_ordenes_with_numbering.sql,
+-- create_destinatarios_table.sql y fix_emisores_table.sql). No sirve para
+-- supabase_migration.sql, que usa otras columnas y otros estados.
+--
+-- Es idempotente: agrega solo lo que falte de lo que carga la migración.
+
+-- 1. Estado ATRASADO (add_estado_atrasado.sql)
+ALTER TYPE estado_orden ADD VALUE IF NOT EXISTS 'ATRASADO';
+
+-- 2. Columnas de ordenes que carga la migración
+ALTER TABLE public.ordenes
+ADD COLUMN IF NOT EXISTS numero_orden TEXT,
+ADD COLUMN IF NOT EXISTS emisor_id UUID,
+ADD COLUMN IF NOT EXISTS destinatario_id UUID,
+ADD COLUMN IF NOT EXISTS telefono_destinatario TEXT,
+ADD COLUMN IF NOT EXISTS provincia_destino TEXT,
+ADD COLUMN IF NOT EXISTS municipio_destino TEXT,
+ADD COLUMN IF NOT EXISTS consejo_popular_batey TEXT,
+ADD COLUMN IF NOT EXISTS notas TEXT,
+ADD COLUMN IF NOT EXISTS fecha_estimada_entrega TIMESTAMP WITH TIME ZONE,
+ADD COLUMN IF NOT EXISTS peso DECIMAL(10, 2),
+ADD COLUMN IF NOT EXISTS largo DECIMAL(10, 2),
+ADD COLUMN IF NOT EXISTS ancho DECIMAL(10, 2),
+ADD COLUMN IF NOT EXISTS alto DECIMAL(10, 2),
+ADD COLUMN IF NOT EXISTS cantidad_bultos INTEGER DEFAULT 1,
+ADD COLUMN IF NOT EXISTS es_urgente BOOLEAN DEFAULT FALSE,
+ADD COLUMN IF NOT EXISTS foto_entrega TEXT,
+ADD COLUMN IF NOT EXISTS requiere_pago BOOLEAN DEFAULT FALSE,
+ADD COLUMN IF NOT EXISTS monto_cobrar NUMERIC(10,2) DEFAULT 0.00,
+ADD COLUMN IF NOT EXISTS moneda TEXT DEFAULT 'CUP',
+ADD COLUMN IF NOT EXISTS pagado BOOLEAN DEFAULT FALSE,
+ADD COLUMN IF NOT EXISTS fecha_pago TIMESTAMP WITH TIME ZONE,
+ADD COLUMN IF NOT EXISTS notas_pago TEXT;
+
+-- Sin FOREIGN KEY: una orden puede apuntar a un contacto que no está en Firestore
+CREATE INDEX IF NOT EXISTS idx_ordenes_emisor_id ON public.ordenes(emisor_id);
+CREATE INDEX IF NOT EXISTS idx_ordenes_destinatario_id ON public.ordenes(destinatario_id);
+
+-- 3. Columnas de emisores (fix_emisores_table.sql)
+ALTER TABLE public.emisores
+ADD COLUMN IF NOT EXISTS telefono TEXT,
+ADD COLUMN IF NOT EXISTS direccion TEXT,
+ADD COLUMN IF NOT EXISTS email TEXT,
+ADD COLUMN IF NOT EXISTS empresa TEXT,
+ADD COLUMN IF NOT EXISTS notas TEXT,
+ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+-- 4. Columnas de destinatarios (create_destinatarios_table.sql)
+ALTER TABLE public.destinatarios
+ADD COLUMN IF NOT EXISTS empresa TEXT,
+ADD COLUMN IF NOT EXISTS consejo_popular_batey TEXT;
+
+-- 5. Historial de estados (con --con-historial)
+CREATE TABLE IF NOT EXISTS public.historial_estados (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    orden_id UUID REFERENCES public.ordenes(id) ON DELETE CASCADE,
+    estado_anterior TEXT,
+    estado_nuevo TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_historial_estados_orden ON public.historial_estados(orden_id);
+
+-- Verificar las columnas de ordenes
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'ordenes'
+ORDER BY ordinal_position;
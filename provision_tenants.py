@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Alta de muchos tenants de demostración a la vez.
+
+MULTI_TENANCY_OPCIONAL, crear_tenant_prueba.sql y agregar_tenant_id_usuarios.sql
+agregan tenant_id a todas las tablas, pero los scripts de siembra y de
+usuarios solo conocían un único conjunto de datos global: levantar 100
+tenants era correr 100 veces setup_firestore.py y create_auth_users.py.
+
+Este script da de alta N tenants en paralelo. Cada tenant tiene su propio
+hilo de trabajo, que:
+
+1. importa sus usuarios en Firebase Auth (un administrador y un repartidor
+   por cada nombre de generate_ordenes.REPARTIDORES) con tenant_id en los
+   custom claims
+2. escribe el documento tenants/{tenant_id}, los perfiles usuarios/{uid} y
+   sus órdenes sintéticas (generate_ordenes.py, con semilla propia)
+
+Todos los documentos llevan tenant_id (UUID determinista a partir del slug,
+como la columna UUID de Postgres), así que repetir la corrida sobrescribe
+en vez de duplicar.
+
+Contadores (order_counters.py): las órdenes se escriben con set y no con
+incrementos, porque al repetir la corrida sumarían dos veces. Al terminar
+sus órdenes, cada tenant reescribe sus propios contadores
+({tenant_id}_estado_…) con los totales de lo que acaba de generar, y pone
+en cero los que quedaron de una corrida anterior. Si se repite con menos
+--ordenes, las órdenes sobrantes de antes siguen en Firestore pero no en los
+contadores: en ese caso, `python3 order_counters.py reconstruir`.
+
+Presupuesto justo: las escrituras de todos los tenants comparten una sola
+rampa 500/50/5 (FairShareLimiter, firestore_ratelimit.py) repartida en
+partes iguales entre los tenants que están escribiendo, y las importaciones
+de Auth de todos pasan, en orden de llegada, por un único RequestPacer. Un
+tenant con muchas órdenes no frena a los demás más allá de su parte. Por
+eso no se admite --modo bulk: el BulkWriter del SDK no respeta un
+presupuesto común.
+
+Uso:
+    python3 provision_tenants.py 100 [--ordenes 1000] [--simultaneos 20]
+    python3 provision_tenants.py 5 --prefijo acme --sin-auth --sin-limite   # emulador
+"""
+
+import argparse
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from create_auth_users import RONDAS_PBKDF2, RequestPacer, import_users_bulk
+from firestore_batch import add_writer_arguments, make_writer
+from firestore_ratelimit import FairShareLimiter
+from generate_ordenes import REPARTIDORES, SEMILLA_POR_DEFECTO, USUARIO_ADMIN, generate_orders
+from order_counters import count_orders, write_counter_totals
+
+ORDENES_POR_TENANT = 1000
+TENANTS_SIMULTANEOS = 20
+# Llamadas a auth.import_users por segundo entre todos los tenants
+IMPORTACIONES_POR_SEGUNDO = 4.0
+PASSWORD_DEMO = 'Demo123!'
+DOMINIO_DEMO = 'demo.paqueteria.com'
+# Espacio de nombres para derivar el tenant_id del slug
+_NAMESPACE_TENANTS = uuid.uuid5(uuid.NAMESPACE_DNS, 'tenants.paqueteria.com')
+
+
+def tenant_id_for(slug):
+    return str(uuid.uuid5(_NAMESPACE_TENANTS, slug))
+
+
+def build_tenants(count, prefix='demo'):
+    """Tenants de demostración {prefijo}-001, {prefijo}-002, ..."""
+    width = max(3, len(str(count)))
+    tenants = []
+    for i in range(1, count + 1):
+        slug = f'{prefix}-{i:0{width}d}'
+        tenants.append({
+            'tenant_id': tenant_id_for(slug),
+            'slug': slug,
+            'nombre': f'Empresa Demo {i}',
+            'email_contacto': f'admin@{slug}.{DOMINIO_DEMO}',
+            'activo': True,
+            'plan': 'basico',
+            'notas': 'Tenant de demostración (provision_tenants.py)',
+        })
+    return tenants
+
+
+def tenant_users(tenant, password=PASSWORD_DEMO):
+    """Usuarios del tenant en el formato de create_auth_users.import_users_bulk."""
+    slug = tenant['slug']
+    usuarios = [{
+        'uid': f'{slug}-admin',
+        'email': f'admin@{slug}.{DOMINIO_DEMO}',
+        'password': password,
+        'display_name': USUARIO_ADMIN,
+        'rol': 'ADMINISTRADOR',
+        'tenant_id': tenant['tenant_id'],
+    }]
+    for i, nombre in enumerate(REPARTIDORES, 1):
+        usuarios.append({
+            'uid': f'{slug}-repartidor-{i}',
+            'email': f'repartidor{i}@{slug}.{DOMINIO_DEMO}',
+            'password': password,
+            'display_name': nombre,
+            'rol': 'REPARTIDOR',
+            'tenant_id': tenant['tenant_id'],
+        })
+    return usuarios
+
+
+class TenantProgress:
+    """Avance y ritmo de un tenant."""
+
+    def __init__(self, slug):
+        self.slug = slug
+        self.usuarios = 0
+        self.documentos = 0
+        self.reintentos = 0
+        self.errores = []
+        self.inicio = None
+        self.segundos = 0.0
+
+    @property
+    def docs_por_segundo(self):
+        return self.documentos / self.segundos if self.segundos > 0 else 0.0
+
+
+def provision_tenant(db, tenant, index, args, fair, pacer):
+    """Trabajo de un hilo: usuarios de Auth y documentos de un tenant."""
+    from firebase_admin import firestore
+
+    from create_user_profile import build_user_profile
+
+    progress = TenantProgress(tenant['slug'])
+    progress.inicio = time.perf_counter()
+    tenant_id = tenant['tenant_id']
+    usuarios = tenant_users(tenant, args.password)
+
+    if not args.sin_auth:
+        imported, errors = import_users_bulk(usuarios, concurrency=1, rounds=args.rondas,
+                                             pacer=pacer)
+        progress.usuarios = imported
+        progress.errores.extend(f'{email}: {reason}' for email, reason in errors)
+
+    with fair.share() as limiter:
+        with make_writer(db, args.modo, args.en_vuelo, rate_limit=not args.sin_limite,
+                         limiter=limiter) as writer:
+            writer.set(db.collection('tenants').document(tenant_id),
+                       {**tenant, 'fechaCreacion': firestore.SERVER_TIMESTAMP})
+            for usuario in usuarios:
+                profile = build_user_profile(usuario['email'], usuario['display_name'],
+                                             usuario['rol'])
+                writer.set(db.collection('usuarios').document(usuario['uid']),
+                           {**profile, 'tenant_id': tenant_id})
+            totals = Counter()
+            for orden in generate_orders(args.ordenes, seed=args.semilla + index):
+                orden['tenant_id'] = tenant_id
+                doc_id = f"{tenant['slug']}_{orden['numeroOrden']}"
+                writer.set(db.collection('ordenes').document(doc_id), orden)
+                count_orders((orden,), totals)
+            write_counter_totals(db, writer, totals, tenant_id)
+    progress.documentos = writer.stats.documentos
+    progress.reintentos = writer.stats.reintentos
+    progress.segundos = time.perf_counter() - progress.inicio
+    return progress
+
+
+def provision_tenants(db, tenants, args):
+    """Da de alta los tenants con `args.simultaneos` hilos. Devuelve [TenantProgress]."""
+    fair = FairShareLimiter()
+    pacer = RequestPacer(args.importaciones_por_segundo)
+    results = []
+    with ThreadPoolExecutor(max_workers=args.simultaneos) as pool:
+        futures = {pool.submit(provision_tenant, db, tenant, i, args, fair, pacer): tenant
+                   for i, tenant in enumerate(tenants)}
+        for done, future in enumerate(as_completed(futures), 1):
+            slug = futures[future]['slug']
+            try:
+                progress = future.result()
+            except Exception as e:
+                progress = TenantProgress(slug)
+                progress.errores.append(f'{type(e).__name__}: {e}')
+            results.append(progress)
+            status = '❌' if progress.errores else '✓'
+            print(f"   {status} [{done}/{len(tenants)}] {slug}: {progress.usuarios} usuarios, "
+                  f"{progress.documentos} docs en {progress.segundos:.1f} s "
+                  f"({progress.docs_por_segundo:.0f} docs/s) — ritmo global "
+                  f"{fair.limiter.rate:.0f} ops/s, {fair.activos} tenants escribiendo")
+    return results
+
+
+def print_report(results, elapsed):
+    documentos = sum(p.documentos for p in results)
+    usuarios = sum(p.usuarios for p in results)
+    secuencial = sum(p.segundos for p in results)
+    rates = sorted(p.docs_por_segundo for p in results if p.documentos)
+    print()
+    print("=" * 70)
+    print(f"✅ {len(results)} tenants: {usuarios} usuarios de Auth y {documentos} documentos "
+          f"en {elapsed:.1f} s ({documentos / elapsed if elapsed else 0:.0f} docs/s)")
+    print(f"   Suma de los tiempos por tenant (≈ corridas secuenciales): {secuencial:.1f} s")
+    if rates:
+        print(f"   Ritmo por tenant: mínimo {rates[0]:.0f}, mediana {rates[len(rates) // 2]:.0f}, "
+              f"máximo {rates[-1]:.0f} docs/s")
+    reintentos = sum(p.reintentos for p in results)
+    if reintentos:
+        print(f"   ↻ {reintentos} reintentos por errores transitorios")
+    failed = [p for p in results if p.errores]
+    if failed:
+        print(f"❌ {len(failed)} tenants con errores:")
+        for progress in failed[:10]:
+            print(f"   - {progress.slug}: {progress.errores[0]}"
+                  f"{f' (+{len(progress.errores) - 1})' if len(progress.errores) > 1 else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Alta concurrente de tenants de demostración')
+    parser.add_argument('cantidad', type=int, help='Número de tenants')
+    parser.add_argument('--prefijo', default='demo', help='Prefijo del slug (por defecto: demo)')
+    parser.add_argument('--ordenes', type=int, default=ORDENES_POR_TENANT,
+                        help=f'Órdenes por tenant (por defecto: {ORDENES_POR_TENANT})')
+    parser.add_argument('--simultaneos', type=int, default=TENANTS_SIMULTANEOS,
+                        help=f'Tenants en paralelo (por defecto: {TENANTS_SIMULTANEOS})')
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO,
+                        help='Semilla base; cada tenant usa semilla + su posición')
+    parser.add_argument('--password', default=PASSWORD_DEMO,
+                        help='Contraseña de todos los usuarios de demostración')
+    parser.add_argument('--sin-auth', action='store_true',
+                        help='No crear usuarios en Firebase Auth (solo documentos)')
+    parser.add_argument('--importaciones-por-segundo', type=float,
+                        default=IMPORTACIONES_POR_SEGUNDO,
+                        help='Llamadas a import_users por segundo entre todos los tenants')
+    parser.add_argument('--rondas', type=int, default=RONDAS_PBKDF2,
+                        help=f'Rondas de PBKDF2-SHA256 (por defecto: {RONDAS_PBKDF2})')
+    add_writer_arguments(parser)
+    parser.set_defaults(modo='lote', en_vuelo=2)
+    args = parser.parse_args()
+    if args.modo == 'bulk' and not args.sin_limite:
+        parser.error('--modo bulk no comparte el presupuesto entre tenants; use individual o lote')
+
+    from firebase_client import get_db
+
+    db = get_db()
+    tenants = build_tenants(args.cantidad, args.prefijo)
+    print("=" * 70)
+    print(f"🏢 ALTA DE {len(tenants)} TENANTS ({args.ordenes} órdenes cada uno, "
+          f"{args.simultaneos} en paralelo)")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    results = provision_tenants(db, tenants, args)
+    print_report(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Conciliación masiva entre Firebase Auth y los perfiles de 'usuarios'.
+
+create_user_profile.py guarda el perfil con el UID de Auth como ID, pero
+setup_firestore_complete.py lo guardaba con el email transformado
+(admin_at_paqueteria_com). Este script recorre todos los usuarios de Auth
+con auth.list_users (1000 por página) y, por cada página, lee de una vez con
+get_all los perfiles por email transformado y por UID. Con eso clasifica en
+memoria:
+
+- faltante: no hay perfil → se crea con los datos de Auth
+- mal indexado: el perfil está bajo el email → se mueve al UID (set + delete
+  en el mismo commit)
+- duplicado: hay perfil en ambos → se completan en el del UID los campos que
+  solo tenía el otro y se borra el del email
+- desactualizado: el perfil tiene otro email → se corrige el email; también
+  cuando además estaba mal indexado o duplicado, al moverlo o fusionarlo
+- huérfano: perfil cuyo ID no es ningún UID de Auth → se informa, y con
+  --borrar-huerfanos se borra
+
+Solo se escriben los perfiles que hay que corregir, por lotes. Para 50 000
+usuarios son 50 páginas de Auth, unas 400 llamadas a get_all y una pasada
+de solo IDs sobre 'usuarios'.
+
+Uso:
+    python3 reconcile_usuarios.py --simular
+    python3 reconcile_usuarios.py [--modo lote] [--borrar-huerfanos]
+"""
+
+import argparse
+
+from firebase_client import get_auth, get_db
+from firestore_batch import add_writer_arguments, make_writer
+from firestore_pages import iter_pages
+from firestore_upsert import TAMANO_LECTURA, normalize_email
+
+USUARIOS_POR_PAGINA = 1000
+ROL_POR_DEFECTO = 'REPARTIDOR'
+CAMPOS_PERFIL = ('email', 'nombre', 'rol')
+
+
+class ReconcileStats:
+    def __init__(self):
+        self.revisados = 0
+        self.correctos = 0
+        self.faltantes = 0
+        self.mal_indexados = 0
+        self.duplicados = 0
+        self.desactualizados = 0
+        self.huerfanos = []
+
+    def print_summary(self):
+        print(f"   Usuarios de Auth revisados: {self.revisados}")
+        print(f"   ✓ Correctos:                {self.correctos}")
+        print(f"   ➕ Faltantes:                {self.faltantes}")
+        print(f"   🔀 Mal indexados:            {self.mal_indexados}")
+        print(f"   🔁 Duplicados:               {self.duplicados}")
+        print(f"   ✏️  Email desactualizado:     {self.desactualizados}")
+        print(f"   👻 Huérfanos:                {len(self.huerfanos)}")
+
+
+def _get_all(db, refs, field_paths=None):
+    """Snapshots existentes por ID, leyendo en bloques de TAMANO_LECTURA."""
+    found = {}
+    for i in range(0, len(refs), TAMANO_LECTURA):
+        for snapshot in db.get_all(refs[i:i + TAMANO_LECTURA], field_paths=field_paths):
+            if snapshot.exists:
+                found[snapshot.id] = snapshot.to_dict() or {}
+    return found
+
+
+def profile_from_auth(user):
+    from create_user_profile import build_user_profile
+
+    claims = user.custom_claims or {}
+    return build_user_profile(user.email, user.display_name or user.email or user.uid,
+                              claims.get('rol', ROL_POR_DEFECTO))
+
+
+def reconcile_page(db, users, stats):
+    """
+    Operaciones (ref, datos, merge) que corrigen los perfiles de una página de
+    usuarios de Auth, agrupadas por usuario. Devuelve (grupos, IDs de perfiles
+    por email revisados).
+    """
+    from firebase_admin import firestore
+
+    usuarios = db.collection('usuarios')
+    legacy_ids = {user.uid: normalize_email(user.email) for user in users if user.email}
+    legacy = _get_all(db, [usuarios.document(doc_id) for doc_id in legacy_ids.values()])
+    # Por UID basta con los campos que se comparan, salvo si hay que fusionar con
+    # un perfil por email: ahí se lee entero para no pisar lo que ya tiene
+    with_legacy = {uid for uid, doc_id in legacy_ids.items() if doc_id in legacy}
+    by_uid = _get_all(db, [usuarios.document(user.uid) for user in users
+                           if user.uid not in with_legacy],
+                      field_paths=list(CAMPOS_PERFIL))
+    by_uid.update(_get_all(db, [usuarios.document(uid) for uid in with_legacy]))
+
+    groups = []
+    for user in users:
+        stats.revisados += 1
+        ref = usuarios.document(user.uid)
+        legacy_id = legacy_ids.get(user.uid)
+        old = legacy.get(legacy_id) if legacy_id else None
+        current = by_uid.get(user.uid)
+
+        if current is None and old is None:
+            groups.append([(ref, profile_from_auth(user), False)])
+            stats.faltantes += 1
+        elif current is None:
+            # Se mueve con el email de Auth, aunque el perfil guardara otro
+            moved = {**old, 'email': user.email, 'updatedAt': firestore.SERVER_TIMESTAMP}
+            groups.append([(ref, moved, False), (usuarios.document(legacy_id), None, False)])
+            stats.mal_indexados += 1
+            if old.get('email') != user.email:
+                stats.desactualizados += 1
+        elif old is not None:
+            # El perfil por UID manda; del otro solo se rescatan los campos que falten
+            missing = {k: v for k, v in old.items() if k not in current and k not in CAMPOS_PERFIL}
+            if current.get('email') != user.email:
+                missing['email'] = user.email
+                stats.desactualizados += 1
+            missing['updatedAt'] = firestore.SERVER_TIMESTAMP
+            groups.append([(ref, missing, True), (usuarios.document(legacy_id), None, False)])
+            stats.duplicados += 1
+        elif user.email and current.get('email') != user.email:
+            groups.append([(ref, {'email': user.email,
+                                  'updatedAt': firestore.SERVER_TIMESTAMP}, True)])
+            stats.desactualizados += 1
+        else:
+            stats.correctos += 1
+    return groups, set(legacy)
+
+
+def reconcile(db, auth, writer=None, delete_orphans=False):
+    """
+    Concilia Auth con 'usuarios'. Sin `writer` solo clasifica (simulación).
+    Devuelve ReconcileStats.
+    """
+    stats = ReconcileStats()
+    uids = set()
+    handled = set()
+
+    page = auth.list_users(max_results=USUARIOS_POR_PAGINA)
+    while page:
+        users = list(page.users)
+        uids.update(user.uid for user in users)
+        groups, legacy = reconcile_page(db, users, stats)
+        handled |= legacy
+        if writer:
+            for group in groups:
+                writer.write_group(group)
+        print(f"   … {stats.revisados} usuarios de Auth revisados")
+        page = page.get_next_page()
+
+    # Huérfanos: perfiles cuyo ID no es un UID ni un perfil por email ya movido
+    for snapshots in iter_pages(db.collection('usuarios'), TAMANO_LECTURA, fields=[]):
+        for snapshot in snapshots:
+            if snapshot.id not in uids and snapshot.id not in handled:
+                stats.huerfanos.append(snapshot.id)
+                if writer and delete_orphans:
+                    writer.delete(snapshot.reference)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concilia Firebase Auth con los perfiles de usuarios')
+    add_writer_arguments(parser)
+    parser.set_defaults(modo='lote')
+    parser.add_argument('--simular', action='store_true',
+                        help='Solo informar lo que se corregiría, sin escribir')
+    parser.add_argument('--borrar-huerfanos', action='store_true',
+                        help='Borrar los perfiles que no corresponden a ningún usuario de Auth')
+    args = parser.parse_args()
+
+    db = get_db()
+    auth = get_auth()
+    print("=" * 70)
+    print(f"👥 CONCILIACIÓN AUTH ↔ USUARIOS{' (simulación)' if args.simular else ''}")
+    print("=" * 70)
+
+    if args.simular:
+        stats = reconcile(db, auth)
+        write_stats = None
+    else:
+        with make_writer(db, args.modo, args.en_vuelo, rate_limit=not args.sin_limite) as writer:
+            stats = reconcile(db, auth, writer, args.borrar_huerfanos)
+        write_stats = writer.stats
+
+    print()
+    stats.print_summary()
+    if stats.huerfanos:
+        accion = 'borrados' if args.borrar_huerfanos and not args.simular else 'sin tocar'
+        print(f"   Huérfanos ({accion}): {', '.join(stats.huerfanos[:20])}"
+              f"{' …' if len(stats.huerfanos) > 20 else ''}")
+    if write_stats:
+        print()
+        write_stats.print_summary()
+
+
+if __name__ == "__main__":
+    main()
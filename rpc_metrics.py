@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Instrumentación de las llamadas a Firestore y Auth de los scripts de
+administración.
+
+install() envuelve los métodos del SDK que usan los scripts (set, add,
+update, delete, get, stream, get_all, commit de lotes, BulkWriter y las
+funciones de firebase_admin.auth) y registra por operación: llamadas,
+errores, reintentos (de google.api_core y de firestore_ratelimit) y
+latencias. Además cuenta las unidades que factura Firestore (lecturas de
+documentos, escrituras y borrados) y estima el costo.
+
+Una llamada que el SDK implementa con otras (DocumentReference.set hace un
+lote y un commit) se cuenta una sola vez, como la operación de afuera.
+
+Uso, sin tocar los scripts:
+    python3 rpc_metrics.py --salida metricas.json setup_firestore_complete.py --modo lote
+    python3 rpc_metrics.py --salida metricas.json --perfil seed.prof create_auth_users.py
+
+El perfil de cProfile se puede ver con:
+    python3 -m pstats seed.prof
+"""
+
+import argparse
+import functools
+import inspect
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+import firestore_ratelimit
+from latency_stats import percentile
+
+# Límites superiores de los tramos del histograma de latencia, en ms
+TRAMOS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Tarifa de referencia de Firestore en USD por 100 000 unidades (nam5); ajustar a la región
+PRECIO_POR_100K = {'lecturas': 0.06, 'escrituras': 0.18, 'borrados': 0.02}
+
+FUNCIONES_AUTH = ('create_user', 'get_user', 'get_user_by_email', 'get_users', 'update_user',
+                  'delete_user', 'delete_users', 'import_users', 'list_users',
+                  'set_custom_user_claims')
+
+
+class OperationStats:
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.reintentos = 0
+        self.latencias = []
+
+    def as_dict(self):
+        ordered = sorted(self.latencias)
+        histogram = {}
+        for limit in TRAMOS_MS:
+            histogram[f'<={limit}'] = 0
+        histogram[f'>{TRAMOS_MS[-1]}'] = 0
+        for seconds in ordered:
+            ms = seconds * 1000
+            label = next((f'<={limit}' for limit in TRAMOS_MS if ms <= limit),
+                         f'>{TRAMOS_MS[-1]}')
+            histogram[label] += 1
+
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            'llamadas': self.llamadas,
+            'errores': self.errores,
+            'reintentos': self.reintentos,
+            'latencia_ms': {
+                'p50': ms(percentile(ordered, 50)),
+                'p95': ms(percentile(ordered, 95)),
+                'p99': ms(percentile(ordered, 99)),
+                'max': ms(ordered[-1] if ordered else None),
+                'total': ms(sum(ordered)),
+            },
+            'histograma_ms': histogram,
+        }
+
+
+class RpcMetrics:
+    """Contadores de todo el proceso; seguros entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operaciones = {}
+        self.unidades = {'lecturas': 0, 'escrituras': 0, 'borrados': 0}
+        self.inicio = time.time()
+
+    def _op(self, name):
+        if name not in self.operaciones:
+            self.operaciones[name] = OperationStats()
+        return self.operaciones[name]
+
+    def record(self, name, seconds, error=False):
+        with self._lock:
+            op = self._op(name)
+            op.llamadas += 1
+            op.errores += int(error)
+            op.latencias.append(seconds)
+
+    def record_retry(self, name):
+        with self._lock:
+            self._op(name).reintentos += 1
+
+    def count(self, unit, amount=1):
+        with self._lock:
+            self.unidades[unit] += amount
+
+    def estimated_cost(self):
+        return round(sum(self.unidades[u] * PRECIO_POR_100K[u] / 100_000 for u in self.unidades), 6)
+
+    def report(self):
+        with self._lock:
+            return {
+                'inicio': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+                'duracion_s': round(time.time() - self.inicio, 3),
+                'unidades': dict(self.unidades),
+                'costo_estimado_usd': self.estimated_cost(),
+                'precio_por_100k_usd': PRECIO_POR_100K,
+                'operaciones': {name: op.as_dict()
+                                for name, op in sorted(self.operaciones.items())},
+            }
+
+    def print_summary(self):
+        print()
+        print("📈 Llamadas a Firebase:")
+        for name, op in sorted(self.operaciones.items()):
+            data = op.as_dict()
+            print(f"   {name:<28} {data['llamadas']:>7} llamadas  "
+                  f"p50 {data['latencia_ms']['p50']} ms  p99 {data['latencia_ms']['p99']} ms  "
+                  f"{data['reintentos']} reintentos  {data['errores']} errores")
+        u = self.unidades
+        print(f"   Unidades: {u['lecturas']} lecturas, {u['escrituras']} escrituras, "
+              f"{u['borrados']} borrados ≈ US$ {self.estimated_cost():.4f}")
+
+
+metrics = RpcMetrics()
+
+# Operación instrumentada en curso en este hilo; las llamadas anidadas no se cuentan
+_local = threading.local()
+
+
+def _current():
+    return getattr(_local, 'op', None)
+
+
+class _Scope:
+    def __init__(self, name):
+        self.name = name
+        self.outer = _current() is None
+
+    def __enter__(self):
+        if self.outer:
+            _local.op = self.name
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.outer:
+            _local.op = None
+            metrics.record(self.name, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+# ==============================================================================
+# ENVOLTORIOS
+# ==============================================================================
+
+def _wrap_call(name, units=None):
+    """Método síncrono: una llamada, y `units` (unidad, cantidad) si es la de afuera."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with _Scope(name) as scope:
+                result = method(*args, **kwargs)
+            if scope.outer and units:
+                metrics.count(*units)
+            return result
+        return wrapper
+    return decorator
+
+
+def _wrap_reads(name):
+    """Generador de snapshots: una lectura por documento (mínimo una por consulta)."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if _current() is not None:
+                yield from method(*args, **kwargs)
+                return
+            start = time.perf_counter()
+            read = 0
+            error = True
+            try:
+                for item in method(*args, **kwargs):
+                    read += 1
+                    yield item
+                error = False
+            except GeneratorExit:
+                # El consumidor dejó de iterar antes del final: no es un error
+                error = False
+                raise
+            finally:
+                metrics.record(name, time.perf_counter() - start, error)
+                if not error:
+                    metrics.count('lecturas', max(read, 1) if name.endswith('stream') else read)
+        return wrapper
+    return decorator
+
+
+def _wrap_reads_async(name):
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            read = 0
+            error = True
+            try:
+                async for item in method(*args, **kwargs):
+                    read += 1
+                    yield item
+                error = False
+            except GeneratorExit:
+                # El consumidor dejó de iterar antes del final: no es un error
+                error = False
+                raise
+            finally:
+                metrics.record(name, time.perf_counter() - start, error)
+                if not error:
+                    metrics.count('lecturas', max(read, 1) if name.endswith('stream') else read)
+        return wrapper
+    return decorator
+
+
+def _wrap_coroutine(name, units=None):
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = True
+            try:
+                result = await method(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                metrics.record(name, time.perf_counter() - start, error)
+                if units and not error:
+                    metrics.count(*units)
+        return wrapper
+    return decorator
+
+
+def _wrap_batch_op(unit, skip_class=None):
+    """set/update/delete de un lote: cuenta la unidad (el RPC es el commit)."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            if _current() is None and not (skip_class and isinstance(self, skip_class)):
+                metrics.count(unit)
+            return result
+        return wrapper
+    return decorator
+
+
+def _patch(owner, attribute, decorator):
+    original = getattr(owner, attribute, None)
+    if original is None or getattr(original, '_instrumentado', False):
+        return
+    wrapped = decorator(original)
+    wrapped._instrumentado = True
+    setattr(owner, attribute, wrapped)
+
+
+def _on_retry(name_hint):
+    def on_error(exc):
+        metrics.record_retry(_current() or name_hint)
+    return on_error
+
+
+# Reintentos de firestore_ratelimit.call_with_retry (SDK con retry=None)
+_limiter_retry = _on_retry('limitador')
+
+
+def _chain_on_error(retry_target, name_hint):
+    """Cuenta cada reintento de google.api_core además de llamar al on_error original."""
+    signature = inspect.signature(retry_target)
+    position = list(signature.parameters).index('on_error')
+
+    def wrapper(*args, **kwargs):
+        args = list(args)
+        original = args[position] if len(args) > position else kwargs.get('on_error')
+        counting = _on_retry(name_hint)
+
+        def on_error(exc):
+            counting(exc)
+            if original:
+                return original(exc)
+
+        if len(args) > position:
+            args[position] = on_error
+        else:
+            kwargs['on_error'] = on_error
+        return retry_target(*args, **kwargs)
+
+    return functools.wraps(retry_target)(wrapper)
+
+
+def install():
+    """Instala los envoltorios (una sola vez) y devuelve el objeto de métricas."""
+    from google.api_core.retry import retry_unary, retry_unary_async
+    from google.cloud.firestore_v1 import (async_batch, async_client, async_document,
+                                           async_query, base_batch, batch, bulk_batch,
+                                           bulk_writer, client, collection, document, query)
+    from firebase_admin import auth
+
+    D = document.DocumentReference
+    _patch(D, 'create', _wrap_call('documento.create', ('escrituras', 1)))
+    _patch(D, 'set', _wrap_call('documento.set', ('escrituras', 1)))
+    _patch(D, 'update', _wrap_call('documento.update', ('escrituras', 1)))
+    _patch(D, 'delete', _wrap_call('documento.delete', ('borrados', 1)))
+    _patch(D, 'get', _wrap_call('documento.get', ('lecturas', 1)))
+    _patch(collection.CollectionReference, 'add',
+           _wrap_call('coleccion.add', ('escrituras', 1)))
+    _patch(query.Query, 'stream', _wrap_reads('consulta.stream'))
+    _patch(client.Client, 'get_all', _wrap_reads('cliente.get_all'))
+
+    # Las operaciones de los lotes se cuentan al agregarse; el RPC es el commit.
+    # Las del BulkWriter se cuentan en el BulkWriter, no en sus lotes internos.
+    B = base_batch.BaseWriteBatch
+    for op, unit in (('create', 'escrituras'), ('set', 'escrituras'),
+                     ('update', 'escrituras'), ('delete', 'borrados')):
+        _patch(B, op, _wrap_batch_op(unit, skip_class=bulk_batch.BulkWriteBatch))
+        _patch(bulk_writer.BulkWriter, op, _wrap_batch_op(unit))
+    _patch(batch.WriteBatch, 'commit', _wrap_call('lote.commit'))
+    _patch(bulk_batch.BulkWriteBatch, 'commit', _wrap_call('bulk.commit'))
+
+    _patch(async_batch.AsyncWriteBatch, 'commit', _wrap_coroutine('lote.commit'))
+    _patch(async_document.AsyncDocumentReference, 'get',
+           _wrap_coroutine('documento.get', ('lecturas', 1)))
+    _patch(async_query.AsyncQuery, 'stream', _wrap_reads_async('consulta.stream'))
+    _patch(async_client.AsyncClient, 'get_all', _wrap_reads_async('cliente.get_all'))
+
+    for name in FUNCIONES_AUTH:
+        _patch(auth, name, _wrap_call(f'auth.{name}'))
+    _patch(auth.ListUsersPage, 'get_next_page', _wrap_call('auth.list_users'))
+
+    _patch(retry_unary, 'retry_target', lambda f: _chain_on_error(f, 'sin_operacion'))
+    _patch(retry_unary_async, 'retry_target', lambda f: _chain_on_error(f, 'sin_operacion'))
+    firestore_ratelimit.add_retry_listener(_limiter_retry)
+    return metrics
+
+
+def write_report(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(metrics.report(), f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Ejecuta un script de administración con métricas de RPC')
+    parser.add_argument('--salida', default='metricas_rpc.json',
+                        help='Archivo JSON del informe (por defecto: metricas_rpc.json)')
+    parser.add_argument('--perfil', help='Guardar también un perfil de cProfile en este archivo')
+    parser.add_argument('script', help='Script a ejecutar, p. ej. setup_firestore_complete.py')
+    parser.add_argument('argumentos', nargs=argparse.REMAINDER,
+                        help='Argumentos del script')
+    args = parser.parse_args()
+
+    import runpy
+
+    install()
+    sys.argv = [args.script] + args.argumentos
+    profiler = None
+    if args.perfil:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    exit_code = 0
+    try:
+        runpy.run_path(args.script, run_name='__main__')
+    except SystemExit as e:
+        exit_code = e.code
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.perfil)
+        write_report(args.salida)
+        metrics.print_summary()
+        print(f"   📄 Informe: {args.salida}" + (f" | perfil: {args.perfil}" if args.perfil else ''))
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
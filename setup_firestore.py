@@ -2,163 +2,218 @@
 """
 Script para crear las colecciones de Firestore automáticamente
 con datos de ejemplo para el sistema de paquetería
-"""
-
-import firebase_admin
-from firebase_admin import credentials, firestore
-from datetime import datetime, timedelta
 
-# Inicializar Firebase Admin SDK
-cred = credentials.Certificate('paqueteria-web-app-firebase-adminsdk-fbsvc-5846fb7c81.json')
-firebase_admin.initialize_app(cred)
-
-# Obtener referencia a Firestore
-db = firestore.client()
-
-print("🔥 Conectando a Firebase...")
-print("✅ Conexión exitosa!")
-print()
-
-# Crear colección de EMISORES
-print("📦 Creando colección 'emisores'...")
-emisores_data = [
-    {
-        'nombre': 'Juan Pérez',
-        'telefono': '555-1234',
-        'direccion': 'Calle A #100',
-        'email': 'juan@email.com',
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'Carlos Ruiz',
-        'telefono': '555-5678',
-        'direccion': 'Avenida B #200',
-        'email': 'carlos@email.com',
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'Pedro López',
-        'telefono': '555-9012',
-        'direccion': 'Calle C #300',
-        'email': 'pedro@email.com',
-        'createdAt': firestore.SERVER_TIMESTAMP
-    }
-]
-
-for emisor in emisores_data:
-    db.collection('emisores').add(emisor)
-    print(f"   ✓ Emisor '{emisor['nombre']}' creado")
-
-print()
-
-# Crear colección de RECEPTORES
-print("📬 Creando colección 'receptores'...")
-receptores_data = [
-    {
-        'nombre': 'María González',
-        'telefono': '555-3456',
-        'direccion': 'Calle X #400',
-        'email': 'maria@email.com',
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'Ana Martínez',
-        'telefono': '555-7890',
-        'direccion': 'Avenida Y #500',
-        'email': 'ana@email.com',
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'Laura García',
-        'telefono': '555-2345',
-        'direccion': 'Calle Z #600',
-        'email': 'laura@email.com',
-        'createdAt': firestore.SERVER_TIMESTAMP
-    }
-]
-
-for receptor in receptores_data:
-    db.collection('receptores').add(receptor)
-    print(f"   ✓ Receptor '{receptor['nombre']}' creado")
-
-print()
-
-# Crear colección de ÓRDENES
-print("📋 Creando colección 'ordenes'...")
-ordenes_data = [
-    {
-        'emisorNombre': 'Juan Pérez',
-        'receptorNombre': 'María González',
-        'descripcion': 'Paquete de documentos importantes',
-        'direccionDestino': 'Calle Principal #123, Ciudad',
-        'estado': 'EN TRANSITO',
-        'fechaCreacion': firestore.SERVER_TIMESTAMP,
-        'fechaEntrega': None,
-        'observaciones': '',
-        'createdBy': 'Super-Admin'
-    },
-    {
-        'emisorNombre': 'Carlos Ruiz',
-        'receptorNombre': 'Ana Martínez',
-        'descripcion': 'Caja con productos electrónicos',
-        'direccionDestino': 'Avenida Central #456, Ciudad',
-        'estado': 'POR ENVIAR',
-        'fechaCreacion': firestore.SERVER_TIMESTAMP,
-        'fechaEntrega': None,
-        'observaciones': 'Llamar antes de llegar',
-        'createdBy': 'Super-Admin'
-    },
-    {
-        'emisorNombre': 'Pedro López',
-        'receptorNombre': 'Laura García',
-        'descripcion': 'Paquete de ropa',
-        'direccionDestino': 'Calle Norte #789, Ciudad',
-        'estado': 'ENTREGADO',
-        'fechaCreacion': firestore.SERVER_TIMESTAMP,
-        'fechaEntrega': firestore.SERVER_TIMESTAMP,
-        'observaciones': 'Entregado conforme',
-        'createdBy': 'Super-Admin'
-    },
-    {
-        'emisorNombre': 'Juan Pérez',
-        'receptorNombre': 'Ana Martínez',
-        'descripcion': 'Libros y material educativo',
-        'direccionDestino': 'Plaza Mayor #321, Ciudad',
-        'estado': 'EN TRANSITO',
-        'fechaCreacion': firestore.SERVER_TIMESTAMP,
-        'fechaEntrega': None,
-        'observaciones': '',
-        'createdBy': 'Super-Admin'
-    },
-    {
-        'emisorNombre': 'Carlos Ruiz',
-        'receptorNombre': 'Laura García',
-        'descripcion': 'Productos de farmacia',
-        'direccionDestino': 'Avenida Sur #654, Ciudad',
-        'estado': 'POR ENVIAR',
-        'fechaCreacion': firestore.SERVER_TIMESTAMP,
-        'fechaEntrega': None,
-        'observaciones': 'Frágil, manejar con cuidado',
-        'createdBy': 'Super-Admin'
-    }
-]
-
-for orden in ordenes_data:
-    db.collection('ordenes').add(orden)
-    print(f"   ✓ Orden '{orden['descripcion'][:30]}...' creada")
-
-print()
-print("=" * 60)
-print("🎉 ¡CONFIGURACIÓN COMPLETADA EXITOSAMENTE!")
-print("=" * 60)
-print()
-print("✅ Colecciones creadas:")
-print("   - emisores (3 documentos)")
-print("   - receptores (3 documentos)")
-print("   - ordenes (5 documentos)")
-print()
-print("🚀 Ahora puedes conectar tu app Flutter con Firebase!")
-print()
+Uso:
+    python3 setup_firestore.py [--modo individual|lote|bulk] [--en-vuelo N] [--incremental]
 
+Sin --incremental cada corrida crea duplicados con IDs aleatorios (.add());
+con --incremental los IDs son deterministas y solo se escribe lo que cambió.
+Las órdenes llevan emisorId/receptorId del contacto sembrado (dedup_contactos.py).
+"""
 
+import argparse
+from datetime import datetime, timedelta
 
+from dedup_contactos import ContactIndex, with_contact_ids
+from firebase_client import get_db
+from firestore_batch import add_writer_arguments, make_writer
+from firestore_upsert import document_id, upsert_documents
+
+# Datos de ejemplo como funciones: SERVER_TIMESTAMP obliga a importar
+# firebase_admin.firestore (y gRPC), que solo hace falta al sembrar
+def emisores_data():
+    from firebase_admin import firestore
+
+    return [
+        {
+            'nombre': 'Juan Pérez',
+            'telefono': '555-1234',
+            'direccion': 'Calle A #100',
+            'email': 'juan@email.com',
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'Carlos Ruiz',
+            'telefono': '555-5678',
+            'direccion': 'Avenida B #200',
+            'email': 'carlos@email.com',
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'Pedro López',
+            'telefono': '555-9012',
+            'direccion': 'Calle C #300',
+            'email': 'pedro@email.com',
+            'createdAt': firestore.SERVER_TIMESTAMP
+        }
+    ]
+
+def receptores_data():
+    from firebase_admin import firestore
+
+    return [
+        {
+            'nombre': 'María González',
+            'telefono': '555-3456',
+            'direccion': 'Calle X #400',
+            'email': 'maria@email.com',
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'Ana Martínez',
+            'telefono': '555-7890',
+            'direccion': 'Avenida Y #500',
+            'email': 'ana@email.com',
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'Laura García',
+            'telefono': '555-2345',
+            'direccion': 'Calle Z #600',
+            'email': 'laura@email.com',
+            'createdAt': firestore.SERVER_TIMESTAMP
+        }
+    ]
+
+def ordenes_data():
+    from firebase_admin import firestore
+
+    return [
+        {
+            'emisorNombre': 'Juan Pérez',
+            'receptorNombre': 'María González',
+            'descripcion': 'Paquete de documentos importantes',
+            'direccionDestino': 'Calle Principal #123, Ciudad',
+            'estado': 'EN TRANSITO',
+            'fechaCreacion': firestore.SERVER_TIMESTAMP,
+            'fechaEntrega': None,
+            'observaciones': '',
+            'createdBy': 'Super-Admin'
+        },
+        {
+            'emisorNombre': 'Carlos Ruiz',
+            'receptorNombre': 'Ana Martínez',
+            'descripcion': 'Caja con productos electrónicos',
+            'direccionDestino': 'Avenida Central #456, Ciudad',
+            'estado': 'POR ENVIAR',
+            'fechaCreacion': firestore.SERVER_TIMESTAMP,
+            'fechaEntrega': None,
+            'observaciones': 'Llamar antes de llegar',
+            'createdBy': 'Super-Admin'
+        },
+        {
+            'emisorNombre': 'Pedro López',
+            'receptorNombre': 'Laura García',
+            'descripcion': 'Paquete de ropa',
+            'direccionDestino': 'Calle Norte #789, Ciudad',
+            'estado': 'ENTREGADO',
+            'fechaCreacion': firestore.SERVER_TIMESTAMP,
+            'fechaEntrega': firestore.SERVER_TIMESTAMP,
+            'observaciones': 'Entregado conforme',
+            'createdBy': 'Super-Admin'
+        },
+        {
+            'emisorNombre': 'Juan Pérez',
+            'receptorNombre': 'Ana Martínez',
+            'descripcion': 'Libros y material educativo',
+            'direccionDestino': 'Plaza Mayor #321, Ciudad',
+            'estado': 'EN TRANSITO',
+            'fechaCreacion': firestore.SERVER_TIMESTAMP,
+            'fechaEntrega': None,
+            'observaciones': '',
+            'createdBy': 'Super-Admin'
+        },
+        {
+            'emisorNombre': 'Carlos Ruiz',
+            'receptorNombre': 'Laura García',
+            'descripcion': 'Productos de farmacia',
+            'direccionDestino': 'Avenida Sur #654, Ciudad',
+            'estado': 'POR ENVIAR',
+            'fechaCreacion': firestore.SERVER_TIMESTAMP,
+            'fechaEntrega': None,
+            'observaciones': 'Frágil, manejar con cuidado',
+            'createdBy': 'Super-Admin'
+        }
+    ]
+
+def seed(writer):
+    # Crear colección de EMISORES
+    print("📦 Creando colección 'emisores'...")
+    emisores = ContactIndex()
+    for emisor in emisores_data():
+        emisores.add(writer.add('emisores', emisor).id, emisor)
+        print(f"   ✓ Emisor '{emisor['nombre']}' creado")
+
+    print()
+
+    # Crear colección de RECEPTORES
+    print("📬 Creando colección 'receptores'...")
+    receptores = ContactIndex()
+    for receptor in receptores_data():
+        receptores.add(writer.add('receptores', receptor).id, receptor)
+        print(f"   ✓ Receptor '{receptor['nombre']}' creado")
+
+    print()
+
+    # Crear colección de ÓRDENES
+    print("📋 Creando colección 'ordenes'...")
+    for orden in with_contact_ids(ordenes_data(), emisores, receptores):
+        writer.add('ordenes', orden)
+        print(f"   ✓ Orden '{orden['descripcion'][:30]}...' creada")
+
+    print()
+
+
+def seed_incremental(db, writer):
+    emisores_docs, receptores_docs = emisores_data(), receptores_data()
+    emisores, receptores = ContactIndex(), ContactIndex()
+    for emisor in emisores_docs:
+        emisores.add(document_id('emisores', emisor), emisor)
+    for receptor in receptores_docs:
+        receptores.add(document_id('receptores', receptor), receptor)
+    ordenes = with_contact_ids(ordenes_data(), emisores, receptores)
+    for nombre, documentos in (('emisores', emisores_docs), ('receptores', receptores_docs),
+                               ('ordenes', ordenes)):
+        stats = upsert_documents(db, writer, nombre, documentos)
+        print(f"   ✓ {nombre}: {stats}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crea las colecciones de Firestore con datos de ejemplo')
+    add_writer_arguments(parser)
+    parser.add_argument('--incremental', action='store_true',
+                        help='IDs deterministas y escribir solo lo nuevo o cambiado')
+    args = parser.parse_args()
+
+    # Firebase Admin SDK y cliente de Firestore compartidos
+    db = get_db()
+
+    print("🔥 Conectando a Firebase...")
+    print("✅ Conexión exitosa!")
+    print()
+
+    with make_writer(db, args.modo, max_in_flight=args.en_vuelo,
+                     rate_limit=not args.sin_limite) as writer:
+        if args.incremental:
+            seed_incremental(db, writer)
+        else:
+            seed(writer)
+
+    print("=" * 60)
+    print("🎉 ¡CONFIGURACIÓN COMPLETADA EXITOSAMENTE!")
+    print("=" * 60)
+    print()
+    print("✅ Colecciones creadas:")
+    print(f"   - emisores ({len(emisores_data())} documentos)")
+    print(f"   - receptores ({len(receptores_data())} documentos)")
+    print(f"   - ordenes ({len(ordenes_data())} documentos)")
+    print()
+    writer.stats.print_summary()
+    print()
+    print("🚀 Ahora puedes conectar tu app Flutter con Firebase!")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,314 +4,505 @@ Script completo para configurar Firestore con:
 - Usuarios (sin Firebase Auth - se creará desde Flutter)
 - Emisores y Receptores
 - Órdenes con estados completos
-"""
 
-import firebase_admin
-from firebase_admin import credentials, firestore
-from datetime import datetime, timedelta
+Uso:
+    python3 setup_firestore_complete.py [--modo individual|lote|bulk] [--en-vuelo N]
 
-# Inicializar Firebase Admin SDK
-cred = credentials.Certificate('paqueteria-web-app-firebase-adminsdk-fbsvc-5846fb7c81.json')
-firebase_admin.initialize_app(cred)
+--modo lote agrupa las escrituras en WriteBatch de hasta 500 operaciones y
+--modo bulk usa el BulkWriter de Firestore; al final se muestran docs/s.
 
-# Obtener referencia a Firestore
-db = firestore.client()
+--ordenes-sinteticas N agrega N órdenes generadas con generate_ordenes.py
+(reproducibles con --semilla) para pruebas de carga.
 
-print("=" * 70)
-print("🔥 CONFIGURACIÓN COMPLETA DE FIREBASE - SISTEMA DE PAQUETERÍA")
-print("=" * 70)
-print()
+--incremental no borra nada: usa IDs deterministas (numeroOrden, email o RUT)
+y solo escribe los documentos nuevos o cuyo contenido cambió.
 
-# ==============================================================================
-# 1. CREAR PERFILES DE USUARIOS EN FIRESTORE
-# ==============================================================================
-print("👥 Creando perfiles de usuarios en Firestore...")
-print()
-
-usuarios_data = [
-    {
-        'email': 'admin@paqueteria.com',
-        'password': 'Admin123!',  # Solo para referencia, no se guarda en producción
-        'nombre': 'Administrador Principal',
-        'rol': 'ADMINISTRADOR',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'email': 'repartidor@paqueteria.com',
-        'password': 'Rep123!',  # Solo para referencia
-        'nombre': 'Juan Repartidor',
-        'rol': 'REPARTIDOR',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    }
-]
-
-for usuario in usuarios_data:
-    # Crear documento sin el campo password
-    user_data = {k: v for k, v in usuario.items() if k != 'password'}
-    db.collection('usuarios').document(usuario['email'].replace('@', '_at_').replace('.', '_')).set(user_data)
-    print(f"   ✓ Perfil '{usuario['nombre']}' creado ({usuario['rol']})")
-    print(f"      Email: {usuario['email']} | Password: {usuario['password']}")
-
-print()
+--motor async hace lo mismo con firestore.AsyncClient: borrado y escritura
+por lotes con hasta --concurrencia commits en vuelo.
+
+Las escrituras siguen la rampa 500/50/5 de Firestore y reintentan con
+backoff los errores transitorios; --sin-limite lo desactiva (emulador).
+
+Cada orden se escribe en el mismo lote que sus contadores (order_counters.py);
+el resumen final lee los totales por estado de esos contadores. Las órdenes
+llevan emisorId/receptorId del contacto sembrado (dedup_contactos.py).
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from dedup_contactos import ContactIndex, with_contact_ids
+from firebase_client import get_async_db, get_db
+from firestore_async import (CONCURRENCIA_POR_DEFECTO, AsyncBatchWriter,
+                             bulk_delete_collection_async, run as run_async)
+from firestore_batch import add_writer_arguments, make_writer
+from firestore_delete import bulk_delete_collection
+from firestore_ratelimit import AdaptiveRateLimiter
+from firestore_upsert import document_id, upsert_documents
+from generate_ordenes import SEMILLA_POR_DEFECTO, generate_orders
+from order_counters import COLECCION_CONTADORES, order_write_ops, read_counters
 
 # ==============================================================================
-# 2. LIMPIAR COLECCIONES EXISTENTES DE DATOS
+# DATOS DE EJEMPLO
 # ==============================================================================
-print("🗑️  Limpiando datos de prueba anteriores...")
-
-def delete_collection(collection_name):
-    docs = db.collection(collection_name).stream()
-    deleted = 0
-    for doc in docs:
-        doc.reference.delete()
-        deleted += 1
+# Funciones y no listas: firestore.SERVER_TIMESTAMP se importa al pedir los
+# datos, no al cargar el módulo (--help no carga gRPC)
+def usuarios_data():
+    from firebase_admin import firestore
+
+    return [
+        {
+            'email': 'admin@paqueteria.com',
+            'password': 'Admin123!',  # Solo para referencia, no se guarda en producción
+            'nombre': 'Administrador Principal',
+            'rol': 'ADMINISTRADOR',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'email': 'repartidor@paqueteria.com',
+            'password': 'Rep123!',  # Solo para referencia
+            'nombre': 'Juan Repartidor',
+            'rol': 'REPARTIDOR',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        }
+    ]
+
+def emisores_data():
+    from firebase_admin import firestore
+
+    return [
+        {
+            'nombre': 'Juan Pérez García',
+            'telefono': '+56912345678',
+            'direccion': 'Av. Libertador Bernardo O\'Higgins #1234, Santiago',
+            'email': 'juan.perez@email.com',
+            'rut': '12.345.678-9',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'María González López',
+            'telefono': '+56987654321',
+            'direccion': 'Calle Providencia #5678, Providencia',
+            'email': 'maria.gonzalez@email.com',
+            'rut': '98.765.432-1',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'Comercial TechStore Ltda.',
+            'telefono': '+56922334455',
+            'direccion': 'Av. Apoquindo #4567, Las Condes',
+            'email': 'ventas@techstore.cl',
+            'rut': '76.123.456-7',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        }
+    ]
+
+def receptores_data():
+    from firebase_admin import firestore
+
+    return [
+        {
+            'nombre': 'Carlos Ramírez Silva',
+            'telefono': '+56911223344',
+            'direccion': 'Paseo Bulnes #987, Santiago Centro',
+            'email': 'carlos.ramirez@email.com',
+            'rut': '23.456.789-0',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'Ana Martínez Torres',
+            'telefono': '+56966778899',
+            'direccion': 'Av. Vicuña Mackenna #3210, Ñuñoa',
+            'email': 'ana.martinez@email.com',
+            'rut': '34.567.890-1',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'Restaurante El Buen Sabor',
+            'telefono': '+56933445566',
+            'direccion': 'Av. Italia #1234, Providencia',
+            'email': 'contacto@buensabor.cl',
+            'rut': '77.234.567-8',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        },
+        {
+            'nombre': 'Laura Fernández Gómez',
+            'telefono': '+56955667788',
+            'direccion': 'Calle Bombero Ossa #567, Santiago',
+            'email': 'laura.fernandez@email.com',
+            'rut': '45.678.901-2',
+            'activo': True,
+            'createdAt': firestore.SERVER_TIMESTAMP
+        }
+    ]
+
+def ordenes_data():
+    from firebase_admin import firestore
+
+    now = datetime.now()
+
+    return [
+        {
+            'numeroOrden': 'ORD-2025-001',
+            'emisorNombre': 'Juan Pérez García',
+            'emisorTelefono': '+56912345678',
+            'emisorDireccion': 'Av. Libertador Bernardo O\'Higgins #1234, Santiago',
+            'receptorNombre': 'Carlos Ramírez Silva',
+            'receptorTelefono': '+56911223344',
+            'receptorDireccion': 'Paseo Bulnes #987, Santiago Centro',
+            'descripcion': 'Documentos legales importantes',
+            'notasAdicionales': 'Entregar personalmente, requiere firma',
+            'estado': 'CREADA',
+            'estadoHistorial': [
+                {'estado': 'CREADA', 'fecha': now.isoformat(), 'usuario': 'Administrador Principal'}
+            ],
+            'fechaCreacion': now.isoformat(),
+            'fechaEstimadaEntrega': None,
+            'fechaEntrega': None,
+            'repartidorAsignado': None,
+            'createdBy': 'admin@paqueteria.com',
+            'activa': True
+        },
+        {
+            'numeroOrden': 'ORD-2025-002',
+            'emisorNombre': 'María González López',
+            'emisorTelefono': '+56987654321',
+            'emisorDireccion': 'Calle Providencia #5678, Providencia',
+            'receptorNombre': 'Ana Martínez Torres',
+            'receptorTelefono': '+56966778899',
+            'receptorDireccion': 'Av. Vicuña Mackenna #3210, Ñuñoa',
+            'descripcion': 'Paquete con ropa y accesorios',
+            'notasAdicionales': 'Tocar el timbre, piso 4',
+            'estado': 'ENVIADA',
+            'estadoHistorial': [
+                {'estado': 'CREADA', 'fecha': (now - timedelta(hours=2)).isoformat(), 'usuario': 'Administrador Principal'},
+                {'estado': 'ENVIADA', 'fecha': (now - timedelta(hours=1)).isoformat(), 'usuario': 'Administrador Principal'}
+            ],
+            'fechaCreacion': (now - timedelta(hours=2)).isoformat(),
+            'fechaEstimadaEntrega': (now + timedelta(days=1)).isoformat(),
+            'fechaEntrega': None,
+            'repartidorAsignado': 'Juan Repartidor',
+            'createdBy': 'admin@paqueteria.com',
+            'activa': True
+        },
+        {
+            'numeroOrden': 'ORD-2025-003',
+            'emisorNombre': 'Comercial TechStore Ltda.',
+            'emisorTelefono': '+56922334455',
+            'emisorDireccion': 'Av. Apoquindo #4567, Las Condes',
+            'receptorNombre': 'Restaurante El Buen Sabor',
+            'receptorTelefono': '+56933445566',
+            'receptorDireccion': 'Av. Italia #1234, Providencia',
+            'descripcion': 'Equipamiento tecnológico (2 notebooks, 1 impresora)',
+            'notasAdicionales': 'Frágil - Manejar con cuidado',
+            'estado': 'REPARTIENDO',
+            'estadoHistorial': [
+                {'estado': 'CREADA', 'fecha': (now - timedelta(days=1)).isoformat(), 'usuario': 'Administrador Principal'},
+                {'estado': 'ENVIADA', 'fecha': (now - timedelta(hours=6)).isoformat(), 'usuario': 'Administrador Principal'},
+                {'estado': 'REPARTIENDO', 'fecha': (now - timedelta(hours=1)).isoformat(), 'usuario': 'Juan Repartidor'}
+            ],
+            'fechaCreacion': (now - timedelta(days=1)).isoformat(),
+            'fechaEstimadaEntrega': now.isoformat(),
+            'fechaEntrega': None,
+            'repartidorAsignado': 'Juan Repartidor',
+            'createdBy': 'admin@paqueteria.com',
+            'activa': True
+        },
+        {
+            'numeroOrden': 'ORD-2025-004',
+            'emisorNombre': 'Juan Pérez García',
+            'emisorTelefono': '+56912345678',
+            'emisorDireccion': 'Av. Libertador Bernardo O\'Higgins #1234, Santiago',
+            'receptorNombre': 'Laura Fernández Gómez',
+            'receptorTelefono': '+56955667788',
+            'receptorDireccion': 'Calle Bombero Ossa #567, Santiago',
+            'descripcion': 'Caja con libros de estudio',
+            'notasAdicionales': 'Cliente conforme con la entrega',
+            'estado': 'ENTREGADA',
+            'estadoHistorial': [
+                {'estado': 'CREADA', 'fecha': (now - timedelta(days=2)).isoformat(), 'usuario': 'Administrador Principal'},
+                {'estado': 'ENVIADA', 'fecha': (now - timedelta(days=1, hours=18)).isoformat(), 'usuario': 'Administrador Principal'},
+                {'estado': 'REPARTIENDO', 'fecha': (now - timedelta(days=1, hours=2)).isoformat(), 'usuario': 'Juan Repartidor'},
+                {'estado': 'ENTREGADA', 'fecha': (now - timedelta(days=1)).isoformat(), 'usuario': 'Juan Repartidor'}
+            ],
+            'fechaCreacion': (now - timedelta(days=2)).isoformat(),
+            'fechaEstimadaEntrega': (now - timedelta(days=1)).isoformat(),
+            'fechaEntrega': (now - timedelta(days=1)).isoformat(),
+            'repartidorAsignado': 'Juan Repartidor',
+            'createdBy': 'admin@paqueteria.com',
+            'activa': True
+        },
+        {
+            'numeroOrden': 'ORD-2025-005',
+            'emisorNombre': 'María González López',
+            'emisorTelefono': '+56987654321',
+            'emisorDireccion': 'Calle Providencia #5678, Providencia',
+            'receptorNombre': 'Carlos Ramírez Silva',
+            'receptorTelefono': '+56911223344',
+            'receptorDireccion': 'Paseo Bulnes #987, Santiago Centro',
+            'descripcion': 'Productos de farmacia',
+            'notasAdicionales': 'Urgente - medicamentos recetados',
+            'estado': 'CREADA',
+            'estadoHistorial': [
+                {'estado': 'CREADA', 'fecha': (now - timedelta(minutes=30)).isoformat(), 'usuario': 'Administrador Principal'}
+            ],
+            'fechaCreacion': (now - timedelta(minutes=30)).isoformat(),
+            'fechaEstimadaEntrega': None,
+            'fechaEntrega': None,
+            'repartidorAsignado': None,
+            'createdBy': 'admin@paqueteria.com',
+            'activa': True
+        }
+    ]
+
+
+
+def delete_collection(db, collection_name, limiter=None):
+    deleted = bulk_delete_collection(db, collection_name, limiter=limiter)
     if deleted > 0:
         print(f"   ✓ {deleted} documentos eliminados de '{collection_name}'")
 
-delete_collection('emisores')
-delete_collection('receptores')
-delete_collection('ordenes')
 
-print()
+def user_doc_id(email):
+    return email.replace('@', '_at_').replace('.', '_')
 
-# ==============================================================================
-# 3. CREAR EMISORES
-# ==============================================================================
-print("📦 Creando emisores...")
-emisores_data = [
-    {
-        'nombre': 'Juan Pérez García',
-        'telefono': '+56912345678',
-        'direccion': 'Av. Libertador Bernardo O\'Higgins #1234, Santiago',
-        'email': 'juan.perez@email.com',
-        'rut': '12.345.678-9',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'María González López',
-        'telefono': '+56987654321',
-        'direccion': 'Calle Providencia #5678, Providencia',
-        'email': 'maria.gonzalez@email.com',
-        'rut': '98.765.432-1',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'Comercial TechStore Ltda.',
-        'telefono': '+56922334455',
-        'direccion': 'Av. Apoquindo #4567, Las Condes',
-        'email': 'ventas@techstore.cl',
-        'rut': '76.123.456-7',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    }
-]
-
-for emisor in emisores_data:
-    db.collection('emisores').add(emisor)
-    print(f"   ✓ Emisor '{emisor['nombre']}' creado")
-
-print()
 
-# ==============================================================================
-# 4. CREAR RECEPTORES
-# ==============================================================================
-print("📬 Creando receptores...")
-receptores_data = [
-    {
-        'nombre': 'Carlos Ramírez Silva',
-        'telefono': '+56911223344',
-        'direccion': 'Paseo Bulnes #987, Santiago Centro',
-        'email': 'carlos.ramirez@email.com',
-        'rut': '23.456.789-0',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'Ana Martínez Torres',
-        'telefono': '+56966778899',
-        'direccion': 'Av. Vicuña Mackenna #3210, Ñuñoa',
-        'email': 'ana.martinez@email.com',
-        'rut': '34.567.890-1',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'Restaurante El Buen Sabor',
-        'telefono': '+56933445566',
-        'direccion': 'Av. Italia #1234, Providencia',
-        'email': 'contacto@buensabor.cl',
-        'rut': '77.234.567-8',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    },
-    {
-        'nombre': 'Laura Fernández Gómez',
-        'telefono': '+56955667788',
-        'direccion': 'Calle Bombero Ossa #567, Santiago',
-        'email': 'laura.fernandez@email.com',
-        'rut': '45.678.901-2',
-        'activo': True,
-        'createdAt': firestore.SERVER_TIMESTAMP
-    }
-]
-
-for receptor in receptores_data:
-    db.collection('receptores').add(receptor)
-    print(f"   ✓ Receptor '{receptor['nombre']}' creado")
-
-print()
+def synthetic_order_stream(synthetic_orders, seed_value):
+    # Continúa la numeración después de las órdenes de ejemplo
+    return generate_orders(synthetic_orders, seed=seed_value, first_number=len(ordenes_data()) + 1)
 
-# ==============================================================================
-# 5. CREAR ÓRDENES CON TODOS LOS ESTADOS
-# ==============================================================================
-print("📋 Creando órdenes con diferentes estados...")
-
-now = datetime.now()
-
-ordenes_data = [
-    {
-        'numeroOrden': 'ORD-2025-001',
-        'emisorNombre': 'Juan Pérez García',
-        'emisorTelefono': '+56912345678',
-        'emisorDireccion': 'Av. Libertador Bernardo O\'Higgins #1234, Santiago',
-        'receptorNombre': 'Carlos Ramírez Silva',
-        'receptorTelefono': '+56911223344',
-        'receptorDireccion': 'Paseo Bulnes #987, Santiago Centro',
-        'descripcion': 'Documentos legales importantes',
-        'notasAdicionales': 'Entregar personalmente, requiere firma',
-        'estado': 'CREADA',
-        'estadoHistorial': [
-            {'estado': 'CREADA', 'fecha': now.isoformat(), 'usuario': 'Administrador Principal'}
-        ],
-        'fechaCreacion': now.isoformat(),
-        'fechaEstimadaEntrega': None,
-        'fechaEntrega': None,
-        'repartidorAsignado': None,
-        'createdBy': 'admin@paqueteria.com',
-        'activa': True
-    },
-    {
-        'numeroOrden': 'ORD-2025-002',
-        'emisorNombre': 'María González López',
-        'emisorTelefono': '+56987654321',
-        'emisorDireccion': 'Calle Providencia #5678, Providencia',
-        'receptorNombre': 'Ana Martínez Torres',
-        'receptorTelefono': '+56966778899',
-        'receptorDireccion': 'Av. Vicuña Mackenna #3210, Ñuñoa',
-        'descripcion': 'Paquete con ropa y accesorios',
-        'notasAdicionales': 'Tocar el timbre, piso 4',
-        'estado': 'ENVIADA',
-        'estadoHistorial': [
-            {'estado': 'CREADA', 'fecha': (now - timedelta(hours=2)).isoformat(), 'usuario': 'Administrador Principal'},
-            {'estado': 'ENVIADA', 'fecha': (now - timedelta(hours=1)).isoformat(), 'usuario': 'Administrador Principal'}
-        ],
-        'fechaCreacion': (now - timedelta(hours=2)).isoformat(),
-        'fechaEstimadaEntrega': (now + timedelta(days=1)).isoformat(),
-        'fechaEntrega': None,
-        'repartidorAsignado': 'Juan Repartidor',
-        'createdBy': 'admin@paqueteria.com',
-        'activa': True
-    },
-    {
-        'numeroOrden': 'ORD-2025-003',
-        'emisorNombre': 'Comercial TechStore Ltda.',
-        'emisorTelefono': '+56922334455',
-        'emisorDireccion': 'Av. Apoquindo #4567, Las Condes',
-        'receptorNombre': 'Restaurante El Buen Sabor',
-        'receptorTelefono': '+56933445566',
-        'receptorDireccion': 'Av. Italia #1234, Providencia',
-        'descripcion': 'Equipamiento tecnológico (2 notebooks, 1 impresora)',
-        'notasAdicionales': 'Frágil - Manejar con cuidado',
-        'estado': 'REPARTIENDO',
-        'estadoHistorial': [
-            {'estado': 'CREADA', 'fecha': (now - timedelta(days=1)).isoformat(), 'usuario': 'Administrador Principal'},
-            {'estado': 'ENVIADA', 'fecha': (now - timedelta(hours=6)).isoformat(), 'usuario': 'Administrador Principal'},
-            {'estado': 'REPARTIENDO', 'fecha': (now - timedelta(hours=1)).isoformat(), 'usuario': 'Juan Repartidor'}
-        ],
-        'fechaCreacion': (now - timedelta(days=1)).isoformat(),
-        'fechaEstimadaEntrega': now.isoformat(),
-        'fechaEntrega': None,
-        'repartidorAsignado': 'Juan Repartidor',
-        'createdBy': 'admin@paqueteria.com',
-        'activa': True
-    },
-    {
-        'numeroOrden': 'ORD-2025-004',
-        'emisorNombre': 'Juan Pérez García',
-        'emisorTelefono': '+56912345678',
-        'emisorDireccion': 'Av. Libertador Bernardo O\'Higgins #1234, Santiago',
-        'receptorNombre': 'Laura Fernández Gómez',
-        'receptorTelefono': '+56955667788',
-        'receptorDireccion': 'Calle Bombero Ossa #567, Santiago',
-        'descripcion': 'Caja con libros de estudio',
-        'notasAdicionales': 'Cliente conforme con la entrega',
-        'estado': 'ENTREGADA',
-        'estadoHistorial': [
-            {'estado': 'CREADA', 'fecha': (now - timedelta(days=2)).isoformat(), 'usuario': 'Administrador Principal'},
-            {'estado': 'ENVIADA', 'fecha': (now - timedelta(days=1, hours=18)).isoformat(), 'usuario': 'Administrador Principal'},
-            {'estado': 'REPARTIENDO', 'fecha': (now - timedelta(days=1, hours=2)).isoformat(), 'usuario': 'Juan Repartidor'},
-            {'estado': 'ENTREGADA', 'fecha': (now - timedelta(days=1)).isoformat(), 'usuario': 'Juan Repartidor'}
-        ],
-        'fechaCreacion': (now - timedelta(days=2)).isoformat(),
-        'fechaEstimadaEntrega': (now - timedelta(days=1)).isoformat(),
-        'fechaEntrega': (now - timedelta(days=1)).isoformat(),
-        'repartidorAsignado': 'Juan Repartidor',
-        'createdBy': 'admin@paqueteria.com',
-        'activa': True
-    },
-    {
-        'numeroOrden': 'ORD-2025-005',
-        'emisorNombre': 'María González López',
-        'emisorTelefono': '+56987654321',
-        'emisorDireccion': 'Calle Providencia #5678, Providencia',
-        'receptorNombre': 'Carlos Ramírez Silva',
-        'receptorTelefono': '+56911223344',
-        'receptorDireccion': 'Paseo Bulnes #987, Santiago Centro',
-        'descripcion': 'Productos de farmacia',
-        'notasAdicionales': 'Urgente - medicamentos recetados',
-        'estado': 'CREADA',
-        'estadoHistorial': [
-            {'estado': 'CREADA', 'fecha': (now - timedelta(minutes=30)).isoformat(), 'usuario': 'Administrador Principal'}
-        ],
-        'fechaCreacion': (now - timedelta(minutes=30)).isoformat(),
-        'fechaEstimadaEntrega': None,
-        'fechaEntrega': None,
-        'repartidorAsignado': None,
-        'createdBy': 'admin@paqueteria.com',
-        'activa': True
-    }
-]
-
-for orden in ordenes_data:
-    db.collection('ordenes').add(orden)
-    print(f"   ✓ Orden '{orden['numeroOrden']}' - Estado: {orden['estado']}")
-
-print()
-print("=" * 70)
-print("🎉 ¡CONFIGURACIÓN COMPLETADA EXITOSAMENTE!")
-print("=" * 70)
-print()
-print("✅ Sistema configurado con:")
-print(f"   👥 Usuarios:")
-print(f"      - Admin: admin@paqueteria.com (password: Admin123!)")
-print(f"      - Repartidor: repartidor@paqueteria.com (password: Rep123!)")
-print(f"   📦 Emisores: {len(emisores_data)} documentos")
-print(f"   📬 Receptores: {len(receptores_data)} documentos")
-print(f"   📋 Órdenes: {len(ordenes_data)} documentos")
-print()
-print("📊 Estados de órdenes:")
-print(f"   - CREADA: 2 órdenes")
-print(f"   - ENVIADA: 1 orden")
-print(f"   - REPARTIENDO: 1 orden")
-print(f"   - ENTREGADA: 1 orden")
-print()
-print("⚠️  IMPORTANTE: Activa Email/Password Authentication en Firebase Console:")
-print("   1. Ve a Authentication → Sign-in method")
-print("   2. Habilita 'Email/Password'")
-print()
-print("🚀 ¡Ahora puedes conectar tu app Flutter con Firebase!")
-print()
+
+def seed_incremental(db, writer, synthetic_orders=0, seed_value=SEMILLA_POR_DEFECTO):
+    """
+    Sin borrar nada: IDs deterministas y solo se escribe lo nuevo o cambiado.
+    Las órdenes de ejemplo usan la fecha actual, así que se actualizan en cada
+    corrida; las sintéticas tienen fechas fijas y no.
+    """
+    print("♻️  Siembra incremental (solo documentos nuevos o cambiados)...")
+    print()
+    usuarios = [{k: v for k, v in u.items() if k != 'password'} for u in usuarios_data()]
+    emisores_docs, receptores_docs = emisores_data(), receptores_data()
+    emisores, receptores = ContactIndex(), ContactIndex()
+    for emisor in emisores_docs:
+        emisores.add(document_id('emisores', emisor), emisor)
+    for receptor in receptores_docs:
+        receptores.add(document_id('receptores', receptor), receptor)
+    colecciones = [
+        ('👥', 'usuarios', usuarios),
+        ('📦', 'emisores', emisores_docs),
+        ('📬', 'receptores', receptores_docs),
+        ('📋', 'ordenes', with_contact_ids(ordenes_data(), emisores, receptores)),
+    ]
+    if synthetic_orders:
+        colecciones.append(('📋', 'ordenes', with_contact_ids(
+            synthetic_order_stream(synthetic_orders, seed_value), emisores, receptores)))
+    for icono, nombre, documentos in colecciones:
+        stats = upsert_documents(db, writer, nombre, documentos)
+        print(f"   {icono} {nombre}: {stats}")
+    print()
+    print("   ℹ️  Los contadores no se actualizan en modo incremental;")
+    print("      ejecuta 'python3 order_counters.py reconstruir' si hubo cambios.")
+    print()
+
+
+def seed(db, writer, synthetic_orders=0, seed_value=SEMILLA_POR_DEFECTO, limiter=None):
+    # ==========================================================================
+    # 1. CREAR PERFILES DE USUARIOS EN FIRESTORE
+    # ==========================================================================
+    print("👥 Creando perfiles de usuarios en Firestore...")
+    print()
+
+    for usuario in usuarios_data():
+        # Crear documento sin el campo password
+        user_data = {k: v for k, v in usuario.items() if k != 'password'}
+        writer.set(db.collection('usuarios').document(user_doc_id(usuario['email'])), user_data)
+        print(f"   ✓ Perfil '{usuario['nombre']}' creado ({usuario['rol']})")
+        print(f"      Email: {usuario['email']} | Password: {usuario['password']}")
+
+    print()
+
+    # ==========================================================================
+    # 2. LIMPIAR COLECCIONES EXISTENTES DE DATOS
+    # ==========================================================================
+    print("🗑️  Limpiando datos de prueba anteriores...")
+
+    # Los borrados comparten la rampa 500/50/5 con las escrituras de después
+    for name in ('emisores', 'receptores', 'ordenes', COLECCION_CONTADORES):
+        delete_collection(db, name, limiter)
+
+    print()
+
+    # ==========================================================================
+    # 3. CREAR EMISORES
+    # ==========================================================================
+    print("📦 Creando emisores...")
+    emisores = ContactIndex()
+    for emisor in emisores_data():
+        emisores.add(writer.add('emisores', emisor).id, emisor)
+        print(f"   ✓ Emisor '{emisor['nombre']}' creado")
+
+    print()
+
+    # ==========================================================================
+    # 4. CREAR RECEPTORES
+    # ==========================================================================
+    print("📬 Creando receptores...")
+    receptores = ContactIndex()
+    for receptor in receptores_data():
+        receptores.add(writer.add('receptores', receptor).id, receptor)
+        print(f"   ✓ Receptor '{receptor['nombre']}' creado")
+
+    print()
+
+    # ==========================================================================
+    # 5. CREAR ÓRDENES CON TODOS LOS ESTADOS
+    # ==========================================================================
+    print("📋 Creando órdenes con diferentes estados...")
+    for orden in with_contact_ids(ordenes_data(), emisores, receptores):
+        writer.write_group(order_write_ops(db, orden))
+        print(f"   ✓ Orden '{orden['numeroOrden']}' - Estado: {orden['estado']}")
+
+    if synthetic_orders:
+        print(f"   … Generando {synthetic_orders} órdenes sintéticas (semilla {seed_value})")
+        for orden in with_contact_ids(synthetic_order_stream(synthetic_orders, seed_value),
+                                      emisores, receptores):
+            writer.write_group(order_write_ops(db, orden))
+
+    print()
+
+
+async def seed_async(db, writer, synthetic_orders=0, seed_value=SEMILLA_POR_DEFECTO,
+                     concurrency=CONCURRENCIA_POR_DEFECTO, limiter=None):
+    """Misma secuencia que seed(), con el motor asyncio."""
+    print("👥 Creando perfiles de usuarios en Firestore...")
+    print()
+    for usuario in usuarios_data():
+        user_data = {k: v for k, v in usuario.items() if k != 'password'}
+        await writer.set(db.collection('usuarios').document(user_doc_id(usuario['email'])), user_data)
+        print(f"   ✓ Perfil '{usuario['nombre']}' creado ({usuario['rol']})")
+        print(f"      Email: {usuario['email']} | Password: {usuario['password']}")
+    print()
+
+    print("🗑️  Limpiando datos de prueba anteriores...")
+    deleted = await asyncio.gather(*(
+        bulk_delete_collection_async(db, name, concurrency=concurrency, limiter=limiter)
+        for name in ('emisores', 'receptores', 'ordenes', COLECCION_CONTADORES)))
+    for name, count in zip(('emisores', 'receptores', 'ordenes', COLECCION_CONTADORES), deleted):
+        if count > 0:
+            print(f"   ✓ {count} documentos eliminados de '{name}'")
+    print()
+
+    print("📦 Creando emisores...")
+    emisores = ContactIndex()
+    for emisor in emisores_data():
+        emisores.add((await writer.add('emisores', emisor)).id, emisor)
+        print(f"   ✓ Emisor '{emisor['nombre']}' creado")
+    print()
+
+    print("📬 Creando receptores...")
+    receptores = ContactIndex()
+    for receptor in receptores_data():
+        receptores.add((await writer.add('receptores', receptor)).id, receptor)
+        print(f"   ✓ Receptor '{receptor['nombre']}' creado")
+    print()
+
+    print("📋 Creando órdenes con diferentes estados...")
+    for orden in with_contact_ids(ordenes_data(), emisores, receptores):
+        await writer.write_group(order_write_ops(db, orden))
+        print(f"   ✓ Orden '{orden['numeroOrden']}' - Estado: {orden['estado']}")
+    if synthetic_orders:
+        print(f"   … Generando {synthetic_orders} órdenes sintéticas (semilla {seed_value})")
+        for orden in with_contact_ids(synthetic_order_stream(synthetic_orders, seed_value),
+                                      emisores, receptores):
+            await writer.write_group(order_write_ops(db, orden))
+    print()
+
+
+async def main_async(args):
+    db = get_async_db()
+    limiter = None if args.sin_limite else AdaptiveRateLimiter()
+    async with AsyncBatchWriter(db, concurrency=args.concurrencia, limiter=limiter) as writer:
+        await seed_async(db, writer, args.ordenes_sinteticas, args.semilla, args.concurrencia,
+                         limiter)
+    return writer.stats
+
+
+def print_summary(stats, estados, synthetic_orders=0):
+    print("=" * 70)
+    print("🎉 ¡CONFIGURACIÓN COMPLETADA EXITOSAMENTE!")
+    print("=" * 70)
+    print()
+    print("✅ Sistema configurado con:")
+    print(f"   👥 Usuarios:")
+    print(f"      - Admin: admin@paqueteria.com (password: Admin123!)")
+    print(f"      - Repartidor: repartidor@paqueteria.com (password: Rep123!)")
+    print(f"   📦 Emisores: {len(emisores_data())} documentos")
+    print(f"   📬 Receptores: {len(receptores_data())} documentos")
+    print(f"   📋 Órdenes: {len(ordenes_data()) + synthetic_orders} documentos")
+    print()
+    print("📊 Estados de órdenes:")
+    for estado in ('CREADA', 'ENVIADA', 'REPARTIENDO', 'ENTREGADA'):
+        total = estados.get(estado, 0)
+        print(f"   - {estado}: {total} {'orden' if total == 1 else 'órdenes'}")
+    print()
+    stats.print_summary()
+    print()
+    print("⚠️  IMPORTANTE: Activa Email/Password Authentication en Firebase Console:")
+    print("   1. Ve a Authentication → Sign-in method")
+    print("   2. Habilita 'Email/Password'")
+    print()
+    print("🚀 ¡Ahora puedes conectar tu app Flutter con Firebase!")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Configura Firestore con datos de ejemplo')
+    add_writer_arguments(parser)
+    parser.add_argument('--ordenes-sinteticas', type=int, default=0,
+                        help='Órdenes generadas adicionales para pruebas de carga')
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO,
+                        help='Semilla para las órdenes sintéticas')
+    parser.add_argument('--incremental', action='store_true',
+                        help='No borrar: IDs deterministas y escribir solo lo nuevo o cambiado')
+    parser.add_argument('--motor', choices=('sync', 'async'), default='sync',
+                        help='sync (hilos) o async (firestore.AsyncClient)')
+    parser.add_argument('--concurrencia', type=int, default=CONCURRENCIA_POR_DEFECTO,
+                        help='RPC en vuelo con --motor async')
+    args = parser.parse_args()
+    if args.motor == 'async' and args.incremental:
+        parser.error('--incremental todavía no está disponible con --motor async')
+
+    print("=" * 70)
+    print("🔥 CONFIGURACIÓN COMPLETA DE FIREBASE - SISTEMA DE PAQUETERÍA")
+    print("=" * 70)
+    print()
+
+    if args.motor == 'async':
+        stats = run_async(main_async(args))
+        print_summary(stats, read_counters(get_db(), 'estado'), args.ordenes_sinteticas)
+        return
+
+    # Firebase Admin SDK y cliente de Firestore compartidos
+    db = get_db()
+    limiter = None if args.sin_limite else AdaptiveRateLimiter()
+
+    with make_writer(db, args.modo, max_in_flight=args.en_vuelo,
+                     rate_limit=not args.sin_limite, limiter=limiter) as writer:
+        if args.incremental:
+            seed_incremental(db, writer, args.ordenes_sinteticas, args.semilla)
+        else:
+            seed(db, writer, args.ordenes_sinteticas, args.semilla, limiter)
+    print_summary(writer.stats, read_counters(db, 'estado'), args.ordenes_sinteticas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Métricas de cumplimiento (SLA) de entregas a partir de estadoHistorial.
+
+Las órdenes se cargan en arreglos columnares de NumPy, una fila por orden:
+
+- tiempos: segundos desde la época de la primera vez que la orden pasó por
+  CREADA, ENVIADA, REPARTIENDO y ENTREGADA (-1 si no pasó)
+- fechaEstimadaEntrega (epoch, -1 si no tiene)
+- estado, repartidor y provincia como códigos enteros (índices en los
+  vocabularios que se guardan junto a los arreglos)
+
+Sobre esos arreglos, sin recorrer órdenes en Python, se calculan:
+percentiles de la duración de cada tramo y del total, entregas tarde frente a
+fechaEstimadaEntrega, órdenes abiertas ya vencidas, y agregados por
+repartidor y por provincia (np.bincount y grupos ordenados con np.lexsort).
+
+Es incremental: los arreglos se guardan en un .npz y, como en
+export_firestore.py, hay marcas de agua por fechaCreacion y updatedAt; cada
+ejecución lee solo las órdenes creadas o modificadas después de la marca y
+reemplaza sus filas. Los cambios de estado solo se ven si quien los hace
+actualiza updatedAt. --completo descarta lo guardado y vuelve a leer todo.
+
+Requiere numpy.
+
+Uso:
+    python3 sla_analytics.py                 # incremental
+    python3 sla_analytics.py --completo --estado sla.npz --marcas marcas_sla.json
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from export_firestore import CAMPOS_MARCA, Watermarks, iter_pages_since
+from generate_ordenes import ESTADOS
+from order_records import to_epoch
+
+ARCHIVO_ESTADO = 'sla_estado.npz'
+ARCHIVO_MARCAS = 'marcas_sla.json'
+
+CAMPOS_LECTURA = ['estado', 'estadoHistorial', 'fechaEstimadaEntrega', 'repartidorAsignado',
+                  'provinciaDestino', *CAMPOS_MARCA['ordenes']]
+
+# Tramos de (estado inicial, estado final) por índice en ESTADOS
+TRAMOS = {
+    'CREADA → ENVIADA': (0, 1),
+    'ENVIADA → REPARTIENDO': (1, 2),
+    'REPARTIENDO → ENTREGADA': (2, 3),
+    'CREADA → ENTREGADA': (0, 3),
+}
+PERCENTILES = (50, 90, 99)
+SEGUNDOS_HORA = 3600
+ENTREGADA = ESTADOS.index('ENTREGADA')
+
+
+class SlaTable:
+    """
+    Arreglos columnares de órdenes, con vocabularios para los códigos.
+
+    update() reemplaza en su lugar las filas de órdenes que ya están (índice
+    ID → fila) y acumula las nuevas, que flush() agrega con un solo
+    concatenate: una carga completa no vuelve a copiar la tabla por página.
+    """
+
+    def __init__(self):
+        import numpy as np
+
+        self.ids = np.array([], dtype=str)
+        self.tiempos = np.empty((0, len(ESTADOS)), dtype=np.int64)
+        self.estimada = np.empty(0, dtype=np.int64)
+        self.estado = np.empty(0, dtype=np.int8)
+        self.repartidor = np.empty(0, dtype=np.int32)
+        self.provincia = np.empty(0, dtype=np.int32)
+        self.repartidores = []
+        self.provincias = []
+        self._codes = {}
+        self._index = None
+        # Filas nuevas aún no agregadas a los arreglos: (id, tiempos, estimada, estado, ...)
+        self._pending = []
+
+    def __len__(self):
+        return len(self.ids) + len(self._pending)
+
+    def _code(self, kind, value):
+        """Código de `value` en el vocabulario `kind` ('repartidores' o 'provincias')."""
+        if not value:
+            return -1
+        vocabulary = getattr(self, kind)
+        codes = self._codes.setdefault(kind, {v: i for i, v in enumerate(vocabulary)})
+        if value not in codes:
+            codes[value] = len(vocabulary)
+            vocabulary.append(value)
+        return codes[value]
+
+    def _row(self, orden):
+        tiempos = [-1] * len(ESTADOS)
+        for evento in orden.get('estadoHistorial') or ():
+            if evento.get('estado') in ESTADOS and evento.get('fecha'):
+                j = ESTADOS.index(evento['estado'])
+                if tiempos[j] < 0:
+                    tiempos[j] = to_epoch(evento['fecha'])
+        estimada = to_epoch(orden['fechaEstimadaEntrega']) if orden.get('fechaEstimadaEntrega') else -1
+        estado = ESTADOS.index(orden['estado']) if orden.get('estado') in ESTADOS else -1
+        return (tiempos, estimada, estado,
+                self._code('repartidores', orden.get('repartidorAsignado')),
+                self._code('provincias', orden.get('provinciaDestino')))
+
+    def update(self, snapshots):
+        """Agrega o reemplaza las filas de estas órdenes (la última gana si se repite)."""
+        import numpy as np
+
+        if self._index is None:
+            self._index = {doc_id: i for i, doc_id in enumerate(self.ids.tolist())}
+        stored = len(self.ids)
+        patches = {}
+        count = 0
+        for snapshot in snapshots:
+            count += 1
+            row = self._row(snapshot.to_dict() or {})
+            position = self._index.get(snapshot.id)
+            if position is None:
+                self._index[snapshot.id] = stored + len(self._pending)
+                self._pending.append((snapshot.id,) + row)
+            elif position >= stored:
+                self._pending[position - stored] = (snapshot.id,) + row
+            else:
+                patches[position] = row
+        if patches:
+            positions = np.fromiter(patches, dtype=np.int64, count=len(patches))
+            tiempos, estimada, estado, repartidor, provincia = zip(*patches.values())
+            self.tiempos[positions] = tiempos
+            self.estimada[positions] = estimada
+            self.estado[positions] = estado
+            self.repartidor[positions] = repartidor
+            self.provincia[positions] = provincia
+        return count
+
+    def flush(self):
+        """Agrega a los arreglos las filas nuevas acumuladas por update()."""
+        import numpy as np
+
+        if not self._pending:
+            return
+        ids, tiempos, estimada, estado, repartidor, provincia = zip(*self._pending)
+        self._pending = []
+        self.ids = np.concatenate([self.ids, np.array(ids, dtype=str)])
+        self.tiempos = np.concatenate([self.tiempos, np.array(tiempos, dtype=np.int64)])
+        self.estimada = np.concatenate([self.estimada, np.array(estimada, dtype=np.int64)])
+        self.estado = np.concatenate([self.estado, np.array(estado, dtype=np.int8)])
+        self.repartidor = np.concatenate([self.repartidor, np.array(repartidor, dtype=np.int32)])
+        self.provincia = np.concatenate([self.provincia, np.array(provincia, dtype=np.int32)])
+
+    def save(self, path):
+        import numpy as np
+
+        self.flush()
+        tmp = f'{path}.tmp.npz'
+        np.savez_compressed(tmp, ids=self.ids, tiempos=self.tiempos, estimada=self.estimada,
+                            estado=self.estado, repartidor=self.repartidor,
+                            provincia=self.provincia,
+                            vocabularios=json.dumps({'repartidores': self.repartidores,
+                                                     'provincias': self.provincias}))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        table = cls()
+        if not os.path.exists(path):
+            return table
+        with np.load(path) as data:
+            table.ids = data['ids']
+            table.tiempos = data['tiempos']
+            table.estimada = data['estimada']
+            table.estado = data['estado']
+            table.repartidor = data['repartidor']
+            table.provincia = data['provincia']
+            vocabularios = json.loads(str(data['vocabularios']))
+        table.repartidores = vocabularios['repartidores']
+        table.provincias = vocabularios['provincias']
+        return table
+
+
+# ==============================================================================
+# MÉTRICAS
+# ==============================================================================
+
+def step_percentiles(table):
+    """{tramo: (órdenes, {percentil: horas})} de cada tramo con ambos extremos."""
+    import numpy as np
+
+    result = {}
+    for name, (a, b) in TRAMOS.items():
+        start, end = table.tiempos[:, a], table.tiempos[:, b]
+        hours = (end - start)[(start >= 0) & (end >= 0)] / SEGUNDOS_HORA
+        values = np.percentile(hours, PERCENTILES) if len(hours) else [np.nan] * len(PERCENTILES)
+        result[name] = (len(hours), dict(zip(PERCENTILES, values)))
+    return result
+
+
+def lateness(table, now=None):
+    """Entregas tarde y órdenes abiertas vencidas respecto a fechaEstimadaEntrega."""
+    # to_epoch lee las fechas sin zona como UTC: "ahora" también tiene que ser UTC
+    now = to_epoch(now or datetime.now(timezone.utc))
+    entregada = table.tiempos[:, ENTREGADA]
+    con_estimada = table.estimada >= 0
+    entregadas = con_estimada & (entregada >= 0)
+    tarde = entregadas & (entregada > table.estimada)
+    abiertas_vencidas = con_estimada & (entregada < 0) & (table.estimada < now)
+    retraso = (entregada - table.estimada)[tarde] / SEGUNDOS_HORA
+    return {
+        'entregadas_con_estimada': int(entregadas.sum()),
+        'tarde': int(tarde.sum()),
+        'porcentaje_tarde': float(tarde.sum() / entregadas.sum() * 100) if entregadas.any() else 0.0,
+        'retraso_medio_horas': float(retraso.mean()) if len(retraso) else 0.0,
+        'abiertas_vencidas': int(abiertas_vencidas.sum()),
+    }
+
+
+def group_stats(codes, vocabulary, table):
+    """
+    Por cada valor de `codes` (repartidor o provincia): órdenes, entregadas,
+    tarde, mediana de horas CREADA → ENTREGADA y entregas por día activo.
+    """
+    import numpy as np
+
+    k = len(vocabulary)
+    valid = codes >= 0
+    creada, entregada = table.tiempos[:, 0], table.tiempos[:, ENTREGADA]
+    delivered = valid & (entregada >= 0)
+    late = delivered & (table.estimada >= 0) & (entregada > table.estimada)
+
+    ordenes = np.bincount(codes[valid], minlength=k)
+    entregas = np.bincount(codes[delivered], minlength=k)
+    tarde = np.bincount(codes[late], minlength=k)
+
+    # Mediana (rango más cercano) por grupo: ordenar por (grupo, duración)
+    with_total = delivered & (creada >= 0)
+    group = codes[with_total]
+    total = (entregada - creada)[with_total]
+    order = np.lexsort((total, group))
+    group, total = group[order], total[order]
+    counts = np.bincount(group, minlength=k)
+    starts = np.searchsorted(group, np.arange(k))
+    has = counts > 0
+    mediana = np.full(k, np.nan)
+    mediana[has] = total[starts[has] + (counts[has] - 1) // 2] / SEGUNDOS_HORA
+
+    # Días con entregas: de la primera a la última entrega de cada grupo
+    days = np.full(k, np.nan)
+    if delivered.any():
+        first = np.full(k, np.iinfo(np.int64).max)
+        last = np.full(k, np.iinfo(np.int64).min)
+        np.minimum.at(first, codes[delivered], entregada[delivered])
+        np.maximum.at(last, codes[delivered], entregada[delivered])
+        active = entregas > 0
+        days[active] = (last[active] - first[active]) // 86400 + 1
+
+    return [
+        {'nombre': vocabulary[i], 'ordenes': int(ordenes[i]), 'entregadas': int(entregas[i]),
+         'tarde': int(tarde[i]), 'mediana_horas': float(mediana[i]),
+         'entregas_por_dia': float(entregas[i] / days[i]) if entregas[i] else 0.0}
+        for i in np.argsort(-ordenes) if ordenes[i]
+    ]
+
+
+def compute_metrics(table, now=None):
+    import numpy as np
+
+    return {
+        'ordenes': len(table),
+        'por_estado': {estado: int(n) for estado, n in
+                       zip(ESTADOS, np.bincount(table.estado[table.estado >= 0],
+                                                minlength=len(ESTADOS)))},
+        'tramos': step_percentiles(table),
+        'atrasos': lateness(table, now),
+        'repartidores': group_stats(table.repartidor, table.repartidores, table),
+        'provincias': group_stats(table.provincia, table.provincias, table),
+    }
+
+
+# ==============================================================================
+# CARGA INCREMENTAL
+# ==============================================================================
+
+def refresh(db, table, watermarks, page_size=1000):
+    """Lee las órdenes creadas o modificadas después de las marcas. Devuelve cuántas."""
+    collection = db.collection('ordenes')
+    read = 0
+    for field in CAMPOS_MARCA['ordenes']:
+        for page in iter_pages_since(collection, field, page_size,
+                                     watermarks.get('ordenes', field), CAMPOS_LECTURA):
+            read += table.update(page)
+            # Las páginas vienen ordenadas por (campo, ID): la última fila es la marca
+            last = page[-1]
+            watermarks.set('ordenes', field, last.get(field), last.id)
+    table.flush()
+    return read
+
+
+def print_report(metrics):
+    print(f"   Órdenes: {metrics['ordenes']} | " +
+          ', '.join(f"{e}: {n}" for e, n in metrics['por_estado'].items()))
+    print()
+    print(f"   {'tramo':<26} {'órdenes':>8} " +
+          ' '.join(f"{'p' + str(p) + ' (h)':>9}" for p in PERCENTILES))
+    for name, (count, values) in metrics['tramos'].items():
+        print(f"   {name:<26} {count:>8} " + ' '.join(f"{values[p]:>9.1f}" for p in PERCENTILES))
+    atrasos = metrics['atrasos']
+    print()
+    print(f"   ⏰ Entregadas tarde: {atrasos['tarde']} de {atrasos['entregadas_con_estimada']} "
+          f"({atrasos['porcentaje_tarde']:.1f}%), retraso medio "
+          f"{atrasos['retraso_medio_horas']:.1f} h")
+    print(f"   ⚠️  Abiertas con la fecha estimada vencida: {atrasos['abiertas_vencidas']}")
+    for title, rows in (('Repartidor', metrics['repartidores']),
+                        ('Provincia', metrics['provincias'])):
+        print()
+        print(f"   {title:<24} {'órdenes':>8} {'entreg.':>8} {'tarde':>6} "
+              f"{'mediana h':>10} {'entr./día':>10}")
+        for row in rows:
+            print(f"   {row['nombre'][:24]:<24} {row['ordenes']:>8} {row['entregadas']:>8} "
+                  f"{row['tarde']:>6} {row['mediana_horas']:>10.1f} {row['entregas_por_dia']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Métricas de SLA de entregas')
+    parser.add_argument('--estado', default=ARCHIVO_ESTADO,
+                        help=f'Arreglos guardados entre ejecuciones (por defecto: {ARCHIVO_ESTADO})')
+    parser.add_argument('--marcas', default=ARCHIVO_MARCAS,
+                        help=f'Marcas de agua (por defecto: {ARCHIVO_MARCAS})')
+    parser.add_argument('--completo', action='store_true',
+                        help='Descartar lo guardado y leer todas las órdenes')
+    parser.add_argument('--pagina', type=int, default=1000)
+    parser.add_argument('--json', default=None, help='Guardar también las métricas en JSON')
+    args = parser.parse_args()
+
+    from firebase_client import get_db
+
+    if args.completo:
+        for path in (args.estado, args.marcas):
+            if os.path.exists(path):
+                os.remove(path)
+
+    db = get_db()
+    print("=" * 70)
+    print(f"📈 SLA DE ENTREGAS{' (completo)' if args.completo else ''}")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    table = SlaTable.load(args.estado)
+    watermarks = Watermarks(args.marcas)
+    read = refresh(db, table, watermarks, args.pagina)
+    # Primero los arreglos y después las marcas: si algo falla, se relee de más, no de menos
+    table.save(args.estado)
+    watermarks.save()
+    metrics = compute_metrics(table)
+    print(f"   {read} órdenes nuevas o modificadas leídas en {time.perf_counter() - start:.2f} s")
+    print()
+    print_report(metrics)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, indent=2, ensure_ascii=False, default=float)
+        print()
+        print(f"✅ Métricas guardadas en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Réplica local en SQLite de ordenes, usuarios, emisores y receptores.
+
+Buscar una orden por numeroOrden, un usuario por email o las órdenes de un
+repartidor cuesta una ida y vuelta a Firestore y una lectura facturada por
+documento. Este daemon mantiene una copia en SQLite (modo WAL) con índices
+secundarios, que las herramientas de administración consultan en
+microsegundos con la clase Replica.
+
+Sincronización:
+
+1. Carga inicial y cambios: un listener on_snapshot por colección. El
+   primer snapshot trae la colección completa y sirve de carga inicial (no
+   hay una lectura aparte por páginas, que solo duplicaría las lecturas
+   facturadas). Cada snapshot se aplica en una sola transacción: altas y
+   modificaciones (solo si update_time es más nuevo que el guardado) y
+   bajas.
+2. Ventanas perdidas: al recibir el primer snapshot de cada listener se
+   borran las filas locales que ya no existen, así que arrancar (o
+   reiniciar un listener) reconcilia todo lo que pasó mientras no
+   escuchaba. Un vigilante revisa cada VIGILANCIA_SEGUNDOS que
+   los listeners sigan activos y, cada VERIFICACION_SEGUNDOS, compara la
+   cantidad de documentos (consulta count(), una lectura por cada 1000) con
+   la de la réplica; si un listener murió o las cantidades no coinciden, lo
+   reinicia.
+
+El primer snapshot de cada listener lee toda la colección (el SDK de Python
+no permite reanudar desde un token guardado): un documento leído por
+documento en cada arranque o reinicio de listener. Conviene dejar el daemon
+corriendo en vez de arrancarlo para cada consulta.
+
+Las columnas extraídas guardan texto tal cual y las fechas en ISO 8601 sin
+comillas, para poder compararlas y ordenarlas en SQL.
+
+Uso:
+    python3 sqlite_replica.py sincronizar [--db replica.db]
+    python3 sqlite_replica.py orden ORD-2025-0001
+    python3 sqlite_replica.py usuario admin@paqueteria.com
+    python3 sqlite_replica.py repartidor "Juan Repartidor" [--estado REPARTIENDO]
+    python3 sqlite_replica.py telefono "+53 51234567"
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+ARCHIVO_REPLICA = 'replica.db'
+VIGILANCIA_SEGUNDOS = 30
+VERIFICACION_SEGUNDOS = 15 * 60
+
+# Columnas extraídas de cada colección (además de id, datos y update_time)
+# y las que llevan índice
+COLUMNAS = {
+    'ordenes': ('numeroOrden', 'estado', 'repartidorAsignado', 'fechaCreacion',
+                'receptorTelefono', 'provinciaDestino'),
+    'usuarios': ('email', 'rol'),
+    'emisores': ('nombre', 'telefono', 'email', 'rut'),
+    'receptores': ('nombre', 'telefono', 'email', 'rut'),
+}
+INDICES = {
+    'ordenes': ('numeroOrden', 'estado', 'repartidorAsignado', 'fechaCreacion',
+                'receptorTelefono', ('repartidorAsignado', 'estado')),
+    'usuarios': ('email', 'rol'),
+    'emisores': ('telefono', 'email', 'rut'),
+    'receptores': ('telefono', 'email', 'rut'),
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # DocumentReference, GeoPoint y demás: su representación de texto
+    return getattr(value, 'path', None) or str(value)
+
+
+def _update_time(snapshot):
+    return snapshot.update_time.timestamp() if snapshot.update_time else 0.0
+
+
+def connect(path=ARCHIVO_REPLICA):
+    """Conexión con el esquema creado. Se puede compartir entre hilos (con un lock)."""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    for name, columns in COLUMNAS.items():
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {name} ('
+                     f'id TEXT PRIMARY KEY, {", ".join(f"{c} TEXT" for c in columns)}, '
+                     f'datos TEXT NOT NULL, update_time REAL NOT NULL)')
+        for index in INDICES[name]:
+            fields = index if isinstance(index, tuple) else (index,)
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_{"_".join(fields)} '
+                         f'ON {name} ({", ".join(fields)})')
+    conn.execute('CREATE TABLE IF NOT EXISTS sincronizacion ('
+                 'coleccion TEXT PRIMARY KEY, read_time TEXT, reconciliado TEXT)')
+    conn.commit()
+    return conn
+
+
+def _column(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return json.dumps(value, default=_json_default)
+
+
+def _row(name, snapshot):
+    data = snapshot.to_dict() or {}
+    return ((snapshot.id,) + tuple(_column(data.get(c)) for c in COLUMNAS[name])
+            + (json.dumps(data, ensure_ascii=False, default=_json_default), _update_time(snapshot)))
+
+
+def _upsert_sql(name):
+    columns = ('id',) + COLUMNAS[name] + ('datos', 'update_time')
+    updates = ', '.join(f'{c} = excluded.{c}' for c in columns[1:])
+    # Solo pisa la fila si el documento es más nuevo que el guardado
+    return (f'INSERT INTO {name} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+            f'ON CONFLICT(id) DO UPDATE SET {updates} '
+            f'WHERE excluded.update_time > {name}.update_time')
+
+
+# ==============================================================================
+# SINCRONIZACIÓN
+# ==============================================================================
+
+class ReplicaSync:
+    """Listeners por colección (el primero hace la carga inicial) y vigilante de la réplica."""
+
+    def __init__(self, db, path=ARCHIVO_REPLICA, collections=tuple(COLUMNAS)):
+        self.db = db
+        self.conn = connect(path)
+        self.collections = collections
+        self._lock = threading.Lock()
+        self._watches = {}
+        self._first = {}
+        self.cambios = {name: 0 for name in collections}
+
+    def _on_snapshot(self, name, docs, changes, read_time):
+        upserts = [_row(name, c.document) for c in changes if c.type.name != 'REMOVED']
+        removed = [(c.document.id,) for c in changes if c.type.name == 'REMOVED']
+        with self._lock, self.conn:
+            self.conn.executemany(_upsert_sql(name), upserts)
+            self.conn.executemany(f'DELETE FROM {name} WHERE id = ?', removed)
+            reconciled = None
+            if self._first.pop(name, False):
+                # Snapshot completo: lo que no está se borró mientras no escuchábamos
+                self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS vigentes (id TEXT PRIMARY KEY)')
+                self.conn.execute('DELETE FROM vigentes')
+                self.conn.executemany('INSERT INTO vigentes VALUES (?)', [(d.id,) for d in docs])
+                deleted = self.conn.execute(
+                    f'DELETE FROM {name} WHERE id NOT IN (SELECT id FROM vigentes)').rowcount
+                reconciled = read_time.isoformat() if read_time else None
+                print(f"   ✓ '{name}' reconciliada: {len(docs)} documentos, {deleted} borrados")
+            self.conn.execute(
+                'INSERT INTO sincronizacion VALUES (?, ?, ?) ON CONFLICT(coleccion) DO UPDATE '
+                'SET read_time = excluded.read_time, '
+                'reconciliado = COALESCE(excluded.reconciliado, reconciliado)',
+                (name, read_time.isoformat() if read_time else None, reconciled))
+        self.cambios[name] += len(changes)
+
+    def listen(self, name):
+        old = self._watches.pop(name, None)
+        if old:
+            old.unsubscribe()
+        self._first[name] = True
+        self._watches[name] = self.db.collection(name).on_snapshot(
+            lambda docs, changes, read_time: self._on_snapshot(name, docs, changes, read_time))
+
+    def local_count(self, name):
+        with self._lock:
+            return self.conn.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+
+    def remote_count(self, name):
+        result = self.db.collection(name).count().get()
+        return int(result[0][0].value)
+
+    def check(self, verify_counts=False):
+        """Reinicia los listeners caídos y, si se pide, los que no cuadran en cantidad."""
+        for name in self.collections:
+            watch = self._watches.get(name)
+            if watch is None or not watch.is_active:
+                print(f"   ⚠️  Listener de '{name}' inactivo: reiniciando y reconciliando")
+                self.listen(name)
+            elif verify_counts and not self._first.get(name):
+                remote, local = self.remote_count(name), self.local_count(name)
+                if remote != local:
+                    print(f"   ⚠️  '{name}': {remote} en Firestore y {local} en la réplica: "
+                          f"reiniciando y reconciliando")
+                    self.listen(name)
+
+    def run(self, watch_every=VIGILANCIA_SEGUNDOS, verify_every=VERIFICACION_SEGUNDOS):
+        for name in self.collections:
+            self.listen(name)
+        last_verify = time.monotonic()
+        try:
+            while True:
+                time.sleep(watch_every)
+                verify = time.monotonic() - last_verify >= verify_every
+                self.check(verify)
+                if verify:
+                    last_verify = time.monotonic()
+        finally:
+            for watch in self._watches.values():
+                watch.unsubscribe()
+
+
+# ==============================================================================
+# CONSULTAS
+# ==============================================================================
+
+class Replica:
+    """Consultas de solo lectura sobre la réplica (no toca Firestore)."""
+
+    def __init__(self, path=ARCHIVO_REPLICA):
+        self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+
+    def _documents(self, sql, params):
+        return [{'id': doc_id, **json.loads(datos)}
+                for doc_id, datos in self.conn.execute(sql, params)]
+
+    def find_order(self, numero_orden):
+        found = self._documents('SELECT id, datos FROM ordenes WHERE numeroOrden = ?',
+                                (numero_orden,))
+        return found[0] if found else None
+
+    def find_user(self, email):
+        found = self._documents('SELECT id, datos FROM usuarios WHERE email = ?', (email,))
+        return found[0] if found else None
+
+    def orders_for_courier(self, repartidor, estado=None):
+        if estado:
+            return self._documents('SELECT id, datos FROM ordenes WHERE repartidorAsignado = ? '
+                                   'AND estado = ? ORDER BY fechaCreacion', (repartidor, estado))
+        return self._documents('SELECT id, datos FROM ordenes WHERE repartidorAsignado = ? '
+                               'ORDER BY fechaCreacion', (repartidor,))
+
+    def orders_for_phone(self, telefono):
+        return self._documents('SELECT id, datos FROM ordenes WHERE receptorTelefono = ? '
+                               'ORDER BY fechaCreacion', (telefono,))
+
+    def last_sync(self):
+        return {name: (read_time, reconciled) for name, read_time, reconciled
+                in self.conn.execute('SELECT * FROM sincronizacion')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Réplica local en SQLite de Firestore')
+    parser.add_argument('--db', default=ARCHIVO_REPLICA, help='Archivo SQLite de la réplica')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sincronizar = sub.add_parser('sincronizar', help='Copia inicial y escucha de cambios')
+    sincronizar.add_argument('--colecciones', default=','.join(COLUMNAS))
+    sincronizar.add_argument('--vigilancia', type=int, default=VIGILANCIA_SEGUNDOS)
+    sincronizar.add_argument('--verificacion', type=int, default=VERIFICACION_SEGUNDOS)
+    sub.add_parser('orden').add_argument('numero')
+    sub.add_parser('usuario').add_argument('email')
+    repartidor = sub.add_parser('repartidor')
+    repartidor.add_argument('nombre')
+    repartidor.add_argument('--estado', default=None)
+    sub.add_parser('telefono').add_argument('telefono')
+    args = parser.parse_args()
+
+    if args.comando == 'sincronizar':
+        from firebase_client import get_db
+
+        collections = tuple(c.strip() for c in args.colecciones.split(',') if c.strip())
+        unknown = [c for c in collections if c not in COLUMNAS]
+        if unknown:
+            parser.error(f"Colecciones desconocidas: {', '.join(unknown)}")
+        print("=" * 70)
+        print(f"🔄 RÉPLICA SQLITE: {args.db} ({', '.join(collections)})")
+        print("=" * 70)
+        sync = ReplicaSync(get_db(), args.db, collections)
+        try:
+            sync.run(args.vigilancia, args.verificacion)
+        except KeyboardInterrupt:
+            print()
+            print(f"✅ Detenida. Cambios aplicados: {sync.cambios}")
+        return
+
+    replica = Replica(args.db)
+    start = time.perf_counter()
+    if args.comando == 'orden':
+        result = replica.find_order(args.numero)
+    elif args.comando == 'usuario':
+        result = replica.find_user(args.email)
+    elif args.comando == 'repartidor':
+        result = replica.orders_for_courier(args.nombre, args.estado)
+    else:
+        result = replica.orders_for_phone(args.telefono)
+    elapsed = (time.perf_counter() - start) * 1e6
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"⏱️  {elapsed:.0f} µs | última sincronización: {replica.last_sync()}")
+
+
+if __name__ == "__main__":
+    main()